@@ -1,19 +1,24 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import ReadSessionLocal, get_read_db
 from models import User
 from auth.security import SECRET_KEY, ALGORITHM
+from auth.token_cache import CurrentUser, token_cache
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+async def authenticate_token(token: str, db: AsyncSession) -> CurrentUser:
+    """Resolve a bearer token to the user it was issued for"""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str: str = payload.get("sub")
         if user_id_str is None:
@@ -28,11 +33,46 @@ def get_current_user(
             detail="Could not validate credentials"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(
+        select(User.id, User.email, User.username).where(User.id == user_id)
+    )).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
-    return user
\ No newline at end of file
+    current_user = CurrentUser(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+    )
+    token_cache.put(token, current_user, token_exp=payload.get("exp"))
+    return current_user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_db),
+) -> CurrentUser:
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None),
+) -> CurrentUser:
+    """Authenticate a long-lived stream.
+
+    Browsers' EventSource cannot send headers, so the token may also come as
+    an ``access_token`` query parameter. The DB session is closed straight
+    away rather than held for the lifetime of the stream.
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    async with ReadSessionLocal() as db:
+        return await authenticate_token(token, db)
@@ -0,0 +1,67 @@
+# hashing.py
+"""Password hashing on a dedicated process pool.
+
+bcrypt is CPU bound and only partly releases the GIL, so running it in the
+request thread pool lets a burst of logins starve every other endpoint.
+Hashes are computed in a small process pool instead, and callers are
+turned away with 503 once too many are waiting.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from auth.security import hash_password, verify_password
+from config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned, not forked: this process already runs threads (DB
+        # drivers, the scheduler) whose held locks a fork would copy
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.hash_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _submit(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), fn, *args)
+
+
+async def _run(fn, *args):
+    """Run ``fn`` on the hashing pool, rejecting the call if the pool is saturated"""
+    global _in_flight
+    if _in_flight >= settings.hash_queue_limit:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        return await _submit(fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run(verify_password, plain, hashed)
@@ -2,12 +2,17 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
 import hashlib
+from config import settings
 
 SECRET_KEY = "COLLISION_SECRET"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
 
 def hash_password(password: str) -> str:
     # Pre-hash with SHA-256 to handle any length password
@@ -0,0 +1,57 @@
+# bench_bulk.py
+"""Compare importing N tasks one by one against the bulk create path.
+
+    python -m benchmarks.bench_bulk --tasks 10000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "bulk.db"))
+
+from benchmarks.common import seed_users  # noqa: E402
+from database import AsyncSessionLocal, dispose_engines, engine, run_migrations  # noqa: E402
+from operations import crud  # noqa: E402
+from schemas import TaskCreate  # noqa: E402
+
+
+def payloads(count: int) -> list[TaskCreate]:
+    now = datetime.now()
+    return [
+        TaskCreate(title=f"Imported {i}", due_date=now + timedelta(days=1, minutes=i))
+        for i in range(count)
+    ]
+
+
+async def time_both(tasks: list[TaskCreate]) -> tuple[float, float]:
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for task in tasks:
+            await crud.create_task(db, task, 1)
+        per_item = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        await crud.bulk_create_tasks(db, tasks, 2)
+        bulk = time.perf_counter() - started
+    await dispose_engines()
+    return per_item, bulk
+
+
+def run(count: int):
+    run_migrations()
+    seed_users(engine, 2)
+    per_item, bulk = asyncio.run(time_both(payloads(count)))
+
+    print(f"per-item: {count} tasks in {per_item:.2f}s ({count / per_item:.0f}/s)")
+    print(f"bulk:     {count} tasks in {bulk:.2f}s ({count / bulk:.0f}/s), {per_item / bulk:.1f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    args = parser.parse_args()
+    run(args.tasks)
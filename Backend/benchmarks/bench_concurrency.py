@@ -0,0 +1,145 @@
+# bench_concurrency.py
+"""Mixed read/write load against SQLite under different connection profiles.
+
+Readers poll GET /tasks and the summary while writers create and update
+tasks. Each profile runs in a fresh process on a fresh database, since the
+engine settings are read at import time:
+
+    python -m benchmarks.bench_concurrency
+    python -m benchmarks.bench_concurrency --profiles default wide-pools --readers 16
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Settings overrides (environment variables read by config.Settings) per profile
+# Wider pools: writers then contend in busy_timeout, readers crowd the event loop
+WIDE_POOLS = {"SQLITE_WRITE_POOL_SIZE": "5", "DB_READ_POOL_SIZE": "10", "DB_READ_MAX_OVERFLOW": "10"}
+
+PROFILES = {
+    # Closest to the engine before: rollback journal, sqlite3's 5s busy wait, many connections
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+        **WIDE_POOLS,
+    },
+    "wal-full": {"SQLITE_SYNCHRONOUS": "full"},
+    "default": {},
+    "wide-pools": WIDE_POOLS,
+    "read-pool-2": {"DB_READ_POOL_SIZE": "2"},
+}
+
+READ_PATHS = ("/tasks/?limit=50", "/notifications/summary")
+
+
+def reader(client, stop, samples, errors):
+    for path in itertools.cycle(READ_PATHS):
+        if stop.is_set():
+            return
+        started = time.perf_counter()
+        status, _ = client.request("GET", path)
+        samples.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+def writer(client, task_ids, stop, samples, errors):
+    for i in itertools.count():
+        if stop.is_set():
+            return
+        started = time.perf_counter()
+        if i % 2:
+            status, _ = client.request("POST", "/tasks/", {"title": f"New {i}", "due_date": "2030-01-01T10:00:00"})
+        else:
+            task_id = task_ids[i % len(task_ids)]
+            status, _ = client.request("PUT", f"/tasks/{task_id}", {"title": f"Edited {i}", "priority": 3})
+        samples.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+def run_profile(readers: int, writers: int, seconds: float, tasks: int) -> dict:
+    from benchmarks.common import Client, percentiles, serve
+    import main
+
+    with serve(main.app) as port:
+        _, body = Client(port).request(
+            "POST", "/auth/register", {"username": "bench", "email": "bench@example.com", "password": "bench"}
+        )
+        token = body["access_token"]
+        seeder = Client(port, token)
+        _, created = seeder.request(
+            "POST", "/tasks/bulk",
+            {"tasks": [{"title": f"Task {i}", "due_date": "2030-01-01T10:00:00"} for i in range(tasks)]},
+        )
+        task_ids = [item["id"] for item in created]
+
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+        threads = [
+            threading.Thread(target=reader, args=(Client(port, token), stop, reads, errors))
+            for _ in range(readers)
+        ]
+        threads += [
+            threading.Thread(target=writer, args=(Client(port, token), task_ids, stop, writes, errors))
+            for _ in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    return {
+        "reads_per_second": len(reads) / seconds,
+        "writes_per_second": len(writes) / seconds,
+        "read": percentiles(reads),
+        "write": percentiles(writes),
+        "errors": len(errors),
+    }
+
+
+def spawn(profile: str, args) -> dict:
+    env = {
+        **os.environ,
+        **PROFILES[profile],
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "mixed.db"),
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_concurrency", "--child",
+        "--readers", str(args.readers), "--writers", str(args.writers),
+        "--seconds", str(args.seconds), "--tasks", str(args.tasks),
+    ]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args.readers, args.writers, args.seconds, args.tasks)))
+        sys.exit(0)
+
+    for profile in args.profiles:
+        result = spawn(profile, args)
+        print(f"{profile:<12} reads {result['reads_per_second']:6.0f}/s p99={result['read']['p99']:7.1f}ms  "
+              f"writes {result['writes_per_second']:5.0f}/s p99={result['write']['p99']:7.1f}ms  "
+              f"errors={result['errors']}")
@@ -0,0 +1,42 @@
+# bench_export.py
+"""Peak Python memory of a full task export as the user's task count grows.
+
+    python -m benchmarks.bench_export --steps 10000 100000 300000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.common import seed_tasks, seed_users, temp_database
+from operations import transfer
+
+
+async def run(steps, fmt: str):
+    engine, SessionLocal = temp_database("export.db")
+    seed_users(engine, 1)
+    exporter = transfer.export_ndjson if fmt == "ndjson" else transfer.export_csv
+
+    seeded = 0
+    for target in steps:
+        seed_tasks(engine, [1], target - seeded, seed=target)
+        seeded = target
+
+        async with SessionLocal() as db:
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = 0
+            async for chunk in exporter(db, 1):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{target:>8} tasks  {size / 1e6:7.1f} MB out  peak {peak / 1e6:5.2f} MB  {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--format", choices=transfer.FORMATS, default="ndjson")
+    args = parser.parse_args()
+    asyncio.run(run(args.steps, args.format))
@@ -0,0 +1,47 @@
+# bench_insights.py
+"""Measure /notifications/summary insight latency as the tasks table grows.
+
+One "probe" user owns a fixed number of tasks while background users are
+added in steps, so any growth in latency comes from rows the query should
+never have touched.
+
+    python -m benchmarks.bench_insights --steps 10000 100000 1000000
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import measure_async, seed_tasks, seed_users, temp_database
+from operations import features
+
+PROBE_USER_ID = 1
+
+
+async def run(steps, probe_tasks: int, users: int, repeat: int):
+    engine, SessionLocal = temp_database("insights.db")
+    seed_users(engine, users + 1)
+    seed_tasks(engine, [PROBE_USER_ID], probe_tasks)
+    background_users = list(range(2, users + 2))
+
+    table_size = probe_tasks
+    results = []
+    for target in steps:
+        missing = target - table_size
+        if missing > 0:
+            seed_tasks(engine, background_users, max(1, missing // len(background_users)), seed=target)
+            table_size += max(1, missing // len(background_users)) * len(background_users)
+
+        async with SessionLocal() as db:
+            stats = await measure_async(lambda: features.insights(db, PROBE_USER_ID), repeat=repeat)
+        results.append((table_size, stats))
+        print(f"{table_size:>10} rows  p50={stats['p50']:.2f}ms  p95={stats['p95']:.2f}ms  max={stats['max']:.2f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--probe-tasks", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.steps, args.probe_tasks, args.users, args.repeat))
@@ -0,0 +1,91 @@
+# bench_login_burst.py
+"""Show whether a burst of logins inflates GET /tasks latency.
+
+Readers poll GET /tasks for the whole run; halfway through, login clients
+start hammering POST /auth/login. ``--inline`` hashes in the request thread
+pool like the old handlers did, for comparison:
+
+    python -m benchmarks.bench_login_burst
+    python -m benchmarks.bench_login_burst --inline
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "login.db"))
+
+from benchmarks.common import Client, percentiles, serve  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def reader(port, token, stop, samples):
+    client = Client(port, token)
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.request("GET", "/tasks/?limit=50")
+        samples.append((time.perf_counter() - started) * 1000)
+
+
+def login_loop(port, stop, statuses):
+    client = Client(port)
+    while not stop.is_set():
+        status, _ = client.request("POST", "/auth/login", {"email": "bench@example.com", "password": PASSWORD})
+        statuses.append(status)
+
+
+def phase(port, token, readers, logins, seconds):
+    stop = threading.Event()
+    samples, statuses = [], []
+    threads = [threading.Thread(target=reader, args=(port, token, stop, samples)) for _ in range(readers)]
+    threads += [threading.Thread(target=login_loop, args=(port, stop, statuses)) for _ in range(logins)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return percentiles(samples), statuses
+
+
+def run(readers: int, logins: int, seconds: float, inline: bool):
+    import main
+    from auth import hashing
+
+    if inline:
+        from starlette.concurrency import run_in_threadpool
+
+        async def submit_inline(fn, *args):
+            return await run_in_threadpool(fn, *args)
+
+        hashing._submit = submit_inline
+
+    with serve(main.app) as port:
+        status, body = Client(port).request(
+            "POST", "/auth/register", {"username": "bench", "email": "bench@example.com", "password": PASSWORD}
+        )
+        token = body["access_token"]
+        client = Client(port, token)
+        for i in range(50):
+            client.request("POST", "/tasks/", {"title": f"Task {i}"})
+
+        quiet, _ = phase(port, token, readers, 0, seconds)
+        burst, statuses = phase(port, token, readers, logins, seconds)
+
+    mode = "inline" if inline else "process pool"
+    print(f"hashing: {mode}")
+    print(f"GET /tasks quiet  p50={quiet['p50']:.1f}ms  p99={quiet['p99']:.1f}ms  n={quiet['count']}")
+    print(f"GET /tasks burst  p50={burst['p50']:.1f}ms  p99={burst['p99']:.1f}ms  n={burst['count']}")
+    print(f"logins: {statuses.count(200)} ok, {statuses.count(503)} rejected with 503")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    run(args.readers, args.logins, args.seconds, args.inline)
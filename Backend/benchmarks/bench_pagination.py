@@ -0,0 +1,55 @@
+# bench_pagination.py
+"""Compare deep-page latency of offset and keyset (cursor) pagination.
+
+Seeds one power user with many tasks and times fetching page N of
+GET /tasks in both modes:
+
+    python -m benchmarks.bench_pagination --tasks 150000 --page 1000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "pages.db"))
+
+from benchmarks.common import measure_async, seed_tasks, seed_users  # noqa: E402
+from database import AsyncSessionLocal, dispose_engines, engine, run_migrations  # noqa: E402
+from operations import crud, pagination  # noqa: E402
+
+USER_ID = 1
+
+
+async def compare(page: int, page_size: int, sort_by: str, repeat: int):
+    async with AsyncSessionLocal() as db:
+        offset = (page - 1) * page_size
+        # Cursor pointing at the last row of the previous page
+        previous = await crud.get_tasks_for_user(db, USER_ID, limit=1, offset=offset - 1, sort_by=sort_by)
+        cursor = pagination.encode_cursor(previous[0], sort_by, "desc")
+
+        by_offset = lambda: crud.get_tasks_for_user(db, USER_ID, limit=page_size, offset=offset, sort_by=sort_by)
+        by_cursor = lambda: crud.get_tasks_for_user(db, USER_ID, limit=page_size, cursor=cursor, sort_by=sort_by)
+        assert [t.id for t in await by_offset()] == [t.id for t in await by_cursor()]
+
+        for name, fn in (("offset", by_offset), ("cursor", by_cursor)):
+            stats = await measure_async(fn, repeat=repeat)
+            print(f"page {page:>5} {name:<6} p50={stats['p50']:.2f}ms  p95={stats['p95']:.2f}ms  max={stats['max']:.2f}ms")
+    await dispose_engines()
+
+
+def run(tasks: int, page: int, page_size: int, sort_by: str, repeat: int):
+    run_migrations()
+    seed_users(engine, 1)
+    seed_tasks(engine, [USER_ID], tasks)
+    asyncio.run(compare(page, page_size, sort_by, repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=150_000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--sort-by", default="created_at")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    run(args.tasks, args.page, args.page_size, args.sort_by, args.repeat)
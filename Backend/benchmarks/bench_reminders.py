@@ -0,0 +1,87 @@
+# bench_reminders.py
+"""Wall time of computing reminders in bulk for a large import.
+
+Imports ``--tasks`` tasks as NDJSON (due over the next 60 days, a tenth of
+them recurring) with several reminder offsets, then changes the user's
+default offsets, which moves every reminder, and sets them again, which
+moves none. Exits non-zero if a step leaves the wrong reminder rows behind:
+
+    python -m benchmarks.bench_reminders --tasks 50000
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from benchmarks.common import seed_users, temp_database
+from models import Notification, User
+from operations import crud, transfer
+
+USER_ID = 1
+
+
+def ndjson(tasks: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    now = datetime.now()
+    lines = []
+    for index in range(tasks):
+        record = {
+            "title": f"Imported {index}",
+            # Past the longest offset, so every offset gets a reminder
+            "due_date": (now + timedelta(days=2, seconds=rng.randint(0, 58 * 86400))).isoformat(),
+        }
+        if rng.random() < 0.1:
+            record["recurrence"] = "FREQ=WEEKLY"
+        lines.append(json.dumps(record))
+    return "\n".join(lines) + "\n"
+
+
+async def unsent(SessionLocal) -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(Notification).where(Notification.sent == False))
+
+
+async def run(tasks: int) -> int:
+    engine, SessionLocal = temp_database("reminders.db")
+    seed_users(engine, 1)
+    with engine.begin() as conn:
+        conn.execute(update(User).where(User.id == USER_ID).values(reminder_offsets=[1440, 60, 10]))
+    stream = io.StringIO(ndjson(tasks))
+    failures = 0
+
+    def report(step: str, seconds: float, expected: int, actual: int):
+        nonlocal failures
+        ok = expected == actual
+        failures += not ok
+        print(f"[{'ok' if ok else 'FAIL'}] {step:<28} {seconds:6.2f}s  {actual} unsent reminders (expected {expected})")
+
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        result = await transfer.import_tasks(db, USER_ID, stream, "ndjson")
+        elapsed = time.perf_counter() - started
+    report(f"import {result['imported']} tasks", elapsed, tasks * 3, await unsent(SessionLocal))
+
+    for step, offsets in (("change default offsets", [120, 30]), ("same offsets again", [120, 30])):
+        async with SessionLocal() as db:
+            started = time.perf_counter()
+            await crud.set_reminder_offsets(db, USER_ID, offsets)
+            elapsed = time.perf_counter() - started
+        report(step, elapsed, tasks * len(offsets), await unsent(SessionLocal))
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    args = parser.parse_args()
+    return 1 if asyncio.run(run(args.tasks)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
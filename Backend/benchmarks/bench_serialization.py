@@ -0,0 +1,139 @@
+# bench_serialization.py
+"""CPU cost of rendering a task page: ORM objects + Pydantic vs the fast path.
+
+Seeds one user with tasks (titles and descriptions with non-ASCII and
+control characters, nulls, microsecond timestamps) and renders the same
+page both ways, as GET /tasks does with FAST_JSON off and on. Exits non-zero
+if the two bodies differ by a single byte:
+
+    python -m benchmarks.bench_serialization --page-size 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "json.db"))
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from benchmarks.common import seed_users  # noqa: E402
+from database import AsyncSessionLocal, dispose_engines, engine, run_migrations  # noqa: E402
+from fast_json import NOTIFICATIONS, TASKS, orjson  # noqa: E402
+from models import Notification, Task  # noqa: E402
+from operations import crud  # noqa: E402
+from response_cache import json_body  # noqa: E402
+from routes.notifications import NOTIFICATION_LIST  # noqa: E402
+from routes.tasks import TASK_LIST  # noqa: E402
+
+USER_ID = 1
+TEXTS = ("Buy milk", "Café ☕ — naïve résumé", 'Quote " and \\ backslash', "Tab\tnew\nline \x01", "emoji 🎉", "")
+
+
+def seed(tasks: int, seed: int = 0):
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = [
+        {
+            "user_id": USER_ID,
+            "title": f"{rng.choice(TEXTS)} {index}",
+            "description": rng.choice(TEXTS + (None,)),
+            "due_date": now + timedelta(seconds=rng.randint(-10**6, 10**6), microseconds=rng.randint(0, 1) * rng.randint(1, 999999))
+            if rng.random() < 0.8 else None,
+            "priority": rng.randint(1, 3),
+            "status": rng.choice(("pending", "done")),
+            "category": rng.choice(("General", "Work", None)),
+            "reminder_enabled": rng.random() < 0.5,
+            "completed": rng.random() < 0.3,
+            "created_at": now - timedelta(seconds=rng.randint(0, 10**7)),
+            "updated_at": now if rng.random() < 0.5 else None,
+        }
+        for index in range(tasks)
+    ]
+    with engine.begin() as conn:
+        task_ids = conn.execute(insert(Task).returning(Task.id), rows).scalars().all()
+        conn.execute(insert(Notification), [
+            {
+                "user_id": USER_ID,
+                "task_id": task_id,
+                "message": f"Reminder: {rng.choice(TEXTS)}",
+                "scheduled_for": now,
+                "sent": True,
+                "sent_at": now,
+                "is_read": rng.random() < 0.5,
+                "created_at": now - timedelta(seconds=rng.randint(0, 10**6)),
+            }
+            for task_id in task_ids
+        ])
+
+
+async def cpu_ms(render, repeat: int) -> tuple[float, bytes]:
+    """Best process (CPU) time of ``render()`` over ``repeat`` runs, in ms"""
+    best, body = float("inf"), b""
+    for _ in range(repeat):
+        started = time.process_time()
+        body = await render()
+        best = min(best, time.process_time() - started)
+    return best * 1000, body
+
+
+async def compare(page_size: int, repeat: int) -> int:
+    notifications = select(Notification).where(Notification.user_id == USER_ID).order_by(Notification.created_at.desc())
+    failures = 0
+    async with AsyncSessionLocal() as db:
+        async def tasks_orm():
+            return json_body(TASK_LIST, await crud.get_tasks_for_user(db, USER_ID, limit=page_size))
+
+        async def tasks_fast():
+            return TASKS.dumps(await crud.get_tasks_for_user(db, USER_ID, limit=page_size, columns=TASKS.columns))
+
+        async def notifications_orm():
+            return json_body(NOTIFICATION_LIST, (await db.scalars(notifications.limit(page_size))).all())
+
+        async def notifications_fast():
+            query = notifications.with_only_columns(*NOTIFICATIONS.columns).limit(page_size)
+            return NOTIFICATIONS.dumps((await db.execute(query)).all())
+
+        for name, orm, fast in (("tasks", tasks_orm, tasks_fast), ("notifications", notifications_orm, notifications_fast)):
+            # The ORM path goes through the identity map; start each run from an empty one
+            orm_ms, orm_body = await cpu_ms(lambda: _fresh(db, orm), repeat)
+            fast_ms, fast_body = await cpu_ms(lambda: _fresh(db, fast), repeat)
+            same = orm_body == fast_body
+            failures += not same
+            rows = orm_body.count(b'"id":')
+            print(
+                f"[{'ok' if same else 'FAIL'}] {name:<13} {rows} rows  "
+                f"orm+pydantic={orm_ms:.2f}ms  projection+{'orjson' if orjson else 'pydantic'}={fast_ms:.2f}ms  "
+                f"saved={orm_ms - fast_ms:.2f}ms CPU per page ({(1 - fast_ms / orm_ms) * 100:.0f}%)"
+            )
+            if not same:
+                offset = next(i for i, (a, b) in enumerate(zip(orm_body, fast_body)) if a != b)
+                print(f"    first difference at byte {offset}: {orm_body[offset - 40:offset + 40]!r} != {fast_body[offset - 40:offset + 40]!r}")
+    await dispose_engines()
+    return failures
+
+
+async def _fresh(db, render):
+    db.expunge_all()
+    return await render()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    run_migrations()
+    seed_users(engine, 1)
+    seed(args.tasks)
+    return 1 if asyncio.run(compare(args.page_size, args.repeat)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
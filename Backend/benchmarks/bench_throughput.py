@@ -0,0 +1,71 @@
+# bench_throughput.py
+"""Sustained requests per second on the read-heavy routes.
+
+Serves the app in-process with a single uvicorn worker and drives it with
+``--clients`` concurrent keep-alive clients for ``--seconds``:
+
+    python -m benchmarks.bench_throughput --clients 64 --seconds 10
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-bench-"), "rps.db"))
+
+from benchmarks.common import Client, percentiles, serve  # noqa: E402
+
+PATHS = ("/tasks/?limit=50", "/notifications/summary", "/notifications/upcoming")
+
+
+def client_loop(port, token, stop, samples, errors):
+    client = Client(port, token)
+    for path in itertools.cycle(PATHS):
+        if stop.is_set():
+            return
+        started = time.perf_counter()
+        status, _ = client.request("GET", path)
+        samples.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+def run(clients: int, seconds: float, tasks: int):
+    import main
+
+    with serve(main.app) as port:
+        _, body = Client(port).request(
+            "POST", "/auth/register", {"username": "bench", "email": "bench@example.com", "password": "bench"}
+        )
+        token = body["access_token"]
+        seeder = Client(port, token)
+        for i in range(tasks):
+            seeder.request("POST", "/tasks/", {"title": f"Task {i}", "due_date": "2030-01-01T10:00:00"})
+
+        stop = threading.Event()
+        samples, errors = [], []
+        threads = [
+            threading.Thread(target=client_loop, args=(port, token, stop, samples, errors))
+            for _ in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    stats = percentiles(samples)
+    print(f"{clients} clients: {len(samples) / seconds:.0f} req/s  "
+          f"p50={stats['p50']:.1f}ms  p99={stats['p99']:.1f}ms  errors={len(errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+    run(args.clients, args.seconds, args.tasks)
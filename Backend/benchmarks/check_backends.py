@@ -0,0 +1,391 @@
+# check_backends.py
+"""Run the API end to end against every supported database backend.
+
+Each backend gets a fresh, migrated database and runs the same scenario in
+its own process (the engine is configured at import time): auth, task CRUD,
+search, cursor pagination, bulk endpoints, export, insights, the reminder
+worker, the notification feed, delta sync (including read state), recurring tasks and reminder offsets.
+
+SQLite runs with foreign keys enforced, as PostgreSQL does. PostgreSQL uses ``--postgres-url`` (or
+TEST_POSTGRES_URL) when given; otherwise a throwaway server is started with
+``initdb``/``pg_ctl`` from PATH (or PG_BIN) and removed afterwards. A backend
+that could not be started is reported as not verified and the run exits 2,
+so pass ``--backends sqlite`` where only SQLite is available:
+
+    python -m benchmarks.check_backends
+    python -m benchmarks.check_backends --backends postgresql --postgres-url postgresql://localhost/tasks_test
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+BACKENDS = ("sqlite", "postgresql")
+
+
+def scenario() -> list:
+    """The checks, run inside the child process; returns failure messages"""
+    from sqlalchemy import insert, select, update
+
+    import main
+    from benchmarks.common import Client, serve
+    from config import settings
+    from database import SessionLocal
+    from models import Notification, Task, User
+    from operations.notifications import purge_read
+    from workers.reminder_worker import process_due_reminders
+
+    failures = []
+
+    def check(name, condition):
+        print(f"[{'ok' if condition else 'FAIL'}] {name}", file=sys.stderr)
+        if not condition:
+            failures.append(name)
+
+    with serve(main.app) as port:
+        anonymous = Client(port)
+        user = {"username": "matrix", "email": "matrix@example.com", "password": "matrix-password"}
+        status, body = anonymous.request("POST", "/auth/register", user)
+        check("register", status == 200)
+        check("duplicate register rejected", anonymous.request("POST", "/auth/register", user)[0] == 400)
+        status, body = anonymous.request("POST", "/auth/login", {"email": user["email"], "password": user["password"]})
+        check("login", status == 200)
+        client = Client(port, body["access_token"])
+        user_id = body["user"]["id"]
+
+        now = datetime.now().replace(microsecond=0)
+        due_dates = [now + timedelta(days=offset) for offset in (-3, -1, 2, 5, 9)] + [None] * 3
+        created = []
+        for i, due in enumerate(due_dates):
+            status, task = client.request("POST", "/tasks/", {
+                "title": f"Task {i}",
+                "due_date": due.isoformat() if due else None,
+                "priority": 1 + i % 3,
+                "completed": i == 0,
+                "status": "done" if i == 0 else "pending",
+            })
+            created.append(task)
+        check("create tasks", all(task and task.get("id") for task in created))
+
+        task_id = created[3]["id"]
+        status, task = client.request("PUT", f"/tasks/{task_id}", {"title": "Renamed", "priority": 3})
+        check("update task", status == 200 and task["title"] == "Renamed")
+        check("read task", client.request("GET", f"/tasks/{task_id}")[1]["title"] == "Renamed")
+
+        _, found = client.request("GET", "/tasks/?q=renam")
+        check("search", [t["id"] for t in found] == [task_id])
+        _, found = client.request("GET", "/tasks/?q=renamed+general")
+        check("search matches categories", [t["id"] for t in found] == [task_id])
+
+        for sort_by in ("created_at", "due_date", "priority"):
+            _, everything = client.request("GET", f"/tasks/?limit=1000&sort_by={sort_by}&order=asc")
+            paged, path = [], f"/tasks/?limit=3&sort_by={sort_by}&order=asc"
+            while path:
+                _, headers, data = client.request_raw("GET", path)
+                paged += json.loads(data)
+                cursor = headers.get("X-Next-Cursor")
+                path = f"/tasks/?limit=3&sort_by={sort_by}&order=asc&cursor={cursor}" if cursor else None
+            check(f"cursor pages match one page ({sort_by})", [t["id"] for t in paged] == [t["id"] for t in everything])
+
+        status, results = client.request("POST", "/tasks/bulk", {"tasks": [{"title": f"Bulk {i}"} for i in range(50)]})
+        bulk_ids = [result["id"] for result in results or []]
+        check("bulk create", status == 200 and len(bulk_ids) == 50)
+        status, results = client.request("PUT", "/tasks/bulk", {"tasks": [{"id": bulk_ids[0], "priority": 3}, {"id": 10**9}]})
+        check("bulk update", status == 200 and [r["status"] for r in results] == ["updated", "not_found"])
+        status, results = client.request("DELETE", "/tasks/bulk", {"ids": bulk_ids[1:]})
+        check("bulk delete", status == 200 and all(r["status"] == "deleted" for r in results))
+
+        status, _, data = client.request_raw("GET", "/tasks/export?format=ndjson")
+        check("export", status == 200 and len(data.splitlines()) == len(created) + 1)
+
+        status, summary = client.request("GET", "/notifications/summary")
+        check("insights", status == 200 and summary["total_tasks"] == len(created) + 1
+              and summary["completed_tasks"] == 1 and summary["overdue_tasks"] == 1)
+        check("upcoming", client.request("GET", "/notifications/upcoming")[0] == 200)
+        check("overdue", len(client.request("GET", "/notifications/overdue")[1]) == 1)
+
+        with SessionLocal() as db:
+            db.execute(insert(Notification).values(
+                user_id=user_id, task_id=created[1]["id"],
+                scheduled_for=now - timedelta(minutes=1), message="Due",
+            ))
+            db.commit()
+        process_due_reminders()
+        _, feed = client.request("GET", "/notifications/")
+        check("worker sends due reminders", [n["message"] for n in feed] == ["Due"])
+        status, notification = client.request("PUT", f"/notifications/{feed[0]['id']}")
+        check("mark read", status == 200 and notification["is_read"])
+        with SessionLocal() as db:
+            sent_at = db.scalar(select(Notification.sent_at).where(Notification.id == feed[0]["id"]))
+            check("sent_at recorded", sent_at is not None)
+
+        with SessionLocal() as db:
+            db.execute(insert(Notification), [
+                {"user_id": user_id, "task_id": created[1]["id"], "scheduled_for": now, "message": f"Feed {i}",
+                 "sent": True, "sent_at": now, "created_at": now - timedelta(minutes=i % 3)}
+                for i in range(7)
+            ])
+            db.commit()
+        _, feed = client.request("GET", "/notifications/")
+        paged, cursor = [], ""
+        while cursor is not None:
+            _, headers, body = client.request_raw("GET", f"/notifications/?limit=3{cursor and '&cursor=' + cursor}")
+            paged += [n["id"] for n in json.loads(body)]
+            cursor = headers.get("X-Next-Cursor")
+        check("feed pages match one page", len(feed) == 8 and paged == [n["id"] for n in feed])
+        check("unread count", client.request("GET", "/notifications/unread-count")[1]["unread"] == 7)
+        status, marked = client.request("POST", "/notifications/read", {"ids": [n["id"] for n in feed if not n["is_read"]][:2]})
+        check("mark some read", status == 200 and marked["updated"] == 2)
+        _, unread = client.request("GET", "/notifications/?unread=true")
+        check("unread feed", len(unread) == 5 and not any(n["is_read"] for n in unread))
+        check("ids or all required", client.request("POST", "/notifications/read", {})[0] == 422)
+        status, marked = client.request("POST", "/notifications/read", {"all": True})
+        check("mark all read", status == 200 and marked["updated"] == 5
+              and client.request("GET", "/notifications/unread-count")[1]["unread"] == 0)
+        with SessionLocal() as db:
+            db.execute(
+                update(Notification)
+                .where(Notification.id.in_([n["id"] for n in feed[:4]]))
+                .values(created_at=now - timedelta(days=settings.notification_retention_days + 1))
+            )
+            db.commit()
+        check("retention purges old read notifications", purge_read(chunk_size=3) == 4
+              and len(client.request("GET", "/notifications/")[1]) == 4)
+
+        status, synced = client.request("GET", "/sync/")
+        check("full sync", status == 200 and synced["full"] and len(synced["tasks"]) == len(created) + 1)
+
+        check("delete task", client.request("DELETE", f"/tasks/{task_id}")[0] == 200)
+        check("deleted task is gone", client.request("GET", f"/tasks/{task_id}")[0] == 404)
+
+        client.request("PUT", f"/tasks/{created[4]['id']}", {"title": "Synced"})
+        status, delta = client.request("GET", f"/sync/?since={synced['token']}")
+        check("delta sync", status == 200 and not delta["full"] and task_id in delta["deleted"]
+              and {t["id"]: t["title"] for t in delta["tasks"]}.get(created[4]["id"]) == "Synced")
+        check("bad sync token rejected", client.request("GET", "/sync/?since=nope")[0] == 400)
+
+        # Sent well before the token, so only its read state is new
+        with SessionLocal() as db:
+            read_id = db.scalar(select(Notification.id).where(Notification.user_id == user_id, Notification.sent == True))
+            db.execute(
+                update(Notification)
+                .where(Notification.id == read_id)
+                .values(is_read=False, read_at=None, sent_at=now - timedelta(hours=1))
+            )
+            db.commit()
+        _, synced = client.request("GET", "/sync/")
+        client.request("PUT", f"/notifications/{read_id}")
+        _, delta = client.request("GET", f"/sync/?since={synced['token']}")
+        check("delta sync includes read state", [n["is_read"] for n in delta["notifications"] if n["id"] == read_id] == [True])
+
+        # A daily task that started yesterday, 10 minutes from now
+        start = now - timedelta(days=1) + timedelta(minutes=10)
+        status, chore = client.request("POST", "/tasks/", {
+            "title": "Chore", "due_date": start.isoformat(), "recurrence": "freq=daily;count=5",
+        })
+        check("create recurring task", status == 200 and chore["recurrence"] == "FREQ=DAILY;COUNT=5")
+        for rule in ("FREQ=YEARLY;INTERVAL=10;COUNT=1000", "FREQ=MONTHLY;INTERVAL=100;COUNT=1000"):
+            status, _ = client.request("POST", "/tasks/", {"title": "Aeons", "due_date": start.isoformat(), "recurrence": rule})
+            check(f"{rule} rejected", status == 422)
+        status, last = client.request("POST", "/tasks/", {
+            "title": "Millennium", "due_date": "9990-01-01T00:00:00", "recurrence": "FREQ=YEARLY;COUNT=50",
+        })
+        check("series stops at the last representable year", status == 200)
+        client.request("DELETE", f"/tasks/{last['id']}")
+        until = (start + timedelta(days=3, minutes=1)).isoformat()
+        _, upcoming = client.request("GET", f"/notifications/upcoming?until={until}")
+        chores = [t["due_date"] for t in upcoming if t["id"] == chore["id"]]
+        check("occurrences expanded", chores == [(start + timedelta(days=d)).isoformat() for d in (1, 2, 3)])
+        check("recurring task is not overdue", all(t["id"] != chore["id"] for t in client.request("GET", "/notifications/overdue")[1]))
+
+        def chore_reminders():
+            with SessionLocal() as db:
+                return db.scalars(
+                    select(Notification.scheduled_for)
+                    .where(Notification.task_id == chore["id"])
+                    .order_by(Notification.scheduled_for)
+                ).all()
+
+        check("one reminder materialised", len(chore_reminders()) == 1)
+        # Pretend it is the reminder of the occurrence 10 minutes from now, due
+        with SessionLocal() as db:
+            db.execute(
+                update(Notification)
+                .where(Notification.task_id == chore["id"])
+                .values(scheduled_for=start + timedelta(days=1) - timedelta(minutes=30))
+            )
+            db.commit()
+        process_due_reminders()
+        times = chore_reminders()
+        check("next reminder added when one fires", len(times) == 2 and times[1] == start + timedelta(days=2) - timedelta(minutes=30))
+
+        def reminders_of(task):
+            with SessionLocal() as db:
+                return db.execute(
+                    select(Notification.scheduled_for, Notification.message)
+                    .where(Notification.task_id == task["id"], Notification.sent == False)
+                    .order_by(Notification.scheduled_for)
+                ).all()
+
+        due = now.replace(microsecond=0) + timedelta(days=2)
+        status, trip = client.request("POST", "/tasks/", {
+            "title": "Trip", "due_date": due.isoformat(), "reminder_offsets": [60, 1440, 10, 60],
+        })
+        check("reminder offsets normalized", status == 200 and trip["reminder_offsets"] == [1440, 60, 10])
+        check("one reminder per offset", reminders_of(trip) == [
+            (due - timedelta(days=1), "Reminder: Trip is due in 1 day"),
+            (due - timedelta(hours=1), "Reminder: Trip is due in 1 hour"),
+            (due - timedelta(minutes=10), "Reminder: Trip is due in 10 minutes"),
+        ])
+        check("bad reminder offsets rejected", client.request("POST", "/tasks/", {"title": "Bad", "reminder_offsets": [-5]})[0] == 422)
+        moved = due + timedelta(days=1)
+        client.request("PUT", f"/tasks/{trip['id']}", {"title": "Trip", "due_date": moved.isoformat()})
+        check("update moves reminders", [when for when, _ in reminders_of(trip)] == [
+            moved - timedelta(days=1), moved - timedelta(hours=1), moved - timedelta(minutes=10),
+        ])
+        client.request("PUT", f"/tasks/{trip['id']}", {"title": "Trip", "completed": True})
+        check("completing drops reminders", reminders_of(trip) == [])
+
+        status, errand = client.request("POST", "/tasks/", {"title": "Errand", "due_date": due.isoformat()})
+        check("server default offset", [when for when, _ in reminders_of(errand)] == [due - timedelta(minutes=30)])
+        status, offsets = client.request("PUT", "/auth/me/reminder-offsets", {"offsets": [120, 0]})
+        check("user default offsets", status == 200 and offsets["offsets"] == [120, 0]
+              and client.request("GET", "/auth/me/reminder-offsets")[1]["offsets"] == [120, 0])
+        check("user default moves reminders", reminders_of(errand) == [
+            (due - timedelta(hours=2), "Reminder: Errand is due in 2 hours"),
+            (due, "Reminder: Errand is due now"),
+        ])
+        client.request("PUT", "/auth/me/reminder-offsets", {"offsets": None})
+        check("user default reset", [when for when, _ in reminders_of(errand)] == [due - timedelta(minutes=30)])
+        # Changed by another API process: this one's cached identity predates it
+        client.request("GET", "/tasks/?limit=1")
+        with SessionLocal() as db:
+            owner = db.scalar(select(Task.user_id).where(Task.id == errand["id"]))
+            db.execute(update(User).where(User.id == owner).values(reminder_offsets=[60]))
+            db.commit()
+        _, chore2 = client.request("POST", "/tasks/", {"title": "Laundry", "due_date": due.isoformat()})
+        check("default read at write time", [when for when, _ in reminders_of(chore2)] == [due - timedelta(hours=1)])
+        client.request("DELETE", f"/tasks/{chore2['id']}")
+        client.request("PUT", "/auth/me/reminder-offsets", {"offsets": None})
+
+        # A reminder that is due but not sent yet (the worker has not got to it)
+        _, call = client.request("POST", "/tasks/", {"title": "Call", "due_date": due.isoformat()})
+        soon = datetime.now().replace(microsecond=0) + timedelta(minutes=10)
+        with SessionLocal() as db:
+            db.execute(update(Task).where(Task.id == call["id"]).values(due_date=soon))
+            db.execute(update(Notification).where(Notification.task_id == call["id"])
+                       .values(scheduled_for=soon - timedelta(minutes=30)))
+            db.commit()
+        client.request("PUT", f"/tasks/{call['id']}", {"title": "Call Mum"})
+        check("due reminder follows a rename", reminders_of(call) == [
+            (soon - timedelta(minutes=30), "Reminder: Call Mum is due in 30 minutes"),
+        ])
+        client.request("PUT", f"/tasks/{call['id']}", {"title": "Call Mum", "completed": True})
+        check("completing drops a due reminder", reminders_of(call) == [])
+        client.request("DELETE", f"/tasks/{call['id']}")
+
+        # Tasks whose reminders were already sent, which still reference them
+        def notifications_of(*task_ids):
+            with SessionLocal() as db:
+                return db.scalars(select(Notification.id).where(Notification.task_id.in_(task_ids))).all()
+
+        check("tasks have sent reminders", notifications_of(created[1]["id"]) and notifications_of(chore["id"]))
+        check("delete task with sent reminders", client.request("DELETE", f"/tasks/{created[1]['id']}")[0] == 200)
+        status, results = client.request("DELETE", "/tasks/bulk", {"ids": [chore["id"]]})
+        check("bulk delete task with sent reminders", status == 200 and results[0]["status"] == "deleted")
+        check("their notifications are gone", notifications_of(created[1]["id"], chore["id"]) == [])
+    return failures
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def throwaway_postgres():
+    """Start a temporary PostgreSQL cluster and yield its URL"""
+    bin_dir = os.environ.get("PG_BIN")
+    initdb = os.path.join(bin_dir, "initdb") if bin_dir else shutil.which("initdb")
+    pg_ctl = os.path.join(bin_dir, "pg_ctl") if bin_dir else shutil.which("pg_ctl")
+    if not (initdb and pg_ctl and os.path.exists(initdb)):
+        raise RuntimeError("initdb/pg_ctl not found; pass --postgres-url or set PG_BIN")
+
+    data_dir = tempfile.mkdtemp(prefix="str-pg-")
+    port = _free_port()
+    subprocess.run([initdb, "-D", data_dir, "-U", "postgres", "--auth=trust", "-E", "UTF8"], check=True, capture_output=True)
+    subprocess.run(
+        [pg_ctl, "-D", data_dir, "-l", os.path.join(data_dir, "server.log"), "-w",
+         "-o", f"-p {port} -k {data_dir} -c listen_addresses=127.0.0.1 -F", "start"],
+        check=True, capture_output=True,
+    )
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "stop"], capture_output=True)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+@contextmanager
+def database_for(backend: str, postgres_url: str = None):
+    if backend == "sqlite":
+        yield "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-matrix-"), "matrix.db")
+    elif postgres_url:
+        yield postgres_url
+    else:
+        with throwaway_postgres() as url:
+            yield url
+
+
+def run_backend(url: str) -> list:
+    env = {**os.environ, "DATABASE_URL": url, "SQLITE_FOREIGN_KEYS": "true"}
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, "-m", "benchmarks.check_backends", "--child"], env=env, capture_output=True, text=True)
+    sys.stderr.write(child.stderr)
+    if child.returncode != 0 or not child.stdout.strip():
+        return ["scenario crashed"]
+    print(f"  ({time.perf_counter() - started:.1f}s)")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--postgres-url", default=os.environ.get("TEST_POSTGRES_URL"))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(scenario()))
+        return 0
+
+    failed, unverified = False, []
+    for backend in args.backends:
+        print(f"== {backend}")
+        try:
+            with database_for(backend, args.postgres_url) as url:
+                failures = run_backend(url)
+        except (RuntimeError, subprocess.CalledProcessError) as e:
+            print(f"[not verified] {backend}: {e}")
+            unverified.append(backend)
+            continue
+        print(f"{backend}: {'FAILED ' + ', '.join(failures) if failures else 'passed'}")
+        failed = failed or bool(failures)
+    if failed:
+        return 1
+    if unverified:
+        print(f"NOT VERIFIED: {', '.join(unverified)}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# check_delivery.py
+"""Deliver due reminders through the webhook and SMTP channels against
+local stand-in servers, and check the pipeline's guarantees:
+
+- every reminder reaches each channel once, failed sends are retried and
+  rejected ones end up dead;
+- connections are reused, no more than the concurrency limit per channel;
+- a slow webhook receiver does not hold up the mail channel;
+- a reminder with a line break in its title is mailed with a one-line subject.
+
+    python -m benchmarks.check_delivery --reminders 1000 --webhook-delay 0.05
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-delivery-"), "delivery.db")
+os.environ.setdefault("DELIVERY_CHANNELS", '["webhook", "smtp"]')
+os.environ.setdefault("DELIVERY_CONCURRENCY", "4")
+os.environ.setdefault("DELIVERY_QUEUE_SIZE", "50")
+os.environ.setdefault("DELIVERY_BACKOFF_SECONDS", "0.2")
+os.environ.setdefault("DELIVERY_POLL_SECONDS", "0.2")
+os.environ.setdefault("DELIVERY_MAX_ATTEMPTS", "3")
+
+from sqlalchemy import func, select, update  # noqa: E402
+
+from benchmarks.check_worker_claims import seed_due_reminders  # noqa: E402
+from config import settings  # noqa: E402
+from database import SessionLocal, run_migrations  # noqa: E402
+from models import Notification, NotificationDelivery  # noqa: E402
+from workers.delivery import delivery_pipeline  # noqa: E402
+from workers.reminder_worker import process_due_reminders  # noqa: E402
+
+# The webhook stand-in rejects these reminders and fails the first attempt at others
+REJECTED = lambda notification_id: notification_id % 50 == 1  # noqa: E731
+FLAKY = lambda notification_id: notification_id % 10 == 0  # noqa: E731
+# The mail stand-in refuses this user's address
+REFUSED_ADDRESS = "user7@example.com"
+# A title with a line break, given to this reminder
+MULTILINE_ID = 2
+MULTILINE_MESSAGE = "Reminder: pack\r\nthe charger"
+
+lock = threading.Lock()
+seen = {"http_connections": 0, "smtp_connections": 0}
+webhook_attempts: Counter = Counter()
+webhook_delivered: Counter = Counter()
+mail_delivered: Counter = Counter()
+
+
+def make_webhook_handler(delay: float):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            with lock:
+                seen["http_connections"] += 1
+
+        def do_POST(self):
+            event = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            notification_id = event["id"]
+            assert self.headers["Idempotency-Key"] == f"notification-{notification_id}"
+            time.sleep(delay)
+            with lock:
+                webhook_attempts[notification_id] += 1
+                if REJECTED(notification_id):
+                    status = 400
+                elif FLAKY(notification_id) and webhook_attempts[notification_id] == 1:
+                    status = 503
+                else:
+                    status = 200
+                    webhook_delivered[notification_id] += 1
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    return WebhookHandler
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib"""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        with lock:
+            seen["smtp_connections"] += 1
+        self.reply("220 stand-in ready")
+        recipient = None
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif verb == "MAIL":
+                recipient = None
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip(" <>")
+                if address == REFUSED_ADDRESS:
+                    self.reply("550 No such user")
+                else:
+                    recipient = address
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                subject = None
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    if line.startswith(b"Subject: "):
+                        subject = line[9:].decode().strip()
+                with lock:
+                    mail_delivered[recipient, subject] += 1
+                self.reply("250 Queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class ThreadingSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_servers(delay: float):
+    webhook = ThreadingHTTPServer(("127.0.0.1", 0), make_webhook_handler(delay))
+    webhook.daemon_threads = True
+    smtp = ThreadingSmtpServer(("127.0.0.1", 0), SmtpHandler)
+    for server in (webhook, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.webhook_url = f"http://127.0.0.1:{webhook.server_address[1]}/reminders"
+    settings.smtp_host, settings.smtp_port = smtp.server_address
+    return webhook, smtp
+
+
+def pending(channel: str) -> int:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count())
+            .select_from(NotificationDelivery)
+            .where(NotificationDelivery.channel == channel, NotificationDelivery.status == "pending")
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=1000)
+    parser.add_argument("--webhook-delay", type=float, default=0.05, help="seconds the webhook receiver takes per request")
+    args = parser.parse_args()
+
+    run_migrations()
+    seed_due_reminders(args.reminders)
+    with SessionLocal() as db:
+        db.execute(update(Notification).where(Notification.id == MULTILINE_ID).values(message=MULTILINE_MESSAGE))
+        db.commit()
+    servers = start_servers(args.webhook_delay)
+
+    delivery_pipeline.start()
+    started = time.perf_counter()
+    process_due_reminders()
+    finished = {}
+    deadline = started + args.reminders * args.webhook_delay + 60
+    while len(finished) < 2 and time.perf_counter() < deadline:
+        for channel in ("webhook", "smtp"):
+            if channel not in finished and pending(channel) == 0:
+                finished[channel] = time.perf_counter() - started
+        time.sleep(0.05)
+    delivery_pipeline.stop()
+    for server in servers:
+        server.shutdown()
+
+    with SessionLocal() as db:
+        outcomes = {
+            (channel, status): count
+            for channel, status, count in db.execute(
+                select(NotificationDelivery.channel, NotificationDelivery.status, func.count())
+                .group_by(NotificationDelivery.channel, NotificationDelivery.status)
+            )
+        }
+        retried = db.scalar(
+            select(func.count()).where(NotificationDelivery.channel == "webhook", NotificationDelivery.attempts == 2)
+        )
+
+    ids = range(1, args.reminders + 1)
+    rejected = sum(1 for notification_id in ids if REJECTED(notification_id))
+    flaky = sum(1 for notification_id in ids if FLAKY(notification_id) and not REJECTED(notification_id))
+    refused = sum(1 for i in range(args.reminders) if i % 100 + 1 == 7)
+    expected = {
+        ("webhook", "delivered"): args.reminders - rejected,
+        ("webhook", "dead"): rejected,
+        ("smtp", "delivered"): args.reminders - refused,
+        ("smtp", "dead"): refused,
+    }
+
+    failures = []
+    for key, count in expected.items():
+        print(f"{key[0]:<8} {key[1]:<10} {outcomes.get(key, 0):>6} (expected {count})")
+        if outcomes.get(key, 0) != count:
+            failures.append(f"{key[0]} {key[1]}: {outcomes.get(key, 0)} != {count}")
+    if retried != flaky:
+        failures.append(f"{retried} webhook deliveries took two attempts, expected {flaky}")
+    if any(count > 1 for count in webhook_delivered.values()) or any(count > 1 for count in mail_delivered.values()):
+        failures.append("a reminder was delivered twice")
+    if not any(subject == "Reminder: pack the charger" for _, subject in mail_delivered):
+        failures.append("the reminder with a line break was not mailed with a folded subject")
+    if sum(mail_delivered.values()) != args.reminders - refused:
+        failures.append(f"mail server got {sum(mail_delivered.values())} messages")
+    for kind in ("http_connections", "smtp_connections"):
+        print(f"{kind}: {seen[kind]} (limit {settings.delivery_concurrency})")
+        if seen[kind] > settings.delivery_concurrency:
+            failures.append(f"{kind} not reused")
+    print(f"smtp done in {finished.get('smtp', float('nan')):.2f}s, webhook in {finished.get('webhook', float('nan')):.2f}s")
+    if len(finished) < 2:
+        failures.append("deliveries left pending")
+    elif finished["smtp"] > finished["webhook"] / 2:
+        failures.append("the slow webhook held up the mail channel")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# check_leader.py
+"""Run several scheduler processes (``python -m workers.run``) against one
+new database, kill the elected one partway through, and check that another
+takes over and every reminder is sent exactly once, only by the leader of
+the time. The processes start together and migrate the database themselves,
+as the workers of ``uvicorn --workers`` would.
+
+    python -m benchmarks.check_leader --processes 3 --reminders 3000
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-leader-"), "leader.db")
+# Short leases so failover fits in a quick run
+os.environ.setdefault("SCHEDULER_LEASE_SECONDS", "3")
+os.environ.setdefault("REMINDER_LEASE_SECONDS", "3")
+os.environ.setdefault("REMINDER_RECONCILE_SECONDS", "2")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from benchmarks.common import seed_users  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Notification, Task  # noqa: E402
+
+
+def seed_reminders(count: int, spread_seconds: float, users: int = 50):
+    """A tenth of the reminders already due, the rest due over the next
+    ``spread_seconds``"""
+    seed_users(engine, users)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [
+            {"id": user_id, "user_id": user_id, "title": "Task", "priority": 2, "status": "pending", "created_at": now}
+            for user_id in range(1, users + 1)
+        ])
+        conn.execute(insert(Notification), [
+            {
+                "user_id": i % users + 1,
+                "task_id": i % users + 1,
+                "scheduled_for": now + timedelta(seconds=spread_seconds * (i / count - 0.1)),
+                "sent": False,
+                "message": f"Reminder {i}",
+                "created_at": now,
+                "is_read": False,
+            }
+            for i in range(count)
+        ])
+
+
+def child(log_path: str):
+    """A scheduler process that logs when it is elected and what it sends"""
+    from workers import run
+    from workers.notification_hub import notification_hub
+    from workers.scheduler import scheduler_election
+
+    log = open(log_path, "a", buffering=1)
+    on_elected = scheduler_election.on_elected
+
+    def elected():
+        log.write(f"elected {time.time()}\n")
+        on_elected()
+
+    scheduler_election.on_elected = elected
+    notification_hub.publish = lambda user_id, event: log.write(f"sent {event['id']} {time.time()}\n")
+    run.main()
+
+
+def read_log(path: str):
+    elected, sent = None, []
+    with open(path) as log:
+        for line in log:
+            kind, *fields = line.split()
+            if kind == "elected" and elected is None:
+                elected = float(fields[0])
+            elif kind == "sent" and len(fields) == 2:  # a killed process may leave half a line
+                sent.append((int(fields[0]), float(fields[1])))
+    return elected, sent
+
+
+def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--reminders", type=int, default=3000)
+    parser.add_argument("--spread", type=float, default=12.0, help="seconds over which reminders fall due")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return 0
+
+    lease = int(os.environ["SCHEDULER_LEASE_SECONDS"])
+    started = time.time()
+
+    log_dir = tempfile.mkdtemp(prefix="str-leader-logs-")
+    logs, processes = [], []
+    for index in range(args.processes):
+        logs.append(os.path.join(log_dir, f"{index}.log"))
+        open(logs[-1], "w").close()
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.check_leader", "--child", logs[-1]],
+            stderr=subprocess.DEVNULL,
+        ))
+
+    def leaders():
+        return [index for index, path in enumerate(logs) if read_log(path)[0] is not None]
+
+    failures = []
+    try:
+        if not wait_for(leaders, 30):
+            failures.append("no process was elected")
+            return 1
+        # Any that failed to migrate alongside the others have exited by now
+        time.sleep(1)
+        exited = [index for index, process in enumerate(processes) if process.poll() is not None]
+        if exited:
+            failures.append(f"processes {exited} exited at startup")
+        first = leaders()[0]
+        # Added behind the leader's back, as an API replica would; its
+        # reconcile picks them up
+        seed_reminders(args.reminders, args.spread)
+        # Kill the leader while reminders are still falling due
+        time.sleep(args.spread / 3)
+        processes[first].send_signal(signal.SIGKILL)
+        processes[first].wait()
+        killed_at = time.time()
+        print(f"killed leader {first} after {killed_at - started:.1f}s")
+
+        if not wait_for(lambda: len(leaders()) > 1, lease * 3):
+            failures.append("no process took over from the killed leader")
+        with SessionLocal() as db:
+            def all_sent():
+                return db.scalar(select(func.count()).where(Notification.sent == False)) == 0
+
+            if not wait_for(all_sent, args.spread + lease * 4):
+                failures.append("reminders left unsent")
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in processes:
+            process.wait()
+
+    all_ids = []
+    for index, path in enumerate(logs):
+        elected, sent = read_log(path)
+        all_ids += [notification_id for notification_id, _ in sent]
+        print(f"process {index}: elected={'-' if elected is None else f'{elected - started:.1f}s'} sent={len(sent)}")
+        if sent and (elected is None or min(at for _, at in sent) < elected):
+            failures.append(f"process {index} sent reminders without being elected")
+        if index != first and any(at < killed_at for _, at in sent):
+            failures.append(f"process {index} sent reminders while process {first} led")
+    takeover = [read_log(path)[0] for index, path in enumerate(logs) if index != first]
+    takeover = min((at for at in takeover if at is not None), default=None)
+    if takeover is not None:
+        print(f"took over {takeover - killed_at:.1f}s after the kill (lease {lease}s)")
+
+    duplicates = len(all_ids) - len(set(all_ids))
+    with SessionLocal() as db:
+        unsent = db.scalar(select(func.count()).where(Notification.sent == False))
+    # The killed leader may have committed a batch it never got to log
+    print(f"logged {len(all_ids)} of {args.reminders}, duplicates={duplicates}, unsent={unsent}")
+    if duplicates:
+        failures.append(f"{duplicates} reminders sent twice")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# check_query_budget.py
+"""Fail if an endpoint runs more SQL statements than its budget.
+
+Serves the app against a throwaway database with a user that owns enough
+tasks and notifications for an N+1 pattern to show, calls every endpoint
+and reads the per-request query count recorded by metrics.py:
+
+    python -m benchmarks.check_query_budget
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-budget-"), "budget.db")
+# One API process, so the 304 budgets can be checked
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "true")
+
+import metrics  # noqa: E402
+from benchmarks.common import Client, serve  # noqa: E402
+
+TASKS = 50
+
+
+def queries_for(client, method: str, path: str, route: str, body=None, headers=None):
+    """Run one request; returns (status, SQL statements it ran, response headers)"""
+    total, requests = metrics.REQUEST_QUERIES.snapshot().get((method, route), (0, 0))
+    status, response_headers, _ = client.request_raw(method, path, body, headers)
+    # The middleware records the request just after the response is sent
+    deadline = time.monotonic() + 5
+    while metrics.REQUEST_QUERIES.snapshot().get((method, route), (0, 0))[1] == requests:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{method} {route} was not recorded")
+        time.sleep(0.001)
+    return status, int(metrics.REQUEST_QUERIES.snapshot()[(method, route)][0] - total), response_headers
+
+
+def main() -> int:
+    import main as app_module
+    from sqlalchemy import insert
+
+    from database import SessionLocal
+    from models import Notification
+
+    with serve(app_module.app) as port:
+        anonymous = Client(port)
+        user = {"username": "budget", "email": "budget@example.com", "password": "budget-password"}
+        _, body = anonymous.request("POST", "/auth/register", user)
+        user_id = body["user"]["id"]
+        client = Client(port, body["access_token"])
+
+        due = (datetime.now() + timedelta(days=1)).isoformat()
+        _, created = client.request("POST", "/tasks/bulk", {"tasks": [{"title": f"Task {i}", "due_date": due} for i in range(TASKS)]})
+        task_ids = [item["id"] for item in created]
+        with SessionLocal() as db:
+            db.execute(insert(Notification), [
+                {"user_id": user_id, "task_id": task_id, "scheduled_for": datetime.now(), "message": "Sent",
+                 "sent": True, "sent_at": datetime.now()}
+                for task_id in task_ids
+            ])
+            db.commit()
+
+        _, headers, _ = client.request_raw("GET", "/tasks/?limit=10")
+        cursor = headers["X-Next-Cursor"]
+        _, headers, _ = client.request_raw("GET", "/notifications/?limit=10")
+        feed_cursor = headers["X-Next-Cursor"]
+        _, feed = client.request("GET", "/notifications/")
+        _, synced = client.request("GET", "/sync/")
+        login = {"email": user["email"], "password": user["password"]}
+
+        # (method, path, route template, body, budget); task writes add up to
+        # three statements for the task counters (operations/stats.py),
+        # deletes one for the tombstones (operations/sync.py) and writes that
+        # move reminders three for the reminder diff (operations/reminders.py)
+        cases = [
+            ("GET", "/tasks/?limit=100", "/tasks/", None, 1),
+            ("GET", f"/tasks/?limit=10&cursor={cursor}", "/tasks/", None, 2),
+            ("GET", f"/tasks/{task_ids[0]}", "/tasks/{task_id}", None, 1),
+            # Writes that remind at the owner's default offsets read them from the user row
+            ("POST", "/tasks/", "/tasks/", {"title": "New", "due_date": due}, 5),
+            ("PUT", f"/tasks/{task_ids[0]}", "/tasks/{task_id}", {"title": "Renamed"}, 6),
+            ("POST", "/tasks/bulk", "/tasks/bulk", {"tasks": [{"title": f"Bulk {i}", "due_date": due} for i in range(TASKS)]}, 5),
+            ("PUT", "/tasks/bulk", "/tasks/bulk", {"tasks": [{"id": task_id, "priority": 3} for task_id in task_ids]}, 5),
+            ("GET", "/tasks/export", "/tasks/export", None, 1),
+            ("GET", "/notifications/", "/notifications/", None, 1),
+            ("GET", f"/notifications/?limit=10&cursor={feed_cursor}", "/notifications/", None, 1),
+            ("GET", "/notifications/?unread=true", "/notifications/", None, 1),
+            ("GET", "/notifications/unread-count", "/notifications/unread-count", None, 1),
+            ("GET", "/notifications/summary", "/notifications/summary", None, 1),
+            ("GET", "/notifications/upcoming", "/notifications/upcoming", None, 1),
+            ("GET", "/notifications/overdue", "/notifications/overdue", None, 1),
+            ("GET", "/notifications/reminders", "/notifications/reminders", None, 1),
+            ("PUT", f"/notifications/{feed[0]['id']}", "/notifications/{notification_id}", None, 1),
+            ("POST", "/notifications/read", "/notifications/read", {"ids": [n["id"] for n in feed[:10]]}, 1),
+            ("POST", "/notifications/read", "/notifications/read", {"all": True}, 1),
+            ("GET", "/sync/", "/sync/", None, 2),
+            ("GET", f"/sync/?since={synced['token']}", "/sync/", None, 3),
+            ("DELETE", f"/tasks/{task_ids[1]}", "/tasks/{task_id}", None, 7),
+            ("DELETE", "/tasks/bulk", "/tasks/bulk", {"ids": task_ids[2:]}, 7),
+            ("POST", "/auth/login", "/auth/login", login, 1),
+            ("PUT", "/auth/me/reminder-offsets", "/auth/me/reminder-offsets", {"offsets": [1440, 60]}, 5),
+            ("GET", "/auth/me/reminder-offsets", "/auth/me/reminder-offsets", None, 1),
+        ]
+
+        failures = 0
+        for method, path, route, body, budget in cases:
+            status, count, _ = queries_for(client, method, path, route, body)
+            ok = status == 200 and count <= budget
+            failures += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] {method} {route}: {count} queries (budget {budget}), status {status}")
+
+        # Unchanged GETs are answered from the user's version alone
+        for path, route in (("/tasks/?limit=100", "/tasks/"), ("/notifications/summary", "/notifications/summary")):
+            _, _, headers = queries_for(client, "GET", path, route)
+            status, count, _ = queries_for(client, "GET", path, route, headers={"If-None-Match": headers["ETag"]})
+            ok = status == 304 and count == 0
+            failures += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] GET {route} with a current ETag: {count} queries (budget 0), status {status}")
+
+        # A token the cache has not seen yet costs one user lookup
+        _, body = anonymous.request("POST", "/auth/login", login)
+        fresh = Client(port, body["access_token"])
+        status, count, _ = queries_for(fresh, "GET", f"/tasks/{task_ids[0]}", "/tasks/{task_id}")
+        ok = status == 200 and count <= 2
+        failures += not ok
+        print(f"[{'ok' if ok else 'FAIL'}] GET /tasks/{{task_id}} with a new token: {count} queries (budget 2)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# check_query_plans.py
+"""Fail if a hot query falls back to a full table scan.
+
+Runs the real query functions against a migrated throwaway database,
+captures every query they issue and checks its EXPLAIN QUERY PLAN:
+
+    python -m benchmarks.check_query_plans
+"""
+import asyncio
+import inspect
+import os
+import re
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-plans-"), "plans.db")
+
+from datetime import datetime, timedelta  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+from sqlalchemy import event  # noqa: E402
+
+from benchmarks.common import seed_tasks, seed_users  # noqa: E402
+from database import AsyncSessionLocal, async_engine, dispose_engines, engine, run_migrations  # noqa: E402
+from operations import crud, features, notifications, sync  # noqa: E402
+from workers.delivery import claim_deliveries  # noqa: E402
+from workers.reminder_worker import process_due_reminders  # noqa: E402
+
+# Full scans of the tables themselves; "SCAN tasks_fts VIRTUAL TABLE INDEX"
+# is a full-text index lookup
+FORBIDDEN = re.compile(r"SCAN (tasks|notifications|notification_deliveries)\b")
+
+
+async def capture(fn):
+    """Run ``fn`` and return the queries (SELECT/UPDATE/DELETE) it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn()
+        if inspect.isawaitable(result):
+            await result
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def query_plan(statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+async def check() -> int:
+    db = AsyncSessionLocal()
+    now = datetime.now()
+    cases = {
+        "list tasks": lambda: crud.get_tasks_for_user(db, user_id=1),
+        "list tasks by status": lambda: crud.get_tasks_for_user(db, user_id=1, status="pending"),
+        "list tasks due window": lambda: crud.get_tasks_for_user(
+            db, user_id=1, due_after=now, due_before=now + timedelta(days=7), sort_by="due_date"
+        ),
+        "search tasks": lambda: crud.get_tasks_for_user(db, user_id=1, q="task 1", sort_by="relevance"),
+        "search tasks by due date": lambda: crud.get_tasks_for_user(db, user_id=1, q="task", sort_by="due_date"),
+        "get task": lambda: crud.get_task_for_user(db, 1, 1),
+        "upcoming": lambda: features.upcoming_tasks(db, 1),
+        "overdue": lambda: features.overdue_tasks(db, 1),
+        "reminders": lambda: features.reminders(db, 1),
+        "insights": lambda: features.insights(db, 1),
+        "sync since": lambda: sync.changes(db, 1, sync.encode_token(now - timedelta(hours=1))),
+        "notification feed": lambda: notifications.feed(db, 1),
+        "notification feed page": lambda: notifications.feed(
+            db, 1, cursor=notifications.encode_cursor(SimpleNamespace(created_at=now, id=10**6))
+        ),
+        "unread notifications": lambda: notifications.feed(db, 1, unread_only=True),
+        "unread count": lambda: notifications.unread_count(db, 1),
+        "mark all read": lambda: notifications.mark_read(db, 1),
+        "notification retention": notifications.purge_read,
+        "reminder worker": process_due_reminders,
+        "delivery claim": lambda: claim_deliveries("webhook", 100),
+    }
+
+    failures = 0
+    try:
+        for name, fn in cases.items():
+            for statement, parameters in await capture(fn):
+                plan = query_plan(statement, parameters)
+                bad = [step for step in plan if FORBIDDEN.match(step)]
+                if name == "list tasks":
+                    bad += [step for step in plan if "TEMP B-TREE" in step]
+                if name.startswith("unread") and not any("ix_notifications_user_unread" in step for step in plan):
+                    bad.append("not answered from the unread index")
+                status = "FAIL" if bad else "ok"
+                print(f"[{status}] {name}: {' | '.join(plan)}")
+                failures += bool(bad)
+    finally:
+        await db.close()
+        await dispose_engines()
+    return 1 if failures else 0
+
+
+def main() -> int:
+    run_migrations()
+    seed_users(engine, 20)
+    seed_tasks(engine, range(1, 21), 200)
+    return asyncio.run(check())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
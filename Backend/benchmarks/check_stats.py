@@ -0,0 +1,163 @@
+# check_stats.py
+"""Fail if the incrementally maintained task counters drift from the tasks.
+
+Runs a random mix of creates, updates, deletes and bulk operations through
+crud.py against a migrated throwaway database, then compares the stored
+counters and due-day buckets with a rebuild from scratch, and the summary
+with counts taken directly over the tasks:
+
+    python -m benchmarks.check_stats --operations 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-stats-"), "stats.db")
+
+from sqlalchemy import select  # noqa: E402
+
+from benchmarks.common import seed_users  # noqa: E402
+from database import AsyncSessionLocal, dispose_engines, engine, run_migrations  # noqa: E402
+from models import Task, TaskCounter, TaskDueBucket  # noqa: E402
+from operations import crud, features, stats  # noqa: E402
+from schemas import TaskBulkUpdate, TaskCreate, TaskUpdate  # noqa: E402
+
+USERS = 3
+CATEGORIES = ("General", "Work", None)
+RULES = ("FREQ=DAILY", "FREQ=WEEKLY;BYDAY=MO,TH;COUNT=5")
+
+
+def random_fields(rng: random.Random) -> dict:
+    now = datetime.now()
+    status = rng.choice(("pending", "pending", "done", "cancelled"))
+    due_date = now + timedelta(minutes=rng.randint(-96 * 60, 96 * 60)) if rng.random() < 0.8 else None
+    return {
+        "title": f"Task {rng.randint(0, 10**6)}",
+        # Mostly within a few days of today, so today's bucket is exercised
+        "due_date": due_date,
+        "priority": rng.randint(1, 3),
+        "status": status,
+        "completed": status == "done" or rng.random() < 0.1,
+        "category": rng.choice(CATEGORIES),
+        "recurrence": rng.choice(RULES) if due_date and rng.random() < 0.2 else None,
+    }
+
+
+def partial_fields(rng: random.Random) -> dict:
+    fields = random_fields(rng)
+    return {key: fields[key] for key in rng.sample(sorted(fields), rng.randint(1, 3))}
+
+
+async def run_operations(count: int, rng: random.Random):
+    task_ids = {user_id: [] for user_id in range(1, USERS + 1)}
+    async with AsyncSessionLocal() as db:
+        for _ in range(count):
+            user_id = rng.randint(1, USERS)
+            owned = task_ids[user_id]
+            operation = rng.random()
+            if operation < 0.3 or not owned:
+                owned.append((await crud.create_task(db, TaskCreate(**random_fields(rng)), user_id)).id)
+            elif operation < 0.6:
+                await crud.update_task(db, rng.choice(owned), TaskUpdate(**partial_fields(rng)), user_id)
+            elif operation < 0.7:
+                owned.remove(task_id := rng.choice(owned))
+                await crud.delete_task(db, task_id, user_id)
+            elif operation < 0.8:
+                tasks = [TaskCreate(**random_fields(rng)) for _ in range(rng.randint(1, 20))]
+                owned += [task.id for task in await crud.bulk_create_tasks(db, tasks, user_id)]
+            elif operation < 0.9:
+                updates = [
+                    TaskBulkUpdate(id=task_id, **partial_fields(rng))
+                    for task_id in rng.sample(owned, min(len(owned), rng.randint(1, 10)))
+                ]
+                # Someone else's task is skipped
+                other = task_ids[user_id % USERS + 1]
+                if other:
+                    updates.append(TaskBulkUpdate(id=other[0], priority=3))
+                await crud.bulk_update_tasks(db, updates, user_id)
+            else:
+                doomed = rng.sample(owned, min(len(owned), rng.randint(1, 10)))
+                await crud.bulk_delete_tasks(db, doomed, user_id)
+                task_ids[user_id] = [task_id for task_id in owned if task_id not in doomed]
+
+
+def counter_state() -> tuple:
+    with engine.connect() as conn:
+        counters = {(row.user_id, row.name): row.value for row in conn.execute(select(TaskCounter)) if row.value}
+        buckets = {
+            (row.user_id, row.due_day): (row.pending, row.pending_open)
+            for row in conn.execute(select(TaskDueBucket))
+            if row.pending or row.pending_open
+        }
+    return counters, buckets
+
+
+def summary_by_scan(user_id: int, now: datetime) -> dict:
+    today_start = datetime.combine(now.date(), datetime.min.time())
+    today_end = today_start + timedelta(days=1)
+    with engine.connect() as conn:
+        tasks = conn.execute(select(*stats.COUNTED_COLUMNS).where(Task.user_id == user_id)).all()
+    # Recurring tasks are not due by their first occurrence
+    dated = [task for task in tasks if task.due_date and not task.recurrence]
+    pending = [task for task in dated if task.status == "pending"]
+    return {
+        "total_tasks": len(tasks),
+        "completed_tasks": sum(bool(task.completed) for task in tasks),
+        "pending_tasks": sum(task.status == "pending" for task in tasks),
+        "overdue_tasks": sum(1 for task in pending if task.due_date < now and not task.completed),
+        "tasks_due_today": sum(
+            1 for task in dated if today_start <= task.due_date < today_end and not task.completed
+        ),
+        "upcoming_tasks": sum(1 for task in pending if task.due_date >= now),
+    }
+
+
+async def summaries() -> dict:
+    async with AsyncSessionLocal() as db:
+        return {user_id: await features.insights(db, user_id) for user_id in range(1, USERS + 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_migrations()
+    seed_users(engine, USERS)
+
+    async def run():
+        try:
+            await run_operations(args.operations, random.Random(args.seed))
+            return await summaries()
+        finally:
+            await dispose_engines()
+
+    insights = asyncio.run(run())
+    now = datetime.now()
+
+    failures = 0
+    maintained = counter_state()
+    with engine.begin() as conn:
+        stats.rebuild(conn)
+    rebuilt = counter_state()
+    for name, got, expected in (("counters", maintained[0], rebuilt[0]), ("due-day buckets", maintained[1], rebuilt[1])):
+        diff = {key: (got.get(key), expected.get(key)) for key in got.keys() | expected.keys() if got.get(key) != expected.get(key)}
+        failures += bool(diff)
+        print(f"[{'FAIL' if diff else 'ok'}] {name} match a rebuild ({len(expected)} rows){': ' + str(diff) if diff else ''}")
+
+    for user_id, summary in insights.items():
+        expected = summary_by_scan(user_id, now)
+        got = {key: summary[key] for key in expected}
+        ok = got == expected
+        failures += not ok
+        print(f"[{'ok' if ok else 'FAIL'}] user {user_id} summary {got if ok else (got, expected)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
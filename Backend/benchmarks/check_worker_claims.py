@@ -0,0 +1,95 @@
+# check_worker_claims.py
+"""Run several reminder workers against one database and check that every
+due reminder is sent exactly once.
+
+    python -m benchmarks.check_worker_claims --processes 4 --reminders 20000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-claims-"), "claims.db")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from benchmarks.common import seed_users  # noqa: E402
+from database import SessionLocal, engine, run_migrations  # noqa: E402
+from models import Notification, Task  # noqa: E402
+
+
+def seed_due_reminders(count: int, users: int = 100):
+    seed_users(engine, users)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [
+            {"id": user_id, "user_id": user_id, "title": "Task", "priority": 2, "status": "pending", "created_at": now}
+            for user_id in range(1, users + 1)
+        ])
+        conn.execute(insert(Notification), [
+            {
+                "user_id": i % users + 1,
+                "task_id": i % users + 1,
+                "scheduled_for": now - timedelta(seconds=i),
+                "sent": False,
+                "message": f"Reminder {i}",
+                "created_at": now,
+                "is_read": False,
+            }
+            for i in range(count)
+        ])
+
+
+def worker(batch_size: int, results):
+    # Each process gets its own connections and its own worker id
+    engine.dispose(close=False)
+    from workers import reminder_worker
+
+    sent_ids = []
+    reminder_worker.notification_hub.publish = lambda user_id, event: sent_ids.append(event["id"])
+    while reminder_worker.process_due_reminders(batch_size=batch_size):
+        pass
+    results.put((reminder_worker.WORKER_ID, sent_ids, reminder_worker.worker_stats))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--reminders", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    run_migrations()
+    seed_due_reminders(args.reminders)
+
+    results = multiprocessing.Queue()
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.batch_size, results))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    all_ids = [notification_id for _, ids, _ in reports for notification_id in ids]
+    with SessionLocal() as db:
+        unsent = db.scalar(select(func.count()).where(Notification.sent == False))
+
+    for worker_id, ids, stats in reports:
+        rate = stats["reminders"] / stats["seconds"] if stats["seconds"] else 0
+        print(f"{worker_id}: {len(ids)} sent in {stats['batches']} batches ({rate:.0f}/s)")
+    duplicates = len(all_ids) - len(set(all_ids))
+    print(f"total {len(all_ids)} in {elapsed:.2f}s, duplicates={duplicates}, unsent={unsent}")
+    return 0 if duplicates == 0 and unsent == 0 and len(all_ids) == args.reminders else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# common.py
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the Backend directory, e.g.
+``python -m benchmarks.bench_insights``.
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, async_database_url
+from models import Notification, Task, User
+from operations import stats
+
+STATUSES = ("pending", "pending", "pending", "done", "cancelled")
+CATEGORIES = ("General", "Work", "Personal", "Shopping")
+
+
+def temp_database(name: str = "bench.db"):
+    """Create a throwaway SQLite database with the application schema.
+
+    Returns a sync engine for seeding and an async session factory for the
+    code under test.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="str-bench-"), name)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(async_database_url(f"sqlite:///{path}"))
+    return engine, async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def seed_users(engine, count: int, start_id: int = 1, hashed_password: str = "x"):
+    rows = [
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "hashed_password": hashed_password,
+        }
+        for user_id in range(start_id, start_id + count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(User), rows)
+
+
+def seed_tasks(engine, user_ids, tasks_per_user: int, batch_size: int = 20000, seed: int = 0):
+    """Bulk insert synthetic tasks spread across ``user_ids``, then rebuild
+    the task counters they bypassed"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    batch = []
+    with engine.begin() as conn:
+        for user_id in user_ids:
+            for _ in range(tasks_per_user):
+                created_at = now - timedelta(days=rng.randint(0, 365))
+                status = rng.choice(STATUSES)
+                batch.append({
+                    "user_id": user_id,
+                    "title": f"Task {rng.randint(0, 10**6)}",
+                    "description": None,
+                    "completed": status == "done",
+                    "due_date": now + timedelta(hours=rng.randint(-24 * 60, 24 * 60)) if rng.random() < 0.8 else None,
+                    "priority": rng.randint(1, 3),
+                    "status": status,
+                    "category": rng.choice(CATEGORIES),
+                    "reminder_enabled": True,
+                    "created_at": created_at,
+                })
+                if len(batch) >= batch_size:
+                    conn.execute(insert(Task), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(Task), batch)
+        stats.rebuild(conn)
+
+
+def seed_notifications(engine, user_ids, per_user: int, due_share: float = 0.0, batch_size: int = 20000, seed: int = 0):
+    """Bulk insert reminders for tasks already seeded for ``user_ids``.
+
+    Most are sent (the notification feed); ``due_share`` of them are unsent
+    and already due, for the reminder worker to pick up.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    batch = []
+    with engine.begin() as conn:
+        for user_id in user_ids:
+            task_ids = conn.scalars(select(Task.id).where(Task.user_id == user_id).limit(per_user)).all()
+            for task_id in task_ids:
+                scheduled_for = now - timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+                due = rng.random() < due_share
+                batch.append({
+                    "user_id": user_id,
+                    "task_id": task_id,
+                    "scheduled_for": scheduled_for,
+                    "sent": not due,
+                    "sent_at": None if due else scheduled_for,
+                    "is_read": rng.random() < 0.5,
+                    "message": f"Reminder for task {task_id}",
+                    "created_at": scheduled_for,
+                })
+                if len(batch) >= batch_size:
+                    conn.execute(insert(Notification), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(Notification), batch)
+
+
+def measure(fn, repeat: int = 50, warmup: int = 3) -> dict:
+    """Call ``fn`` repeatedly and return latency percentiles in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _summary(samples)
+
+
+async def measure_async(fn, repeat: int = 50, warmup: int = 3) -> dict:
+    """Await ``fn()`` repeatedly and return latency percentiles in milliseconds"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _summary(samples)
+
+
+def _summary(samples) -> dict:
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p95": samples[int(len(samples) * 0.95) - 1],
+        "max": samples[-1],
+    }
+
+
+def percentiles(samples) -> dict:
+    """p50/p95/p99 of a list of millisecond samples"""
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return {"count": len(samples), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+@contextmanager
+def serve(app, port: int = 0):
+    """Run ``app`` with uvicorn in a background thread and yield its base URL"""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", port))
+    config = uvicorn.Config(app, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+class Client:
+    """Minimal keep-alive JSON client for driving a served app"""
+
+    def __init__(self, port: int, token: str = None):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port)
+        self.token = token
+
+    def request_raw(self, method: str, path: str, body=None, headers: dict = None):
+        """Send a JSON ``body``; returns (status, headers, raw response bytes)"""
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        self.conn.request(method, path, body=payload, headers=headers)
+        response = self.conn.getresponse()
+        return response.status, response.headers, response.read()
+
+    def request(self, method: str, path: str, body=None):
+        status, _, data = self.request_raw(method, path, body)
+        return status, (json.loads(data) if data else None)
@@ -0,0 +1,65 @@
+# compare.py
+"""Compare two benchmarks.suite result files and fail on regressions.
+
+A scenario regresses when its p95 latency grows, or its throughput drops,
+by more than the allowed fraction (default 20%). Both files should come from
+the same machine, dataset and arguments:
+
+    python -m benchmarks.compare baseline.json candidate.json
+    python -m benchmarks.compare baseline.json candidate.json --max-latency-increase 0.1
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline: dict, candidate: dict, max_latency_increase: float, max_throughput_drop: float) -> list:
+    """Print a side-by-side table; returns the regressions found"""
+    if baseline.get("dataset") != candidate.get("dataset"):
+        print(f"warning: datasets differ: {baseline.get('dataset')} vs {candidate.get('dataset')}")
+
+    regressions = []
+    for name, before in baseline["results"].items():
+        after = candidate["results"].get(name)
+        if after is None:
+            print(f"{name:<20} missing from candidate")
+            continue
+
+        rate_change = after["per_second"] / before["per_second"] - 1 if before["per_second"] else 0.0
+        line = f"{name:<20} {before['per_second']:9.0f}/s -> {after['per_second']:9.0f}/s ({rate_change:+.0%})"
+        if rate_change < -max_throughput_drop:
+            regressions.append(f"{name}: throughput {rate_change:+.0%}")
+
+        if "p95_ms" in before:
+            latency_change = after["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+            line += f"   p95 {before['p95_ms']:8.1f}ms -> {after['p95_ms']:8.1f}ms ({latency_change:+.0%})"
+            if latency_change > max_latency_increase:
+                regressions.append(f"{name}: p95 {latency_change:+.0%}")
+            if after.get("errors", 0) > before.get("errors", 0):
+                regressions.append(f"{name}: {after['errors']} errors (was {before.get('errors', 0)})")
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-latency-increase", type=float, default=0.2)
+    parser.add_argument("--max-throughput-drop", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta']['commit']}, candidate {candidate['meta']['commit']}")
+    regressions = compare(baseline, candidate, args.max_latency_increase, args.max_throughput_drop)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# suite.py
+"""Reproducible load test of the hot paths, with results saved as JSON.
+
+Seeds a synthetic dataset (users x tasks x notifications) into a fresh
+database, measures reminder processing, then serves the app in-process and
+drives each endpoint scenario with concurrent keep-alive clients:
+
+    python -m benchmarks.suite --users 1000 --tasks-per-user 100 --output results/main.json
+    python -m benchmarks.compare results/main.json results/branch.json
+
+The same arguments and --seed give the same dataset, so two runs differ only
+by the code under test (and the machine).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="str-suite-"), "suite.db"))
+
+from benchmarks.common import Client, percentiles, seed_notifications, seed_tasks, seed_users, serve  # noqa: E402
+
+PASSWORD = "benchmark-password"
+
+# name -> (method, path, json body or None); "{email}" is filled in per client
+SCENARIOS = {
+    "list_tasks": ("GET", "/tasks/?limit=50", None),
+    "summary": ("GET", "/notifications/summary", None),
+    "upcoming": ("GET", "/notifications/upcoming", None),
+    "login": ("POST", "/auth/login", {"email": "{email}", "password": PASSWORD}),
+}
+
+
+def seed(args) -> dict:
+    """Seed the dataset into DATABASE_URL; returns its sizes"""
+    from auth.security import hash_password
+    from database import engine, run_migrations
+
+    started = time.perf_counter()
+    run_migrations()
+    user_ids = list(range(1, args.users + 1))
+    # One bcrypt hash for every user keeps seeding fast at millions of rows
+    seed_users(engine, args.users, hashed_password=hash_password(PASSWORD))
+    seed_tasks(engine, user_ids, args.tasks_per_user, seed=args.seed)
+    seed_notifications(
+        engine, user_ids, args.notifications_per_user,
+        due_share=args.due_share, seed=args.seed,
+    )
+    dataset = {
+        "users": args.users,
+        "tasks": args.users * args.tasks_per_user,
+        "notifications": args.users * min(args.notifications_per_user, args.tasks_per_user),
+        "seed": args.seed,
+    }
+    print(f"seeded {dataset['tasks']} tasks and {dataset['notifications']} notifications "
+          f"in {time.perf_counter() - started:.1f}s")
+    return dataset
+
+
+def run_reminders() -> dict:
+    """Time the reminder worker over every seeded due reminder"""
+    from workers.reminder_worker import process_due_reminders
+
+    started = time.perf_counter()
+    sent = process_due_reminders()
+    elapsed = time.perf_counter() - started
+    return {"reminders": sent, "seconds": elapsed, "per_second": sent / elapsed if elapsed else 0.0}
+
+
+def client_loop(client, method, path, body, stop, samples, errors):
+    while not stop.is_set():
+        started = time.perf_counter()
+        status, _, _ = client.request_raw(method, path, body)
+        samples.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+
+
+def run_scenario(port, name: str, clients: int, seconds: float, users: int, rng: random.Random) -> dict:
+    from auth.security import create_access_token
+
+    method, path, body = SCENARIOS[name]
+    stop = threading.Event()
+    samples, errors = [], []
+    threads = []
+    for _ in range(clients):
+        user_id = rng.randint(1, users)
+        client = Client(port, create_access_token({"sub": str(user_id)}))
+        client_body = json.loads(json.dumps(body).replace("{email}", f"user{user_id}@example.com")) if body else None
+        threads.append(threading.Thread(
+            target=client_loop, args=(client, method, path, client_body, stop, samples, errors)
+        ))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    stats = percentiles(samples)
+    result = {
+        "clients": clients,
+        "requests": stats["count"],
+        "per_second": stats["count"] / seconds,
+        "p50_ms": stats["p50"],
+        "p95_ms": stats["p95"],
+        "p99_ms": stats["p99"],
+        "errors": len(errors),
+    }
+    print(f"{name:<12} {result['per_second']:8.0f} req/s  p50={stats['p50']:7.1f}ms  "
+          f"p95={stats['p95']:7.1f}ms  p99={stats['p99']:7.1f}ms  errors={len(errors)}")
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks-per-user", type=int, default=100)
+    parser.add_argument("--notifications-per-user", type=int, default=20)
+    parser.add_argument("--due-share", type=float, default=0.25, help="share of notifications left due for the worker")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--login-clients", type=int, default=4, help="bcrypt-bound, so fewer by default")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    dataset = seed(args)
+    results = {"reminder_processing": run_reminders()}
+    print(f"reminders    {results['reminder_processing']['per_second']:8.0f} /s "
+          f"({results['reminder_processing']['reminders']} sent)")
+
+    import main as app_module
+
+    rng = random.Random(args.seed)
+    with serve(app_module.app) as port:
+        for name in args.scenarios:
+            clients = args.login_clients if name == "login" else args.clients
+            results[name] = run_scenario(port, name, clients, args.seconds, args.users, rng)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "seconds": args.seconds,
+        },
+        "dataset": dataset,
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
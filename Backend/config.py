@@ -0,0 +1,124 @@
+# config.py
+from typing import List
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Application settings, overridable through environment variables or a .env file"""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./tasks.db"
+
+    # Connection pools (see database.py); GET routes use the read pool
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: float = 30
+    db_read_pool_size: int = 4
+    db_read_max_overflow: int = 0
+    # SQLite has one writer at a time; more write connections only spin in busy_timeout
+    sqlite_write_pool_size: int = 1
+
+    # Server databases (PostgreSQL): drop dead connections, cap query time
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    db_statement_timeout_ms: int = 30000
+
+    # SQLite profile, applied to every new connection
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64 * 1024  # negative: KiB, so 64 MiB per connection
+    # Enforce foreign keys as PostgreSQL does; off by default, since older
+    # SQLite databases may hold rows that violate them
+    sqlite_foreign_keys: bool = False
+
+    # Statements at least this slow go to the "slow_query" log (see metrics.py)
+    slow_query_ms: float = 100
+
+    # Verified-token cache used by get_current_user
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: float = 300
+
+    # ETags and rendered GET responses (see response_cache.py); 0 bytes
+    # keeps the ETags but caches no bodies. Off by default: the versions
+    # are per process, so only turn it on with a single API process
+    response_cache_enabled: bool = False
+    response_cache_bytes: int = 32 * 1024 * 1024
+    # How long clock-dependent views (upcoming, overdue, summary) are reused
+    response_cache_window_seconds: int = 60
+
+    # List endpoints select only the response columns and encode them with
+    # orjson instead of loading ORM objects (see fast_json.py)
+    fast_json: bool = False
+
+    # How far ahead GET /notifications/upcoming lists the occurrences of
+    # recurring tasks when no ``until`` is given
+    recurrence_window_days: int = 7
+
+    # GET /sync (see operations/sync.py): how far back each new token
+    # reaches, and how long deletes are remembered before a full resync
+    sync_overlap_seconds: int = 30
+    sync_tombstone_days: int = 30
+
+    # Read notifications older than this are deleted, this many rows per
+    # transaction (see operations/notifications.py); 0 keeps them forever
+    notification_retention_days: int = 90
+    notification_retention_chunk: int = 5000
+
+    # Password hashing (see auth/hashing.py)
+    bcrypt_rounds: int = 12
+    hash_workers: int = 2
+    hash_queue_limit: int = 32
+
+    # Minutes before due date to remind at, for users without their own
+    # default and tasks without their own list (see operations/reminders.py)
+    reminder_offsets_minutes: List[int] = [30]
+
+    # Reminder dispatch (see workers/scheduler.py)
+    reminder_heap_size: int = 1000
+    reminder_reconcile_seconds: int = 60
+    reminder_batch_size: int = 500
+    reminder_lease_seconds: int = 120
+
+    # Where the scheduler runs (see workers/leader.py): "leader" in whichever
+    # API or worker process holds the lease, "off" in no API process (run
+    # ``python -m workers.run`` instead)
+    scheduler_mode: str = "leader"
+    # A leader renews its lease every third of this; a dead one is replaced
+    # within it
+    scheduler_lease_seconds: int = 30
+    # Streams in processes that do not send reminders poll for them this often
+    notification_poll_seconds: int = 5
+
+    # External channels sent reminders are also delivered through (see
+    # workers/delivery.py), e.g. ["webhook", "smtp"]; in-app needs none
+    delivery_channels: List[str] = []
+    # Per channel: sends in flight, and deliveries claimed ahead of them
+    delivery_concurrency: int = 8
+    delivery_queue_size: int = 100
+    delivery_timeout_seconds: float = 10
+    # Retries back off from delivery_backoff_seconds, doubling up to the
+    # max; a delivery is dead after delivery_max_attempts
+    delivery_max_attempts: int = 5
+    delivery_backoff_seconds: float = 30
+    delivery_backoff_max_seconds: float = 3600
+    # At least; raised when a full queue takes longer to drain (see
+    # workers/delivery.py lease_seconds)
+    delivery_lease_seconds: int = 120
+    delivery_poll_seconds: float = 5
+
+    # Webhook channel: every reminder is POSTed here as JSON
+    webhook_url: str = ""
+    # SMTP channel: reminders are mailed to the user's address
+    smtp_host: str = "localhost"
+    smtp_port: int = 25
+    smtp_starttls: bool = False
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_sender: str = "reminders@localhost"
+
+
+settings = Settings()
@@ -1,8 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from workers.scheduler import start_scheduler
-from database import Base, engine
-from routes import auth, tasks, notifications
+from fastapi.responses import PlainTextResponse
+import metrics
+from auth.token_cache import token_cache
+from response_cache import response_cache
+from workers.delivery import delivery_stats
+from workers.reminder_worker import worker_stats
+from workers.scheduler import scheduler_election
+from auth.hashing import shutdown_executor
+from config import settings
+from database import dispose_engines, run_migrations
+from routes import auth, tasks, notifications, sync
 
 app = FastAPI(title="Task Manager API")
 app.add_middleware(
@@ -11,14 +19,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 
-Base.metadata.create_all(bind=engine)
-
 @app.on_event("startup")
 def startup_event():
-    start_scheduler()
+    run_migrations()
+    # Every replica campaigns; only the lease holder runs the scheduler
+    if settings.scheduler_mode == "leader":
+        scheduler_election.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler_election.stop()
+    shutdown_executor()
+    await dispose_engines()
 
 @app.get("/")
 def root():
@@ -29,6 +46,29 @@ def root():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    cache = token_cache.stats()
+    responses = response_cache.stats()
+    extra = (
+        metrics.sample("reminders_sent_total", "Reminders sent by the worker", worker_stats["reminders"])
+        + metrics.sample("reminder_batches_total", "Reminder batches processed", worker_stats["batches"])
+        + metrics.sample("reminder_batch_seconds_total", "Time spent sending reminder batches", worker_stats["seconds"])
+        + metrics.sample("deliveries_delivered_total", "Reminders delivered through external channels", delivery_stats["delivered"])
+        + metrics.sample("deliveries_retried_total", "Failed deliveries scheduled for a retry", delivery_stats["retried"])
+        + metrics.sample("deliveries_dead_total", "Deliveries given up on", delivery_stats["dead"])
+        + metrics.sample("auth_cache_hits_total", "Token cache hits", cache["hits"])
+        + metrics.sample("auth_cache_misses_total", "Token cache misses", cache["misses"])
+        + metrics.sample("auth_cache_size", "Tokens in the cache", cache["size"], "gauge")
+        + metrics.sample("response_cache_hits_total", "GET responses served from the cache", responses["hits"])
+        + metrics.sample("response_cache_misses_total", "GET responses rendered", responses["misses"])
+        + metrics.sample("response_not_modified_total", "GET requests answered with 304", responses["not_modified"])
+        + metrics.sample("response_cache_bytes", "Bytes of cached response bodies", responses["bytes"], "gauge")
+    )
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
 app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+app.include_router(sync.router, prefix="/sync", tags=["Sync"])
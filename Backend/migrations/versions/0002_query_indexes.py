@@ -0,0 +1,40 @@
+"""Composite indexes for the hot task and notification filters
+
+Revision ID: 0002_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_tasks_user_status_due", "tasks",
+        ["user_id", "status", "due_date", "completed", "created_at"],
+    )
+    op.create_index("ix_tasks_user_due", "tasks", ["user_id", "due_date"])
+    op.create_index("ix_tasks_user_created", "tasks", ["user_id", "created_at"])
+
+    op.create_index(
+        "ix_notifications_unsent_due", "notifications", ["scheduled_for"],
+        sqlite_where=sa.text("sent = 0"),
+        postgresql_where=sa.text("sent = false"),
+    )
+    op.create_index("ix_notifications_user_sent_created", "notifications", ["user_id", "sent", "created_at"])
+    op.create_index("ix_notifications_task", "notifications", ["task_id"])
+
+
+def downgrade():
+    op.drop_index("ix_notifications_task", table_name="notifications")
+    op.drop_index("ix_notifications_user_sent_created", table_name="notifications")
+    op.drop_index("ix_notifications_unsent_due", table_name="notifications")
+    op.drop_index("ix_tasks_user_created", table_name="tasks")
+    op.drop_index("ix_tasks_user_due", table_name="tasks")
+    op.drop_index("ix_tasks_user_status_due", table_name="tasks")
@@ -0,0 +1,27 @@
+"""Record when notifications are sent, for resuming notification streams
+
+Revision ID: 0003_notification_sent_at
+Revises: 0002_query_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_notification_sent_at"
+down_revision = "0002_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.add_column(sa.Column("sent_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE notifications SET sent_at = scheduled_for WHERE sent = true")
+    op.create_index("ix_notifications_user_sent_at", "notifications", ["user_id", "sent_at"])
+
+
+def downgrade():
+    op.drop_index("ix_notifications_user_sent_at", table_name="notifications")
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("sent_at")
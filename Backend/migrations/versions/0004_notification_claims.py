@@ -0,0 +1,26 @@
+"""Claim/lease columns so several reminder workers can run safely
+
+Revision ID: 0004_notification_claims
+Revises: 0003_notification_sent_at
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_notification_claims"
+down_revision = "0003_notification_sent_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.add_column(sa.Column("claimed_by", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("claimed_until", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("claimed_until")
+        batch_op.drop_column("claimed_by")
@@ -0,0 +1,105 @@
+"""Per-user task counters and due-day buckets for the dashboard summary
+
+Revision ID: 0006_task_counters
+Revises: 0005_task_search
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_task_counters"
+down_revision = "0005_task_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_counters",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "task_due_buckets",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("due_day", sa.Date(), primary_key=True),
+        sa.Column("pending", sa.Integer(), nullable=False),
+        sa.Column("pending_open", sa.Integer(), nullable=False),
+    )
+
+    _backfill(op.get_bind())
+
+
+# The counters of the existing tasks, as operations/stats.py computed them
+# when this revision was written; spelled out here so the migration does not
+# change with the application code
+tasks = sa.table(
+    "tasks",
+    sa.column("user_id", sa.Integer),
+    sa.column("status", sa.String),
+    sa.column("completed", sa.Boolean),
+    sa.column("priority", sa.Integer),
+    sa.column("category", sa.String),
+    sa.column("due_date", sa.DateTime),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def _backfill(connection):
+    def counted(name, *group_by, where=None):
+        query = sa.select(tasks.c.user_id, name, sa.func.count())
+        if where is not None:
+            query = query.where(where)
+        return query.group_by(tasks.c.user_id, *group_by)
+
+    category = sa.literal("category:") + sa.func.coalesce(tasks.c.category, "")
+    priority = sa.literal("priority:") + sa.cast(tasks.c.priority, sa.String)
+    status = sa.literal("status:") + tasks.c.status
+    completed = tasks.c.completed == sa.true()
+    completed_with_due = sa.and_(completed, tasks.c.due_date.isnot(None))
+
+    counters = sa.table("task_counters", sa.column("user_id"), sa.column("name"), sa.column("value"))
+    connection.execute(counters.insert().from_select(
+        ["user_id", "name", "value"],
+        sa.union_all(
+            counted(sa.literal("total")),
+            counted(sa.literal("completed"), where=completed),
+            counted(status, status),
+            counted(priority, priority),
+            counted(category, category),
+            counted(sa.literal("completion_days_count"), where=completed_with_due),
+        ),
+    ))
+
+    # Whole days, floored in Python
+    completion_days = {}
+    for row in connection.execute(sa.select(tasks.c.user_id, tasks.c.due_date, tasks.c.created_at).where(completed_with_due)):
+        completion_days[row.user_id] = completion_days.get(row.user_id, 0) + (row.due_date - row.created_at).days
+    if completion_days:
+        connection.execute(counters.insert(), [
+            {"user_id": user_id, "name": "completion_days_sum", "value": days}
+            for user_id, days in completion_days.items()
+        ])
+
+    buckets = sa.table(
+        "task_due_buckets", sa.column("user_id"), sa.column("due_day"), sa.column("pending"), sa.column("pending_open")
+    )
+    due_day = sa.func.date(tasks.c.due_date)
+    connection.execute(buckets.insert().from_select(
+        ["user_id", "due_day", "pending", "pending_open"],
+        sa.select(
+            tasks.c.user_id,
+            due_day,
+            sa.func.count(),
+            sa.func.sum(sa.case((completed, 0), else_=1)),
+        )
+        .where(tasks.c.status == "pending", tasks.c.due_date.isnot(None))
+        .group_by(tasks.c.user_id, due_day),
+    ))
+
+
+def downgrade():
+    op.drop_table("task_due_buckets")
+    op.drop_table("task_counters")
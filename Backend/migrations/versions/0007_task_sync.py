@@ -0,0 +1,32 @@
+"""Tombstones of deleted tasks and an updated_at index for GET /sync
+
+Revision ID: 0007_task_sync
+Revises: 0006_task_counters
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_task_sync"
+down_revision = "0006_task_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_task_tombstones_user_deleted", "task_tombstones", ["user_id", "deleted_at"])
+    op.create_index("ix_tasks_user_updated", "tasks", ["user_id", "updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_tasks_user_updated", table_name="tasks")
+    op.drop_index("ix_task_tombstones_user_deleted", table_name="task_tombstones")
+    op.drop_table("task_tombstones")
@@ -0,0 +1,34 @@
+"""Recurrence rules on tasks
+
+Revision ID: 0008_task_recurrence
+Revises: 0007_task_sync
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_task_recurrence"
+down_revision = "0007_task_sync"
+branch_labels = None
+depends_on = None
+
+
+# Plain ALTER TABLE rather than batch mode: recreating ``tasks`` on SQLite
+# would drop the full-text search triggers of 0005 (DROP COLUMN needs
+# SQLite 3.35+)
+def upgrade():
+    op.add_column("tasks", sa.Column("recurrence", sa.String(), nullable=True))
+    op.add_column("tasks", sa.Column("recurrence_end", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_tasks_user_recurring", "tasks", ["user_id", "status", "due_date"],
+        sqlite_where=sa.text("recurrence IS NOT NULL"),
+        postgresql_where=sa.text("recurrence IS NOT NULL"),
+    )
+    # No task recurs yet, so the due-day buckets filled by 0006 need no change
+
+
+def downgrade():
+    op.drop_index("ix_tasks_user_recurring", table_name="tasks")
+    op.drop_column("tasks", "recurrence_end")
+    op.drop_column("tasks", "recurrence")
@@ -0,0 +1,27 @@
+"""Configurable reminder offsets per task and per user
+
+Revision ID: 0009_reminder_offsets
+Revises: 0008_task_recurrence
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_reminder_offsets"
+down_revision = "0008_task_recurrence"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("reminder_offsets", sa.JSON(), nullable=True))
+    op.add_column("users", sa.Column("reminder_offsets", sa.JSON(), nullable=True))
+    op.add_column("notifications", sa.Column("lead_minutes", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("notifications", "lead_minutes")
+    op.drop_column("users", "reminder_offsets")
+    # See 0008: plain DROP COLUMN keeps the search triggers on tasks
+    op.drop_column("tasks", "reminder_offsets")
@@ -0,0 +1,32 @@
+"""Partial indexes for unread notifications and notification retention
+
+Revision ID: 0010_notification_feed
+Revises: 0009_reminder_offsets
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_notification_feed"
+down_revision = "0009_reminder_offsets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_notifications_user_unread", "notifications", ["user_id", "sent", "is_read", "created_at"],
+        sqlite_where=sa.text("sent = 1 AND is_read = 0"),
+        postgresql_where=sa.text("sent = true AND is_read = false"),
+    )
+    op.create_index(
+        "ix_notifications_read_created", "notifications", ["created_at"],
+        sqlite_where=sa.text("is_read = 1"),
+        postgresql_where=sa.text("is_read = true"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notifications_read_created", table_name="notifications")
+    op.drop_index("ix_notifications_user_unread", table_name="notifications")
@@ -0,0 +1,27 @@
+"""Lease electing the one process that runs the scheduler
+
+Revision ID: 0011_scheduler_lease
+Revises: 0010_notification_feed
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_scheduler_lease"
+down_revision = "0010_notification_feed"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "scheduler_leases",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("holder", sa.String(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("scheduler_leases")
@@ -0,0 +1,44 @@
+"""Deliveries of sent notifications through external channels
+
+Revision ID: 0012_notification_deliveries
+Revises: 0011_scheduler_lease
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_notification_deliveries"
+down_revision = "0011_scheduler_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notification_deliveries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "notification_id", sa.Integer(),
+            sa.ForeignKey("notifications.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("claimed_until", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("delivered_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("notification_id", "channel"),
+    )
+    op.create_index(
+        "ix_notification_deliveries_pending", "notification_deliveries", ["channel", "next_attempt_at"],
+        sqlite_where=sa.text("status = 'pending'"),
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notification_deliveries_pending", table_name="notification_deliveries")
+    op.drop_table("notification_deliveries")
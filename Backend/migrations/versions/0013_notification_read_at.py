@@ -0,0 +1,24 @@
+"""When a notification was marked read, so delta sync picks up read state
+
+Revision ID: 0013_notification_read_at
+Revises: 0012_notification_deliveries
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_notification_read_at"
+down_revision = "0012_notification_deliveries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("notifications", sa.Column("read_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_notifications_user_read_at", "notifications", ["user_id", "read_at"])
+
+
+def downgrade():
+    op.drop_index("ix_notifications_user_read_at", table_name="notifications")
+    op.drop_column("notifications", "read_at")
@@ -0,0 +1,87 @@
+"""Index task categories for full-text search too
+
+Rebuilds the search indexes of 0005 with a third column: the SQLite FTS5
+table and its triggers are recreated, and the PostgreSQL generated column
+is recomputed with the category at the description's weight.
+
+Revision ID: 0014_task_search_category
+Revises: 0013_notification_read_at
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0014_task_search_category"
+down_revision = "0013_notification_read_at"
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_index(columns):
+    listed = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        "DROP TRIGGER IF EXISTS tasks_fts_update",
+        "DROP TRIGGER IF EXISTS tasks_fts_delete",
+        "DROP TRIGGER IF EXISTS tasks_fts_insert",
+        "DROP TABLE IF EXISTS tasks_fts",
+        f"""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            {listed},
+            content='tasks', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, {listed}) VALUES (new.id, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, {listed}) VALUES ('delete', old.id, {old});
+        END
+        """,
+        # Only text edits touch the index, not status or priority changes
+        f"""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF {listed} ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, {listed}) VALUES ('delete', old.id, {old});
+            INSERT INTO tasks_fts(rowid, {listed}) VALUES (new.id, {new});
+        END
+        """,
+        "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_index(weighted):
+    vector = " ||\n".join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')" for column, weight in weighted
+    )
+    return [
+        "DROP INDEX IF EXISTS ix_tasks_search_vector",
+        "ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector",
+        f"ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    ]
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(_sqlite_index(["title", "description", "category"]))
+    elif dialect == "postgresql":
+        _run(_postgresql_index([("title", "A"), ("description", "B"), ("category", "B")]))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(_sqlite_index(["title", "description"]))
+    elif dialect == "postgresql":
+        _run(_postgresql_index([("title", "A"), ("description", "B")]))
@@ -1,11 +1,29 @@
 # models.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import JSON, Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index, UniqueConstraint, false, true
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # upcoming/overdue filters and status-filtered listings; the trailing
+        # columns make it a covering index for the insights aggregate
+        Index("ix_tasks_user_status_due", "user_id", "status", "due_date", "completed", "created_at"),
+        # reminders window, due_before/due_after filters and due-date sorting
+        Index("ix_tasks_user_due", "user_id", "due_date"),
+        # default GET /tasks ordering (created_at desc)
+        Index("ix_tasks_user_created", "user_id", "created_at"),
+        # GET /sync: tasks changed since a watermark
+        Index("ix_tasks_user_updated", "user_id", "updated_at"),
+        # recurring tasks only, so expanding them costs per rule, not per
+        # past task (upcoming and reminders)
+        Index(
+            "ix_tasks_user_recurring", "user_id", "status", "due_date",
+            sqlite_where=Column("recurrence").isnot(None),
+            postgresql_where=Column("recurrence").isnot(None),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,15 +37,50 @@ class Task(Base):
     status = Column(String, nullable=False, default="pending")  # "pending"/"cancelled"/"done"
     category = Column(String, nullable=True, default="General")
     reminder_enabled = Column(Boolean, default=True)
+    # Minutes before due_date to remind at; NULL: the user's default
+    reminder_offsets = Column(JSON(none_as_null=True), nullable=True)
     
     created_at = Column(DateTime, nullable=False, default=datetime.now)
     updated_at = Column(DateTime, nullable=True, onupdate=datetime.now)
 
+    # RRULE of a recurring task, whose first occurrence is due_date (see
+    # operations/recurrence.py), and the last time it can occur, if bounded
+    recurrence = Column(String, nullable=True)
+    recurrence_end = Column(DateTime, nullable=True)
+
     user = relationship("User", back_populates="tasks")
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # reminder worker: unsent reminders ordered by due time
+        Index(
+            "ix_notifications_unsent_due", "scheduled_for",
+            sqlite_where=Column("sent") == false(),
+            postgresql_where=Column("sent") == false(),
+        ),
+        # notification feed per user
+        Index("ix_notifications_user_sent_created", "user_id", "sent", "created_at"),
+        Index("ix_notifications_task", "task_id"),
+        # resuming notification streams after a reconnect
+        Index("ix_notifications_user_sent_at", "user_id", "sent_at"),
+        # GET /sync: notifications read since a watermark
+        Index("ix_notifications_user_read_at", "user_id", "read_at"),
+        # unread counts and unread feed pages; sent and is_read are repeated
+        # as columns so the planner prefers it to the feed index
+        Index(
+            "ix_notifications_user_unread", "user_id", "sent", "is_read", "created_at",
+            sqlite_where=(Column("sent") == true()) & (Column("is_read") == false()),
+            postgresql_where=(Column("sent") == true()) & (Column("is_read") == false()),
+        ),
+        # retention: read notifications by age
+        Index(
+            "ix_notifications_read_created", "created_at",
+            sqlite_where=Column("is_read") == true(),
+            postgresql_where=Column("is_read") == true(),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
@@ -35,14 +88,98 @@ class Notification(Base):
 
     scheduled_for = Column(DateTime, nullable=False)
     sent = Column(Boolean, default=False)
+    sent_at = Column(DateTime, nullable=True)
+    # Lease taken by a reminder worker while it sends this notification
+    claimed_by = Column(String, nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
     message = Column(String, nullable=False)
+    # Minutes before the occurrence it reminds of (NULL on rows from before
+    # configurable offsets: 30)
+    lead_minutes = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     is_read = Column(Boolean, default=False)
+    # When it was last marked read, for GET /sync
+    read_at = Column(DateTime, nullable=True)
 
     task = relationship("Task")
     user = relationship("User", back_populates="notifications")
 
 
+class NotificationDelivery(Base):
+    """A sent notification on its way out through one external channel
+    (see workers/delivery.py)"""
+    __tablename__ = "notification_deliveries"
+    __table_args__ = (
+        UniqueConstraint("notification_id", "channel"),
+        # delivery pipeline: pending deliveries of a channel by retry time
+        Index(
+            "ix_notification_deliveries_pending", "channel", "next_attempt_at",
+            sqlite_where=Column("status") == "pending",
+            postgresql_where=Column("status") == "pending",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    notification_id = Column(Integer, ForeignKey("notifications.id", ondelete="CASCADE"), nullable=False)
+    channel = Column(String, nullable=False)
+    # "pending", "delivered", or "dead" once out of attempts or rejected
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    # Lease taken by the pipeline while the delivery is queued or in flight
+    claimed_until = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class TaskTombstone(Base):
+    """A deleted task, so GET /sync can tell clients to drop it"""
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_deleted", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Not a foreign key: the task row is gone
+    task_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class SchedulerLease(Base):
+    """Which process runs the scheduler, until when (see workers/leader.py)"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+
+class TaskCounter(Base):
+    """Running count of a user's tasks, kept up to date by operations/stats.py.
+
+    ``name`` is "total", "completed", "completion_days_sum"/"_count" or
+    "<dimension>:<value>" for status, priority and category.
+    """
+    __tablename__ = "task_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class TaskDueBucket(Base):
+    """Pending tasks of a user per due day, for the time-dependent counts"""
+    __tablename__ = "task_due_buckets"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    due_day = Column(Date, primary_key=True)
+    pending = Column(Integer, nullable=False, default=0)
+    # pending and not marked completed
+    pending_open = Column(Integer, nullable=False, default=0)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -51,6 +188,8 @@ class User(Base):
     username = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    # Default reminder offsets (minutes) of the user's tasks; NULL: settings
+    reminder_offsets = Column(JSON(none_as_null=True), nullable=True)
     # is_active = Column(Boolean, default=True)
     # created_at = Column(DateTime, default=datetime.now)
 
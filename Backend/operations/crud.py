@@ -1,35 +1,35 @@
 # crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
-from models import Task as TaskModel, Notification
-from schemas import TaskCreate, TaskUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from models import Task as TaskModel, Notification, User
+from operations import pagination, recurrence, search, stats, sync
+from operations.reminders import REMINDER_COLUMNS, REMINDER_FIELDS, add_reminders, owner_offsets, sync_reminders
+from response_cache import response_cache
+from workers.scheduler import reminder_timer
+from schemas import TaskCreate, TaskUpdate, TaskBulkUpdate
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
-def create_task(db, task_data: TaskCreate, user_id):
+
+async def create_task(db: AsyncSession, task_data: TaskCreate, user_id):
+    """Create a task and its reminders (see operations/reminders.py)"""
     task = TaskModel(**task_data.dict(), user_id=user_id)
+    task.recurrence_end = recurrence.series_end(task.due_date, task.recurrence)
     db.add(task)
-    db.commit()
-    db.refresh(task)
-
-    if task.due_date and task.reminder_enabled:
-        reminder_time = task.due_date - timedelta(minutes=30)
-        if reminder_time > datetime.now():  # Only create if in future
-            reminder = Notification(
-                user_id=user_id,
-                task_id=task.id,
-                scheduled_for=reminder_time,
-                message=f"Reminder: {task.title} is due in 30 minutes"
-            )
-
-            db.add(reminder)
-            db.commit()
+    await db.flush()  # assigns task.id for the reminders
+
+    reminder_times = await add_reminders(db, [task], await owner_offsets(db, [task]))
+    await stats.record(db, user_id, added=[task])
+    await db.commit()
+    response_cache.bump(user_id)
+    reminder_timer.schedule(*reminder_times)
 
     return task
 
 
-def get_tasks(
-    db: Session,
+async def get_tasks(
+    db: AsyncSession,
     status: Optional[str] = None,
     priority: Optional[int] = None,
     due_before: Optional[datetime] = None,
@@ -40,23 +40,23 @@ def get_tasks(
     order: str = "desc",
 ):
     """Get tasks with optional filtering and sorting"""
-    query = db.query(TaskModel)
+    query = select(TaskModel)
 
     # Filtering
     if status:
-        query = query.filter(TaskModel.status == status)
+        query = query.where(TaskModel.status == status)
 
     if priority is not None:
-        query = query.filter(TaskModel.priority == priority)
+        query = query.where(TaskModel.priority == priority)
 
     if due_before:
-        query = query.filter(TaskModel.due_date <= due_before)
+        query = query.where(TaskModel.due_date <= due_before)
 
     if due_after:
-        query = query.filter(TaskModel.due_date >= due_after)
+        query = query.where(TaskModel.due_date >= due_after)
 
     # Sorting
-    sort_column = getattr(TaskModel, sort_by, TaskModel.created_at)
+    _, sort_column = pagination.sort_column_for(sort_by)
     if order == "asc":
         query = query.order_by(sort_column.asc())
     else:
@@ -65,52 +65,230 @@ def get_tasks(
     # Pagination
     query = query.offset(offset).limit(limit)
 
-    return query.all()
+    return (await db.scalars(query)).all()
 
 
-def get_task_for_user(db: Session, task_id: int, user_id: int) -> Optional[TaskModel]:
-    return db.query(TaskModel).filter(
+async def get_task_for_user(db: AsyncSession, task_id: int, user_id: int, for_update: bool = False) -> Optional[TaskModel]:
+    """The user's task; ``for_update`` locks its row until commit (a no-op
+    on SQLite, whose writers are serialised anyway), so the counter deltas
+    of concurrent writes start from the state each one actually changes"""
+    query = select(TaskModel).where(
         TaskModel.id == task_id,
         TaskModel.user_id == user_id
-    ).first()
+    )
+    if for_update:
+        query = query.with_for_update().execution_options(populate_existing=True)
+    return await db.scalar(query)
 
-def update_task(db: Session, task_id: int, task_data: TaskUpdate, user_id: int) -> Optional[TaskModel]:
-    """Update a task with partial data"""
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.user_id == user_id
-    ).first()
+async def update_task(
+    db: AsyncSession, task_id: int, task_data: TaskUpdate, user_id: int
+) -> Optional[TaskModel]:
+    """Update a task with partial data, moving its reminders if needed"""
+    task = await get_task_for_user(db, task_id, user_id, for_update=True)
     if not task:
         return None
     
+    before = stats.snapshot(task)
     # Only update fields that are provided
     update_data = task_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(task, key, value)
+    task.recurrence_end = recurrence.series_end(task.due_date, task.recurrence)
     
     task.updated_at = datetime.now()
-    db.commit()
-    db.refresh(task)
+    added, removed = [], []
+    if REMINDER_FIELDS.intersection(update_data):
+        added, removed = await sync_reminders(db, [task], await owner_offsets(db, [task]))
+    await stats.record(db, user_id, removed=[before], added=[task])
+    await db.commit()
+    response_cache.bump(user_id)
+    _reschedule(added, removed)
     return task
 
 
-def delete_task(db: Session, task_id: int, user_id: int) -> bool:
+def _reschedule(added: list, removed: list):
+    reminder_timer.unschedule(*removed)
+    reminder_timer.schedule(*added)
+
+
+async def _delete_reminders(db: AsyncSession, task_ids) -> list:
+    """Delete every notification of the tasks, sent or not; returns the
+    times of the unsent ones, for the reminder timer"""
+    deleted = (await db.execute(
+        delete(Notification)
+        .where(Notification.task_id.in_(task_ids))
+        .returning(Notification.scheduled_for, Notification.sent)
+    )).all()
+    return [row.scheduled_for for row in deleted if not row.sent]
+
+
+async def delete_task(db: AsyncSession, task_id: int, user_id: int) -> bool:
     """Delete a task"""
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.user_id == user_id
-    ).first()
+    task = await get_task_for_user(db, task_id, user_id, for_update=True)
     if not task:
         return False
-    db.delete(task)
-    db.commit()
+
+    # Its reminders go with it: pending ones must never fire, and sent ones
+    # would leave the task's row referenced
+    pending_times = await _delete_reminders(db, [task_id])
+
+    await stats.record(db, user_id, removed=[task])
+    await sync.record_deletes(db, user_id, [task_id])
+    await db.delete(task)
+    await db.commit()
+    response_cache.bump(user_id)
+    reminder_timer.unschedule(*pending_times)
     return True
 
 
+async def bulk_create_tasks(
+    db: AsyncSession, tasks_data: list[TaskCreate], user_id: int
+) -> list[TaskModel]:
+    """Insert many tasks and their reminders in one transaction.
+
+    Rows go out as executemany-style INSERTs (batched by SQLAlchemy's
+    insertmanyvalues) instead of a flush and commit per task.
+    """
+    if not tasks_data:
+        return []
+
+    now = datetime.now()
+    rows = [
+        {
+            **task_data.model_dump(),
+            "user_id": user_id,
+            "created_at": now,
+            "recurrence_end": recurrence.series_end(task_data.due_date, task_data.recurrence),
+        }
+        for task_data in tasks_data
+    ]
+    # SQLite can only keep RETURNING in parameter order by inserting row by
+    # row; its rowids are handed out in insert order, so sort by id instead
+    in_order = db.get_bind().dialect.name != "sqlite"
+    tasks = (await db.scalars(
+        insert(TaskModel).returning(TaskModel, sort_by_parameter_order=in_order),
+        rows,
+    )).all()
+    if not in_order:
+        tasks = sorted(tasks, key=lambda task: task.id)
+
+    reminder_times = await add_reminders(db, tasks, await owner_offsets(db, tasks))
+    await stats.record(db, user_id, added=tasks)
+    await db.commit()
+    response_cache.bump(user_id)
+    reminder_timer.schedule(*reminder_times)
+    return tasks
+
+
+async def bulk_update_tasks(
+    db: AsyncSession, updates: list[TaskBulkUpdate], user_id: int
+) -> dict[int, TaskModel]:
+    """Apply partial updates to many tasks in one transaction, moving the
+    reminders of those whose reminders depend on a changed field.
+
+    Returns the updated tasks by id; ids the user does not own are skipped.
+    """
+    ids = {item.id for item in updates}
+    before = {
+        row.id: row
+        for row in await db.execute(
+            select(TaskModel.id, *stats.COUNTED_COLUMNS)
+            .where(TaskModel.id.in_(ids), TaskModel.user_id == user_id)
+            # Locked as in update_task, in id order so concurrent batches
+            # cannot deadlock
+            .order_by(TaskModel.id)
+            .with_for_update()
+        )
+    }
 
+    now = datetime.now()
+    rows = [
+        {**item.model_dump(exclude_unset=True), "id": item.id, "updated_at": now}
+        for item in updates
+        if item.id in before
+    ]
+    if rows:
+        # ORM bulk UPDATE by primary key: one executemany per distinct set of columns
+        await db.execute(update(TaskModel), rows)
 
-def get_tasks_for_user(
-    db,
+    updated = {
+        task.id: task
+        for task in await db.scalars(
+            select(TaskModel)
+            .where(TaskModel.id.in_(before))
+            .execution_options(populate_existing=True)
+        )
+    }
+    # A new due_date or rule moves the end of the series
+    ends = [
+        {"id": task.id, "recurrence_end": end}
+        for task in updated.values()
+        if (end := recurrence.series_end(task.due_date, task.recurrence)) != task.recurrence_end
+    ]
+    if ends:
+        await db.execute(update(TaskModel), ends)
+        for row in ends:
+            set_committed_value(updated[row["id"]], "recurrence_end", row["recurrence_end"])
+    rescheduled = [updated[row["id"]] for row in rows if REMINDER_FIELDS.intersection(row)]
+    added, removed = (
+        await sync_reminders(db, rescheduled, await owner_offsets(db, rescheduled)) if rescheduled else ([], [])
+    )
+    await stats.record(db, user_id, removed=before.values(), added=updated.values())
+    await db.commit()
+    response_cache.bump(user_id)
+    _reschedule(added, removed)
+    return updated
+
+
+async def bulk_delete_tasks(db: AsyncSession, task_ids: list[int], user_id: int) -> set[int]:
+    """Delete many tasks and their pending reminders; returns the deleted ids"""
+    before = (await db.execute(
+        select(TaskModel.id, *stats.COUNTED_COLUMNS)
+        .where(TaskModel.id.in_(set(task_ids)), TaskModel.user_id == user_id)
+        .order_by(TaskModel.id)
+        .with_for_update()
+    )).all()
+    owned = {row.id for row in before}
+    if not owned:
+        return owned
+
+    pending_times = await _delete_reminders(db, owned)
+    await db.execute(delete(TaskModel).where(TaskModel.id.in_(owned)))
+    await stats.record(db, user_id, removed=before)
+    await sync.record_deletes(db, user_id, owned)
+    await db.commit()
+    response_cache.bump(user_id)
+
+    reminder_timer.unschedule(*pending_times)
+    return owned
+
+
+async def get_reminder_offsets(db: AsyncSession, user_id: int) -> Optional[list[int]]:
+    """A user's default reminder offsets; None: the server's"""
+    return await db.scalar(select(User.reminder_offsets).where(User.id == user_id))
+
+
+async def set_reminder_offsets(db: AsyncSession, user_id: int, offsets: Optional[list[int]]) -> int:
+    """Change a user's default reminder offsets and move the reminders of
+    their tasks that follow the default; returns how many tasks that is"""
+    await db.execute(update(User).where(User.id == user_id).values(reminder_offsets=offsets))
+    tasks = (await db.execute(
+        select(*REMINDER_COLUMNS).where(
+            TaskModel.user_id == user_id,
+            TaskModel.reminder_offsets.is_(None),
+            TaskModel.reminder_enabled == True,
+            TaskModel.due_date.isnot(None),
+        )
+    )).all()
+    added, removed = await sync_reminders(db, tasks, offsets)
+    await db.commit()
+    response_cache.bump(user_id)
+    _reschedule(added, removed)
+    return len(tasks)
+
+
+async def get_tasks_for_user(
+    db: AsyncSession,
     user_id: int,
     status: str | None = None,
     priority: int | None = None,
@@ -120,32 +298,58 @@ def get_tasks_for_user(
     offset: int = 0,
     sort_by: str = "created_at",
     order: str = "desc",
+    cursor: str | None = None,
+    q: str | None = None,
+    columns: list | None = None,
 ):
-    query = db.query(TaskModel).filter(TaskModel.user_id == user_id)
+    """List a user's tasks, optionally only those matching the search ``q``.
+
+    Pages are addressed either by ``offset`` or, when ``cursor`` is given, by
+    seeking past the (sort value, id) it encodes. Search results sorted by
+    ``pagination.RELEVANCE`` come best match first and are paged by offset.
+    Raises ValueError for an invalid cursor.
+
+    With ``columns`` (which must include the sort column and id) rows of
+    those columns are returned instead of Task objects.
+    """
+    query = select(*columns) if columns else select(TaskModel)
+    query = query.where(TaskModel.user_id == user_id)
+    fetch = db.execute if columns else db.scalars
+
+    rank = None
+    if q:
+        query, rank = search.apply(query, db.get_bind().dialect.name, q)
+        if query is None:
+            return []
 
     # ---------- Filters ----------
     if status:
-        query = query.filter(TaskModel.status == status)
+        query = query.where(TaskModel.status == status)
 
     if priority is not None:
-        query = query.filter(TaskModel.priority == priority)
+        query = query.where(TaskModel.priority == priority)
 
     if due_before:
-        query = query.filter(TaskModel.due_date <= due_before)
+        query = query.where(TaskModel.due_date <= due_before)
 
     if due_after:
-        query = query.filter(TaskModel.due_date >= due_after)
+        query = query.where(TaskModel.due_date >= due_after)
 
     # ---------- Sorting ----------
-    sort_column = getattr(TaskModel, sort_by, TaskModel.created_at)
+    if q and sort_by == pagination.RELEVANCE:
+        query = query.order_by(*search.rank_order(rank))
+        return (await fetch(query.offset(offset).limit(limit))).all()
 
-    if order == "asc":
-        query = query.order_by(asc(sort_column))
-    else:
-        query = query.order_by(desc(sort_column))
+    query = query.order_by(*pagination.order_clauses(sort_by, order))
 
     # ---------- Pagination ----------
-    query = query.offset(offset).limit(limit)
-
-    return query.all()
+    if not cursor:
+        return (await fetch(query.offset(offset).limit(limit))).all()
 
+    value, last_id = pagination.decode_cursor(cursor, sort_by, order)
+    tasks = []
+    for condition in pagination.seek_conditions(sort_by, order, value, last_id):
+        tasks += (await fetch(query.where(condition).limit(limit - len(tasks)))).all()
+        if len(tasks) == limit:
+            break
+    return tasks
@@ -1,125 +1,144 @@
 # features.py
 import datetime
-from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from types import SimpleNamespace
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, and_, or_, select
+from config import settings
 from models import Task as TaskModel
+from operations import recurrence, stats
 
+TASK_FIELDS = [column.key for column in TaskModel.__table__.columns]
 
-def upcoming_tasks(db: Session, user_id: int) -> List[TaskModel]:
-    """Get tasks due in the future (not overdue)"""
+
+async def _tasks(db: AsyncSession, columns: Optional[list], *conditions) -> list:
+    """Tasks matching ``conditions``, or rows of just ``columns`` when given"""
+    if columns:
+        return (await db.execute(select(*columns).where(*conditions))).all()
+    return (await db.scalars(select(TaskModel).where(*conditions))).all()
+
+
+def _due(task, due_date):
+    """A task (ORM object or row) as one occurrence, due at ``due_date``"""
+    if isinstance(task, Row):
+        return tuple(due_date if name == "due_date" else value for name, value in zip(task._fields, task))
+    return SimpleNamespace(**{name: getattr(task, name) for name in TASK_FIELDS if name != "due_date"}, due_date=due_date)
+
+
+def _expand(tasks: list, start: datetime.datetime, end: datetime.datetime) -> list:
+    """Replace recurring tasks by their occurrences in [start, end]; by due date"""
+    due = []
+    for task in tasks:
+        if not task.recurrence:
+            due.append((task.due_date, task.id, task))
+            continue
+        for when in recurrence.occurrences(task.due_date, task.recurrence, after=start, before=end):
+            due.append((when, task.id, _due(task, when)))
+    due.sort(key=lambda item: item[:2])
+    return [task for _, _, task in due]
+
+
+def _recurring_within(start: datetime.datetime, end: datetime.datetime):
+    """Pending recurring tasks that may occur in [start, end]"""
+    return and_(
+        TaskModel.recurrence.isnot(None),
+        TaskModel.status == "pending",
+        TaskModel.due_date <= end,
+        or_(TaskModel.recurrence_end.is_(None), TaskModel.recurrence_end >= start),
+    )
+
+
+async def upcoming_tasks(
+    db: AsyncSession,
+    user_id: int,
+    columns: Optional[list] = None,
+    until: Optional[datetime.datetime] = None,
+) -> List[TaskModel]:
+    """Get tasks due in the future (not overdue), optionally only up to
+    ``until``. Recurring tasks appear once per occurrence, up to ``until`` or
+    ``recurrence_window_days`` ahead."""
     current_datetime = datetime.datetime.now()
-    return db.query(TaskModel).filter(
+    window_end = until or current_datetime + datetime.timedelta(days=settings.recurrence_window_days)
+    one_off = and_(TaskModel.recurrence.is_(None), TaskModel.due_date >= current_datetime)
+    if until is not None:
+        one_off = and_(one_off, TaskModel.due_date <= until)
+    tasks = await _tasks(db, columns,
         and_(
             TaskModel.user_id == user_id,
-            TaskModel.due_date >= current_datetime,
-            TaskModel.status == "pending"
+            TaskModel.status == "pending",
+            or_(one_off, _recurring_within(current_datetime, window_end)),
         )
-    ).all()
+    )
+    return _expand(tasks, current_datetime, window_end)
 
 
-def overdue_tasks(db: Session, user_id: int) -> List[TaskModel]:
-    """Get tasks that are past due date and not completed"""
+async def overdue_tasks(db: AsyncSession, user_id: int, columns: Optional[list] = None) -> List[TaskModel]:
+    """Get tasks that are past due date and not completed (recurring tasks
+    never are: their due_date is only the first occurrence)"""
     current_datetime = datetime.datetime.now()
-    return db.query(TaskModel).filter(
+    return await _tasks(db, columns,
         and_(
             TaskModel.user_id == user_id,
             TaskModel.due_date < current_datetime,
             TaskModel.status == "pending",
-            TaskModel.completed == False
+            TaskModel.completed == False,
+            TaskModel.recurrence.is_(None)
         )
-    ).all()
+    )
 
 
-def reminders(db: Session, user_id: int) -> List[TaskModel]:
-    """Get tasks with reminders enabled that are due within 24 hours"""
+async def reminders(db: AsyncSession, user_id: int, columns: Optional[list] = None) -> List[TaskModel]:
+    """Get tasks with reminders enabled that are due within 24 hours, one per
+    occurrence for recurring tasks"""
     current_datetime = datetime.datetime.now()
     deadline = current_datetime + datetime.timedelta(hours=24)
     
-    return db.query(TaskModel).filter(
+    tasks = await _tasks(db, columns,
         and_(
             TaskModel.user_id == user_id,
             TaskModel.reminder_enabled == True,
-            TaskModel.due_date >= current_datetime,
-            TaskModel.due_date <= deadline,
+            or_(
+                and_(
+                    TaskModel.recurrence.is_(None),
+                    TaskModel.due_date >= current_datetime,
+                    TaskModel.due_date <= deadline,
+                ),
+                _recurring_within(current_datetime, deadline),
+            ),
             TaskModel.completed == False
         )
-    ).all()
+    )
+    return _expand(tasks, current_datetime, deadline)
 
 
-def insights(db: Session, user_id: int) -> dict:
-    """Calculate comprehensive task insights"""
+async def insights(db: AsyncSession, user_id: int) -> dict:
+    """Task insights from the user's counters (see operations/stats.py), in
+    one query whatever the number of tasks"""
     current_datetime = datetime.datetime.now()
-    today_start = current_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + datetime.timedelta(days=1)
-    
-    # Basic counts
-    all_tasks = db.query(TaskModel).filter(TaskModel.user_id == user_id).all()
-    total_tasks = len(all_tasks)
-    
-    completed_tasks = db.query(TaskModel).filter(
-        TaskModel.user_id == user_id,
-        TaskModel.completed == True
-    ).count()
-    
-    pending_tasks = db.query(TaskModel).filter(
-        TaskModel.user_id == user_id,
-        TaskModel.status == "pending"
-    ).count()
-    
-    overdue_count = db.query(TaskModel).filter(
-        and_(
-            TaskModel.user_id == user_id,
-            TaskModel.due_date < current_datetime,
-            TaskModel.status == "pending",
-            TaskModel.completed == False
-        )
-    ).count()
-    
-    tasks_due_today = db.query(TaskModel).filter(
-        and_(
-            TaskModel.user_id == user_id,
-            TaskModel.due_date >= today_start,
-            TaskModel.due_date < today_end,
-            TaskModel.completed == False
-        )
-    ).count()
-    
-    upcoming_count = db.query(TaskModel).filter(
-        and_(
-            TaskModel.user_id == user_id,
-            TaskModel.due_date >= current_datetime,
-            TaskModel.status == "pending"
-        )
-    ).count()
-    
+    values = dict((await db.execute(stats.summary_query(user_id, current_datetime))).all())
+
+    total_tasks = values.get("total", 0)
+    completed_tasks = values.get("completed", 0)
+
     # Completion rate
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-    
-    # Average completion time
-    completed_with_dates = db.query(TaskModel).filter(
-        and_(
-            TaskModel.completed == True,
-            TaskModel.due_date.isnot(None)
-        )
-    ).all()
-    
-    avg_completion_time = None
-    if completed_with_dates:
-        total_days = sum([
-            (task.due_date - task.created_at).days
-            for task in completed_with_dates
-            if task.due_date and task.created_at
-        ])
-        avg_completion_time = total_days / len(completed_with_dates) if len(completed_with_dates) > 0 else 0
-    
+    completion_days = values.get("completion_days_count", 0)
+    avg_completion_time = values.get("completion_days_sum", 0) / completion_days if completion_days else None
+
+    def breakdown(dimension: str) -> dict:
+        prefix = dimension + ":"
+        return {name[len(prefix):]: count for name, count in values.items() if name.startswith(prefix) and count}
+
     return {
         "total_tasks": total_tasks,
         "completed_tasks": completed_tasks,
-        "pending_tasks": pending_tasks,
-        "overdue_tasks": overdue_count,
-        "tasks_due_today": tasks_due_today,
-        "upcoming_tasks": upcoming_count,
+        "pending_tasks": values.get("status:pending", 0),
+        "overdue_tasks": values["overdue_before_today"] + values["overdue_today"],
+        "tasks_due_today": values["due_today"],
+        "upcoming_tasks": values["upcoming_after_today"] + values["upcoming_today"],
         "completion_rate": round(completion_rate, 2),
         "avg_completion_time": round(avg_completion_time, 2) if avg_completion_time else None,
-    }
\ No newline at end of file
+        "by_status": breakdown("status"),
+        "by_priority": breakdown("priority"),
+        "by_category": breakdown("category"),
+    }
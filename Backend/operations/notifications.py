@@ -0,0 +1,126 @@
+# notifications.py
+"""The notification feed: keyset pages, unread counts, marking read and
+retention.
+
+The feed lists a user's sent notifications newest first, by
+(created_at, id), and pages by seeking past the last row of the previous
+page. Unread counts and unread pages come from a partial index over unread
+notifications, so they cost the unread rows, not the user's whole history.
+Read notifications older than ``notification_retention_days`` are deleted,
+with their deliveries, in chunks by the scheduler.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import SessionLocal
+from models import Notification, NotificationDelivery
+from response_cache import response_cache
+
+
+def encode_cursor(notification) -> str:
+    raw = json.dumps({"c": notification.created_at.isoformat(), "id": notification.id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(created_at, id) of the last row of a page; raises ValueError"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["c"]), int(payload["id"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Malformed cursor") from e
+
+
+def next_cursor(notifications: list, limit: int) -> Optional[str]:
+    """Cursor for the page after ``notifications``, or None on the last page"""
+    if len(notifications) < limit:
+        return None
+    return encode_cursor(notifications[-1])
+
+
+def _unread(user_id: int):
+    return (
+        Notification.user_id == user_id,
+        Notification.sent == True,
+        Notification.is_read == False,
+    )
+
+
+async def feed(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    columns: Optional[list] = None,
+) -> list:
+    """A page of the user's sent notifications, newest first; rows of just
+    ``columns`` (which must include created_at and id) when given. Raises
+    ValueError for an invalid cursor."""
+    query = select(*columns) if columns else select(Notification)
+    if unread_only:
+        query = query.where(*_unread(user_id))
+    else:
+        query = query.where(Notification.user_id == user_id, Notification.sent == True)
+    if cursor:
+        query = query.where(tuple_(Notification.created_at, Notification.id) < decode_cursor(cursor))
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit)
+    fetch = db.execute if columns else db.scalars
+    return (await fetch(query)).all()
+
+
+async def unread_count(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(func.count()).select_from(Notification).where(*_unread(user_id)))
+
+
+async def mark_read(db: AsyncSession, user_id: int, ids: Optional[Sequence[int]] = None) -> int:
+    """Mark the user's notifications ``ids`` read, or all of them when None,
+    in one UPDATE; returns how many were unread"""
+    query = update(Notification).where(*_unread(user_id))
+    if ids is not None:
+        query = query.where(Notification.id.in_(set(ids)))
+    result = await db.execute(
+        query.values(is_read=True, read_at=datetime.now()).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        response_cache.bump(user_id)
+    return result.rowcount
+
+
+def purge_read(chunk_size: Optional[int] = None) -> int:
+    """Delete read notifications older than ``notification_retention_days``,
+    one committed chunk at a time so no transaction holds many rows; run by
+    the scheduler. Returns how many were deleted."""
+    if settings.notification_retention_days <= 0:
+        return 0
+    chunk_size = chunk_size or settings.notification_retention_chunk
+    cutoff = datetime.now() - timedelta(days=settings.notification_retention_days)
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            # Picked once, so both deletes and the count agree on the chunk
+            ids = db.scalars(
+                select(Notification.id)
+                .where(Notification.is_read == True, Notification.created_at < cutoff)
+                .order_by(Notification.created_at)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return total
+            db.execute(delete(NotificationDelivery).where(NotificationDelivery.notification_id.in_(ids)))
+            user_ids = db.scalars(
+                delete(Notification).where(Notification.id.in_(ids)).returning(Notification.user_id)
+            ).all()
+            db.commit()
+            for user_id in set(user_ids):
+                response_cache.bump(user_id)
+            total += len(user_ids)
+            if len(user_ids) < chunk_size:
+                return total
@@ -0,0 +1,149 @@
+# pagination.py
+"""Opaque keyset cursors for task listings.
+
+A cursor records the sort column, direction and the (value, id) of the last
+row on a page, so the next page can seek past it instead of using OFFSET.
+Search results ranked by relevance have no column to seek on (every match
+is ranked anyway), so their cursors carry the offset of the next page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, tuple_
+
+from models import Task as TaskModel
+
+# Scalar columns a listing may sort on; anything else falls back to
+# created_at. JSON and free-text columns have no order worth seeking on.
+SORTABLE_COLUMNS = {
+    name: TaskModel.__table__.columns[name]
+    for name in (
+        "id", "title", "completed", "due_date", "priority", "status",
+        "category", "created_at", "updated_at",
+    )
+}
+
+# sort_by value ordering search results best match first
+RELEVANCE = "relevance"
+
+
+def sort_column_for(sort_by: str):
+    """Return the ORM attribute to sort on, falling back to created_at"""
+    if sort_by not in SORTABLE_COLUMNS:
+        sort_by = "created_at"
+    return sort_by, getattr(TaskModel, sort_by)
+
+
+def order_clauses(sort_by: str, order: str):
+    """ORDER BY for a listing, with id as tie-breaker so the order is total.
+
+    NULLs sort first ascending and last descending (SQLite's default), made
+    explicit for nullable columns so other databases agree.
+    """
+    sort_by, column = sort_column_for(sort_by)
+    primary = column.asc() if order == "asc" else column.desc()
+    if SORTABLE_COLUMNS[sort_by].nullable:
+        primary = primary.nulls_first() if order == "asc" else primary.nulls_last()
+    tie_breaker = TaskModel.id.asc() if order == "asc" else TaskModel.id.desc()
+    return [primary] if sort_by == "id" else [primary, tie_breaker]
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
+
+
+def encode_cursor(task: TaskModel, sort_by: str, order: str) -> str:
+    sort_by, _ = sort_column_for(sort_by)
+    value = getattr(task, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return _encode({"s": sort_by, "o": order, "v": value, "id": task.id})
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> tuple:
+    """Return (value, id) from a cursor, or raise ValueError if it is invalid
+    or was issued for a different sort."""
+    sort_by, _ = sort_column_for(sort_by)
+    payload = _decode(cursor)
+    try:
+        value, last_id = payload["v"], int(payload["id"])
+        issued_for = (payload["s"], payload["o"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+
+    if issued_for != (sort_by, order):
+        raise ValueError("Cursor does not match sort_by/order")
+
+    if value is not None and SORTABLE_COLUMNS[sort_by].type.python_type is datetime:
+        value = datetime.fromisoformat(value)
+    return value, last_id
+
+
+def decode_offset_cursor(cursor: str, q: str) -> int:
+    """Return the offset from a relevance cursor, or raise ValueError if it
+    is invalid or was issued for a different search."""
+    payload = _decode(cursor)
+    try:
+        offset, issued_for = int(payload["off"]), (payload["s"], payload["q"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if issued_for != (RELEVANCE, q) or offset < 0:
+        raise ValueError("Cursor does not match this search")
+    return offset
+
+
+def seek_conditions(sort_by: str, order: str, value, last_id: int) -> list:
+    """WHERE clauses selecting the rows strictly after (value, last_id).
+
+    Each clause is an index range on its own and they cover consecutive
+    stretches of the ordering, so callers query them in turn until the page
+    is full. Nullable columns need two: the NULL block and the non-NULL
+    range, because OR-ing them defeats the index range scan.
+    """
+    sort_by, column = sort_column_for(sort_by)
+    ascending = order == "asc"
+
+    if sort_by == "id":
+        return [TaskModel.id > last_id if ascending else TaskModel.id < last_id]
+
+    nullable = SORTABLE_COLUMNS[sort_by].nullable
+
+    if value is None:
+        # NULLs come first ascending, last descending
+        if ascending:
+            return [and_(column.is_(None), TaskModel.id > last_id), column.isnot(None)]
+        return [and_(column.is_(None), TaskModel.id < last_id)]
+
+    if ascending:
+        return [tuple_(column, TaskModel.id) > (value, last_id)]
+    conditions = [tuple_(column, TaskModel.id) < (value, last_id)]
+    if nullable:
+        conditions.append(column.is_(None))
+    return conditions
+
+
+def next_cursor(tasks: list, limit: int, sort_by: str, order: str) -> Optional[str]:
+    """Cursor for the page after ``tasks``, or None on the last page"""
+    if len(tasks) < limit:
+        return None
+    return encode_cursor(tasks[-1], sort_by, order)
+
+
+def next_offset_cursor(tasks: list, limit: int, offset: int, q: str) -> Optional[str]:
+    """Relevance cursor for the page after ``tasks``, or None on the last page"""
+    if len(tasks) < limit:
+        return None
+    return _encode({"s": RELEVANCE, "q": q, "off": offset + len(tasks)})
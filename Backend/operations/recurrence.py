@@ -0,0 +1,212 @@
+# recurrence.py
+"""Recurrence rules for tasks, in the RRULE syntax of RFC 5545.
+
+A recurring task is stored once: ``due_date`` is its first occurrence and
+``recurrence`` the rule, e.g. ``FREQ=WEEKLY;BYDAY=MO,TH;COUNT=10``.
+Supported parts are FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL, COUNT,
+UNTIL and, for weekly rules, BYDAY. Occurrences are never stored; they are
+generated on demand for the window a view asks for. Like RFC 5545, monthly
+and yearly rules skip dates that do not exist (the 31st, 29 February).
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Union
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Keep series_end() cheap
+MAX_COUNT = 1000
+MAX_INTERVAL = 100
+# How long a counted series may run, so that it ends within datetime's range
+# from any due date before year 9000. Later series stop at datetime.max.
+MAX_SPAN_YEARS = 1000
+# Length of each frequency's period, in years
+_PERIOD_YEARS = {"DAILY": 1 / 365, "WEEKLY": 7 / 365, "MONTHLY": 1 / 12, "YEARLY": 1}
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    by_day: tuple = ()  # weekday numbers, Monday = 0
+
+
+def _parse_until(value: str) -> datetime:
+    # Floating local time like the rest of the schema; a trailing Z is dropped
+    value = value.rstrip("Z")
+    for layout in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, layout)
+        except ValueError:
+            continue
+        return until if "T" in value else until.replace(hour=23, minute=59, second=59)
+    raise ValueError(f"Invalid UNTIL: {value}")
+
+
+@lru_cache(maxsize=1024)  # a handful of distinct rules cover most series
+def parse(text: str) -> Rule:
+    """Parse an RRULE (with or without the ``RRULE:`` prefix); raises ValueError"""
+    text = text.strip().upper().removeprefix("RRULE:")
+    parts = {}
+    for part in filter(None, text.split(";")):
+        name, sep, value = part.partition("=")
+        if not sep or not value or name in parts:
+            raise ValueError(f"Invalid recurrence part: {part}")
+        parts[name] = value
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+    if unknown:
+        raise ValueError(f"Unsupported recurrence parts: {', '.join(sorted(unknown))}")
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT and UNTIL cannot be combined")
+
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError as e:
+        raise ValueError("INTERVAL and COUNT must be integers") from e
+    if not 1 <= interval <= MAX_INTERVAL or (count is not None and not 1 <= count <= MAX_COUNT):
+        raise ValueError(f"INTERVAL must be 1-{MAX_INTERVAL} and COUNT 1-{MAX_COUNT}")
+
+    by_day = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        days = parts["BYDAY"].split(",")
+        if any(day not in WEEKDAYS for day in days):
+            raise ValueError(f"BYDAY takes {', '.join(WEEKDAYS)}")
+        by_day = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+
+    if count is not None:
+        periods = (count - 1) // max(len(by_day), 1)
+        if periods * interval * _PERIOD_YEARS[freq] > MAX_SPAN_YEARS:
+            raise ValueError(f"A series with COUNT may span at most {MAX_SPAN_YEARS} years")
+
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    return Rule(freq, interval, count, until, by_day)
+
+
+def normalize(text: str) -> str:
+    """Canonical text of a rule, for storage; raises ValueError"""
+    rule = parse(text)
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.by_day:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.by_day))
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append(f"UNTIL={rule.until:%Y%m%dT%H%M%S}")
+    return ";".join(parts)
+
+
+def _shift_months(start: datetime, months: int) -> Optional[datetime]:
+    """``start`` moved by whole months, or None if that day does not exist"""
+    year, month = divmod(start.month - 1 + months, 12)
+    try:
+        return start.replace(year=start.year + year, month=month + 1)
+    except ValueError:
+        return None
+
+
+def _period(start: datetime, rule: Rule, index: int) -> Optional[tuple[datetime, list]]:
+    """Beginning of the ``index``-th period of the rule and its candidate
+    times, or None once that is past datetime's range"""
+    try:
+        return _period_in_range(start, rule, index)
+    except (OverflowError, ValueError):
+        return None
+
+
+def _period_in_range(start: datetime, rule: Rule, index: int) -> tuple[datetime, list]:
+    if rule.freq == "DAILY":
+        moment = start + timedelta(days=index * rule.interval)
+        return moment, [moment]
+    if rule.freq == "WEEKLY":
+        week = start - timedelta(days=start.weekday()) + timedelta(weeks=index * rule.interval)
+        days = rule.by_day or (start.weekday(),)
+        return week, [week + timedelta(days=day) for day in days]
+    months = index * rule.interval * (12 if rule.freq == "YEARLY" else 1)
+    first = start.replace(day=1)
+    year, month = divmod(first.month - 1 + months, 12)
+    moment = _shift_months(start, months)
+    return first.replace(year=first.year + year, month=month + 1), [moment] if moment else []
+
+
+def _per_period(start: datetime, rule: Rule) -> Optional[tuple[int, int]]:
+    """(occurrences in the first period, in every later one) when each
+    period yields a fixed number, which allows jumping ahead"""
+    if rule.freq == "DAILY":
+        return 1, 1
+    if rule.freq == "WEEKLY":
+        days = rule.by_day or (start.weekday(),)
+        return sum(day >= start.weekday() for day in days), len(days)
+    return None
+
+
+def occurrences(
+    start: datetime,
+    rule: Union[Rule, str],
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+) -> Iterator[datetime]:
+    """Yield the occurrences of ``rule`` from ``start``, in order and lazily,
+    keeping those in [``after``, ``before``]. Daily and weekly rules jump
+    straight to ``after`` instead of walking every earlier occurrence."""
+    if isinstance(rule, str):
+        rule = parse(rule)
+    index, seen = 0, 0
+    fixed = _per_period(start, rule)
+    if after is not None and after > start and fixed is not None:
+        period_length = timedelta(days=rule.interval * (7 if rule.freq == "WEEKLY" else 1))
+        anchor = _period_in_range(start, rule, 0)[0]
+        index = (after - anchor) // period_length
+        seen = 0 if index == 0 else fixed[0] + (index - 1) * fixed[1]
+
+    while True:
+        period = _period(start, rule, index)
+        if period is None:
+            return  # no later date exists
+        period_start, candidates = period
+        if before is not None and period_start > before:
+            return
+        for moment in candidates:
+            if moment < start:
+                continue
+            if (rule.count is not None and seen >= rule.count) or (rule.until is not None and moment > rule.until):
+                return
+            seen += 1
+            if before is not None and moment > before:
+                return
+            if after is None or moment >= after:
+                yield moment
+        index += 1
+
+
+def next_after(start: datetime, rule: Union[Rule, str], moment: datetime) -> Optional[datetime]:
+    """First occurrence strictly after ``moment``, or None once the series ended"""
+    for occurrence in occurrences(start, rule, after=moment):
+        if occurrence > moment:
+            return occurrence
+    return None
+
+
+def series_end(start: Optional[datetime], text: Optional[str]) -> Optional[datetime]:
+    """Upper bound of a series' occurrences (None: unbounded or not
+    recurring), stored so finished series can be skipped in SQL"""
+    if start is None or not text:
+        return None
+    rule = parse(text)
+    if rule.until is not None:
+        return rule.until
+    if rule.count is None:
+        return None
+    last = None
+    for last in occurrences(start, rule):
+        pass
+    return last
@@ -0,0 +1,194 @@
+# reminders.py
+"""The reminder notifications a task should have.
+
+A task is reminded once per offset (minutes before it is due) of its
+``reminder_offsets``, else of its owner's, else of
+``settings.reminder_offsets_minutes``. Each reminder row records its offset
+in ``lead_minutes``.
+
+Task writes in crud.py keep the unsent reminders in step with the tasks in
+bulk: the rows the tasks should have are computed in Python and diffed
+against the stored ones, so a batch costs one SELECT and one DELETE per
+``CHUNK_SIZE`` tasks and a single executemany INSERT. The reminder worker
+materialises the next reminder of a recurring task when one fires: only the
+next occurrence of a series ever has a row per offset in ``notifications``.
+
+Reminders that are already due but not yet sent are diffed as of their own
+time: one the task still wants then is kept for the worker, any other is
+deleted, so a task that was moved or completed does not remind of its old
+time.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Notification, Task, User
+from operations import recurrence
+
+MAX_OFFSETS = 10
+MAX_OFFSET_MINUTES = 30 * 24 * 60
+# Rows of reminder reads and deletes, within every backend's bound parameter limit
+CHUNK_SIZE = 900
+# Task fields a reminder depends on; other updates leave reminders alone
+REMINDER_FIELDS = frozenset({"title", "due_date", "reminder_enabled", "completed", "recurrence", "reminder_offsets"})
+# What reminders_for() reads, to select rows instead of loading tasks
+REMINDER_COLUMNS = (Task.id, Task.user_id, *(getattr(Task, field) for field in sorted(REMINDER_FIELDS)))
+
+
+def normalize_offsets(offsets: Iterable[int]) -> list[int]:
+    """Distinct offsets, longest first; raises ValueError"""
+    offsets = list(offsets)
+    if len(offsets) > MAX_OFFSETS:
+        raise ValueError(f"At most {MAX_OFFSETS} reminder offsets")
+    if any(not 0 <= offset <= MAX_OFFSET_MINUTES for offset in offsets):
+        raise ValueError(f"Reminder offsets must be 0-{MAX_OFFSET_MINUTES} minutes")
+    return sorted(set(offsets), reverse=True)
+
+
+@lru_cache(maxsize=None)
+def lead_text(minutes: int) -> str:
+    """When a reminder ``minutes`` early says its task is due, e.g. "in 1 day" or "now"."""
+    if minutes == 0:
+        return "now"
+    for unit, size in (("day", 24 * 60), ("hour", 60), ("minute", 1)):
+        if minutes % size == 0:
+            count = minutes // size
+            return f"in {count} {unit}{'s' if count != 1 else ''}"
+
+
+@lru_cache(maxsize=None)
+def _lead(minutes: int) -> timedelta:
+    return timedelta(minutes=minutes)
+
+
+def effective_offsets(task_offsets: Optional[Sequence[int]], default_offsets: Optional[Sequence[int]] = None) -> Sequence[int]:
+    """Offsets a task is reminded at, given its own and its owner's"""
+    if task_offsets is not None:
+        return task_offsets
+    if default_offsets is not None:
+        return default_offsets
+    return settings.reminder_offsets_minutes
+
+
+async def owner_offsets(db: AsyncSession, tasks: Sequence) -> Optional[Sequence[int]]:
+    """Default offsets of the owner of ``tasks`` (one user's), or None when
+    none of them follows the default or the owner has none.
+
+    Read from the user row in the caller's transaction, not from the cached
+    identity, which another process may have loaded before the default
+    changed. The share lock orders this against set_reminder_offsets: one
+    of the two sees the other's writes.
+    """
+    owner = next((
+        task.user_id for task in tasks
+        if task.reminder_offsets is None and task.due_date and task.reminder_enabled and not task.completed
+    ), None)
+    if owner is None:
+        return None
+    return await db.scalar(select(User.reminder_offsets).where(User.id == owner).with_for_update(read=True))
+
+
+def reminders_for(task, offsets: Iterable[int], now: datetime, after: Optional[datetime] = None) -> list[dict]:
+    """Column values of the reminders ``task`` should have, one per offset
+    (minutes before it is due) in ``offsets``.
+
+    For a recurring task each is the reminder of the first occurrence whose
+    reminder time is later than both ``now`` and ``after``.
+    """
+    due_date, rule = task.due_date, task.recurrence
+    if not due_date or not task.reminder_enabled or task.completed:
+        return []
+    rows = []
+    for lead_minutes in offsets:
+        lead = _lead(lead_minutes)
+        occurrence = recurrence.next_after(due_date, rule, max(now, after or now) + lead) if rule else due_date
+        if occurrence is None:
+            continue
+        reminder_time = occurrence - lead
+        if reminder_time <= now:  # Only create if in future
+            continue
+        rows.append({
+            "user_id": task.user_id,
+            "task_id": task.id,
+            "scheduled_for": reminder_time,
+            "lead_minutes": lead_minutes,
+            "message": f"Reminder: {task.title} is due {lead_text(lead_minutes)}",
+        })
+    return rows
+
+
+def reminder_rows(tasks: Iterable, default_offsets: Optional[Sequence[int]] = None, now: Optional[datetime] = None) -> list[dict]:
+    """Every reminder ``tasks`` should have, one per task and offset"""
+    now = now or datetime.now()
+    rows = []
+    for task in tasks:
+        rows += reminders_for(task, effective_offsets(task.reminder_offsets, default_offsets), now)
+    return rows
+
+
+async def add_reminders(db: AsyncSession, tasks: Sequence, default_offsets: Optional[Sequence[int]] = None) -> list[datetime]:
+    """Insert the reminders of new tasks; returns their times for the
+    reminder timer, to schedule once committed"""
+    rows = reminder_rows(tasks, default_offsets)
+    if rows:
+        await db.execute(insert(Notification), rows)
+    return [row["scheduled_for"] for row in rows]
+
+
+async def sync_reminders(
+    db: AsyncSession, tasks: Sequence, default_offsets: Optional[Sequence[int]] = None
+) -> tuple[list[datetime], list[datetime]]:
+    """Bring the unsent reminders of ``tasks`` in line with the tasks.
+
+    Unchanged reminders are kept as they are; returns the times of the added
+    and of the removed future ones, for the reminder timer once committed.
+    """
+    now = datetime.now()
+    wanted = {
+        (row["task_id"], row["scheduled_for"], row["lead_minutes"], row["message"]): row
+        for row in reminder_rows(tasks, default_offsets, now)
+    }
+    tasks_by_id = {task.id: task for task in tasks}
+    task_ids = list(tasks_by_id)
+    stale, removed = [], []
+    for start in range(0, len(task_ids), CHUNK_SIZE):
+        existing = await db.execute(
+            select(
+                Notification.id,
+                Notification.task_id,
+                Notification.scheduled_for,
+                Notification.lead_minutes,
+                Notification.message,
+            ).where(
+                Notification.task_id.in_(task_ids[start:start + CHUNK_SIZE]),
+                Notification.sent == False,
+            )
+        )
+        for row in existing:
+            key = (row.task_id, row.scheduled_for, row.lead_minutes, row.message)
+            if row.scheduled_for > now:
+                if wanted.pop(key, None) is None:
+                    stale.append(row.id)
+                    removed.append(row.scheduled_for)
+                continue
+            # Due: what the task wants at that offset as of the reminder's time
+            task = tasks_by_id[row.task_id]
+            due = []
+            if row.lead_minutes in effective_offsets(task.reminder_offsets, default_offsets):
+                due = reminders_for(task, [row.lead_minutes], row.scheduled_for - timedelta(microseconds=1))
+            if due and (row.task_id, due[0]["scheduled_for"], due[0]["lead_minutes"], due[0]["message"]) == key:
+                continue
+            stale.append(row.id)
+            if due and due[0]["scheduled_for"] == row.scheduled_for:
+                # Still due, with a new message (the task was renamed)
+                wanted[key[:3] + (due[0]["message"],)] = due[0]
+
+    for start in range(0, len(stale), CHUNK_SIZE):
+        await db.execute(delete(Notification).where(Notification.id.in_(stale[start:start + CHUNK_SIZE])))
+    if wanted:
+        await db.execute(insert(Notification), list(wanted.values()))
+    return [row["scheduled_for"] for row in wanted.values()], removed
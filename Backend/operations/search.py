@@ -0,0 +1,88 @@
+# search.py
+"""Full-text search over task titles, descriptions and categories.
+
+SQLite matches against the ``tasks_fts`` FTS5 table and ranks with bm25;
+PostgreSQL matches the generated ``tasks.search_vector`` column through its
+GIN index and ranks with ts_rank_cd. Both indexes are created by migration
+0005 (categories added by 0014) and follow inserts, updates and deletes of
+``tasks`` by themselves.
+
+A batch migration that recreates ``tasks`` on SQLite drops the FTS
+triggers, so it has to create them again.
+"""
+import re
+
+from sqlalchemy import column, func, literal_column, table
+
+from models import Task as TaskModel
+
+# Titles count ten times as much as descriptions and categories
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+CATEGORY_WEIGHT = 1.0
+
+_TERM = re.compile(r"\w+")
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+
+def terms(q: str) -> list:
+    """Words of a search box query; punctuation and operators are ignored"""
+    return _TERM.findall(q.lower())
+
+
+def _fts5_query(words: list) -> str:
+    # Every word must match, each as a prefix so results follow the typing
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _tsquery(words: list) -> str:
+    return " & ".join(f"'{word}':*" for word in words)
+
+
+def apply(query, dialect: str, q: str):
+    """Restrict a select of tasks to those matching ``q``.
+
+    Returns (query, rank), where ordering by ``rank`` ascending puts the best
+    matches first, or (None, None) when ``q`` has no searchable words.
+    """
+    words = terms(q)
+    if not words:
+        return None, None
+
+    if dialect == "sqlite":
+        # The hidden column named after an FTS5 table stands for the whole row
+        fts = literal_column("tasks_fts")
+        query = (
+            query.join(tasks_fts, tasks_fts.c.rowid == TaskModel.id)
+            .where(fts.match(_fts5_query(words)))
+        )
+        # bm25 is negative, more so for better matches
+        rank = func.bm25(
+            fts,
+            literal_column(repr(TITLE_WEIGHT)),
+            literal_column(repr(DESCRIPTION_WEIGHT)),
+            literal_column(repr(CATEGORY_WEIGHT)),
+        )
+        return query, rank
+
+    if dialect == "postgresql":
+        vector = literal_column("tasks.search_vector")
+        tsquery = func.to_tsquery("english", _tsquery(words))
+        query = query.where(vector.op("@@")(tsquery))
+        return query, -func.ts_rank_cd(vector, tsquery)
+
+    # Other databases: a plain substring scan, unranked
+    for word in words:
+        pattern = f"%{word}%"
+        query = query.where(
+            TaskModel.title.ilike(pattern) | TaskModel.description.ilike(pattern) | TaskModel.category.ilike(pattern)
+        )
+    return query, None
+
+
+def rank_order(rank) -> list:
+    """ORDER BY for relevance, best match first, with id as tie-breaker"""
+    if rank is None:
+        return [TaskModel.id.desc()]
+    return [rank.asc(), TaskModel.id.desc()]
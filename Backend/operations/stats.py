@@ -0,0 +1,234 @@
+# stats.py
+"""Per-user task counters behind the dashboard summary.
+
+Every write to ``tasks`` in crud.py hands the old and new values of the
+tasks it touches to ``record``, which adds the difference to
+``task_counters`` and ``task_due_buckets`` in the same transaction. The
+summary then reads a few counter rows, sums the due-day buckets before and
+after today and counts only today's tasks, so its cost does not grow with
+the number of tasks a user has.
+
+Should the counters ever drift (e.g. after editing ``tasks`` by hand),
+recompute them from the tasks table:
+
+    python -m operations.stats
+    python -m operations.stats --user-id 42
+"""
+import argparse
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import String, and_, case, cast, delete, func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task as TaskModel, TaskCounter, TaskDueBucket
+
+# Task attributes the counters depend on
+TaskValues = namedtuple(
+    "TaskValues", ("status", "completed", "priority", "category", "due_date", "created_at", "recurrence")
+)
+COUNTED_COLUMNS = [getattr(TaskModel, field) for field in TaskValues._fields]
+
+
+def snapshot(task) -> TaskValues:
+    """The counted values of a task, taken before it is modified"""
+    return TaskValues(*(getattr(task, field) for field in TaskValues._fields))
+
+
+def _contribution(task) -> tuple[Counter, Counter]:
+    """What one task adds to the counters and to the due-day buckets"""
+    counters = Counter({
+        "total": 1,
+        f"status:{task.status}": 1,
+        f"priority:{task.priority}": 1,
+        f"category:{task.category or ''}": 1,
+    })
+    if task.completed:
+        counters["completed"] += 1
+        if task.due_date is not None:
+            counters["completion_days_sum"] += (task.due_date - task.created_at).days
+            counters["completion_days_count"] += 1
+
+    # A recurring task's due_date is only its first occurrence, so it is not
+    # counted as overdue/due today/upcoming by it
+    buckets = Counter()
+    if task.due_date is not None and task.status == "pending" and not task.recurrence:
+        day = task.due_date.date()
+        buckets[(day, "pending")] += 1
+        if not task.completed:
+            buckets[(day, "pending_open")] += 1
+    return counters, buckets
+
+
+def _upsert(dialect: str, table, columns: list):
+    """INSERT adding ``columns`` onto an existing row with the same key"""
+    statement = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={column: table.c[column] + statement.excluded[column] for column in columns},
+    )
+
+
+async def record(db: AsyncSession, user_id: int, removed: Iterable = (), added: Iterable = ()):
+    """Apply the counter changes of removing and adding tasks of a user.
+
+    ``removed`` holds the old values of deleted or updated tasks (see
+    ``snapshot``), ``added`` the new ones. Nothing is committed.
+    """
+    counters, buckets = Counter(), Counter()
+    for task in added:
+        task_counters, task_buckets = _contribution(task)
+        counters.update(task_counters)
+        buckets.update(task_buckets)
+    for task in removed:
+        task_counters, task_buckets = _contribution(task)
+        counters.subtract(task_counters)
+        buckets.subtract(task_buckets)
+
+    dialect = db.get_bind().dialect.name
+    counter_rows = [
+        {"user_id": user_id, "name": name, "value": value}
+        for name, value in counters.items()
+        if value
+    ]
+    if counter_rows:
+        await db.execute(_upsert(dialect, TaskCounter.__table__, ["value"]), counter_rows)
+
+    days = {}
+    for (day, column), value in buckets.items():
+        if value:
+            row = days.setdefault(day, {"user_id": user_id, "due_day": day, "pending": 0, "pending_open": 0})
+            row[column] = value
+    if days:
+        await db.execute(_upsert(dialect, TaskDueBucket.__table__, ["pending", "pending_open"]), list(days.values()))
+        if any(value < 0 for value in buckets.values()):
+            # Keep the bucket list short: drop days with nothing left due
+            await db.execute(delete(TaskDueBucket).where(
+                TaskDueBucket.user_id == user_id,
+                TaskDueBucket.due_day.in_(list(days)),
+                TaskDueBucket.pending == 0,
+                TaskDueBucket.pending_open == 0,
+            ))
+
+
+def summary_query(user_id: int, now: datetime):
+    """One statement returning (name, value) rows: the stored counters plus
+    the time-dependent counts, from the buckets and today's tasks"""
+    today = now.date()
+    today_start = datetime.combine(today, datetime.min.time())
+    today_end = today_start + timedelta(days=1)
+
+    def bucket_sum(name, column, condition):
+        return select(literal(name, String), func.coalesce(func.sum(column), 0)).where(
+            TaskDueBucket.user_id == user_id, condition
+        )
+
+    def today_count(name, *conditions):
+        return select(literal(name, String), func.count()).select_from(TaskModel).where(
+            TaskModel.user_id == user_id, TaskModel.recurrence.is_(None), *conditions
+        )
+
+    return union_all(
+        select(TaskCounter.name, TaskCounter.value).where(TaskCounter.user_id == user_id),
+        bucket_sum("overdue_before_today", TaskDueBucket.pending_open, TaskDueBucket.due_day < today),
+        bucket_sum("upcoming_after_today", TaskDueBucket.pending, TaskDueBucket.due_day > today),
+        today_count(
+            "overdue_today",
+            TaskModel.status == "pending",
+            TaskModel.due_date >= today_start,
+            TaskModel.due_date < now,
+            TaskModel.completed == False,
+        ),
+        today_count(
+            "upcoming_today",
+            TaskModel.status == "pending",
+            TaskModel.due_date >= now,
+            TaskModel.due_date < today_end,
+        ),
+        today_count(
+            "due_today",
+            TaskModel.due_date >= today_start,
+            TaskModel.due_date < today_end,
+            TaskModel.completed == False,
+        ),
+    )
+
+
+def rebuild(connection, user_id: Optional[int] = None):
+    """Recompute the counters and buckets of every user, or of one, from
+    ``tasks``. Takes a sync Connection; the caller commits."""
+
+    def scoped(query, column=TaskModel.user_id):
+        return query if user_id is None else query.where(column == user_id)
+
+    def counted(name, *group_by, where=None):
+        query = select(TaskModel.user_id, name, func.count())
+        if where is not None:
+            query = query.where(where)
+        return scoped(query).group_by(TaskModel.user_id, *group_by)
+
+    category = literal("category:") + func.coalesce(TaskModel.category, "")
+    priority = literal("priority:") + cast(TaskModel.priority, String)
+    status = literal("status:") + TaskModel.status
+    completed_with_due = and_(TaskModel.completed == True, TaskModel.due_date.isnot(None))
+
+    connection.execute(scoped(delete(TaskCounter), TaskCounter.user_id))
+    connection.execute(scoped(delete(TaskDueBucket), TaskDueBucket.user_id))
+    connection.execute(TaskCounter.__table__.insert().from_select(
+        ["user_id", "name", "value"],
+        union_all(
+            counted(literal("total")),
+            counted(literal("completed"), where=TaskModel.completed == True),
+            counted(status, status),
+            counted(priority, priority),
+            counted(category, category),
+            counted(literal("completion_days_count"), where=completed_with_due),
+        ),
+    ))
+
+    # Summed in Python to floor exactly like record() does; SQLite's
+    # julianday() arithmetic loses the microseconds
+    completion_days = Counter()
+    rows = connection.execute(
+        scoped(select(TaskModel.user_id, TaskModel.due_date, TaskModel.created_at).where(completed_with_due)),
+        execution_options={"stream_results": True},
+    )
+    for row in rows:
+        completion_days[row.user_id] += (row.due_date - row.created_at).days
+    if completion_days:
+        connection.execute(TaskCounter.__table__.insert(), [
+            {"user_id": owner, "name": "completion_days_sum", "value": days}
+            for owner, days in completion_days.items()
+        ])
+
+    due_day = func.date(TaskModel.due_date)
+    connection.execute(TaskDueBucket.__table__.insert().from_select(
+        ["user_id", "due_day", "pending", "pending_open"],
+        scoped(
+            select(
+                TaskModel.user_id,
+                due_day,
+                func.count(),
+                func.sum(case((TaskModel.completed == True, 0), else_=1)),
+            )
+            .where(TaskModel.status == "pending", TaskModel.due_date.isnot(None), TaskModel.recurrence.is_(None))
+        ).group_by(TaskModel.user_id, due_day),
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the per-user task counters from the tasks table")
+    parser.add_argument("--user-id", type=int, help="only this user (default: everyone)")
+    args = parser.parse_args()
+
+    from database import engine
+
+    with engine.begin() as connection:
+        rebuild(connection, args.user_id)
+    print(f"rebuilt task counters for {'user ' + str(args.user_id) if args.user_id else 'all users'}")
+
+
+if __name__ == "__main__":
+    main()
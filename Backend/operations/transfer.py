@@ -0,0 +1,150 @@
+# transfer.py
+"""Streaming export and batched import of a user's tasks (NDJSON or CSV)."""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task as TaskModel
+from operations import crud
+from schemas import Task, TaskCreate
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Same fields, in the same order, as the schemas.Task response
+EXPORT_FIELDS = list(Task.model_fields)
+
+# Task fields holding lists, written to CSV cells as JSON
+LIST_FIELDS = ("reminder_offsets",)
+
+EXPORT_CHUNK_ROWS = 1000
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+async def _export_rows(db: AsyncSession, user_id: int) -> AsyncIterator:
+    """Yield the user's tasks as plain rows from a server-side cursor"""
+    columns = [getattr(TaskModel, field) for field in EXPORT_FIELDS]
+    result = await db.stream(
+        select(*columns)
+        .where(TaskModel.user_id == user_id)
+        .order_by(TaskModel.id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _cell(value):
+    return json.dumps(value) if isinstance(value, list) else _plain(value)
+
+
+async def export_ndjson(db: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    lines = []
+    async for row in _export_rows(db, user_id):
+        record = {field: _plain(value) for field, value in zip(EXPORT_FIELDS, row)}
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def export_csv(db: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    async for row in _export_rows(db, user_id):
+        writer.writerow([_cell(value) for value in row])
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _parse_ndjson(stream: io.TextIOBase) -> Iterator[tuple[int, dict]]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            # A bad line only loses that record
+            yield line_number, e
+
+
+def _parse_csv(stream: io.TextIOBase) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(stream)
+    for record in reader:
+        # Empty cells mean "not set", not the empty string
+        record = {key: value for key, value in record.items() if value != ""}
+        try:
+            for field in LIST_FIELDS:
+                if field in record:
+                    record[field] = json.loads(record[field])
+        except json.JSONDecodeError as e:
+            yield reader.line_num, e
+            continue
+        yield reader.line_num, record
+
+
+async def import_tasks(
+    db: AsyncSession, user_id: int, stream: io.TextIOBase, fmt: str
+) -> dict:
+    """Create tasks from an NDJSON/CSV text stream, inserting in batches
+    (reminders included).
+
+    Ids and timestamps in the input are ignored; invalid records are skipped
+    and reported by line number.
+    """
+    parse = _parse_ndjson if fmt == "ndjson" else _parse_csv
+    imported = 0
+    errors = []
+    batch: list[TaskCreate] = []
+
+    async def flush():
+        nonlocal imported, batch
+        await crud.bulk_create_tasks(db, batch, user_id)
+        imported += len(batch)
+        batch = []
+
+    records: Iterable = parse(stream)
+    while True:
+        try:
+            line_number, record = next(records)
+        except StopIteration:
+            break
+        except (ValueError, csv.Error) as e:
+            # The parser cannot continue past malformed input
+            errors.append({"line": None, "detail": f"Unreadable input: {e}"})
+            break
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(TaskCreate.model_validate(record))
+        except (ValidationError, json.JSONDecodeError) as e:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                detail = e.errors(include_url=False, include_context=False) if isinstance(e, ValidationError) else str(e)
+                errors.append({"line": line_number, "detail": detail})
+            continue
+        if len(batch) == IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+    return {"imported": imported, "errors": errors}
@@ -1,26 +1,44 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
-from auth.security import hash_password, verify_password
+from auth.hashing import hash_password_async, verify_password_async
 
-def get_user_by_email(db, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
 
 
-def create_user(db, username: str, email: str, password: str):
+async def _find_user_detached(db: AsyncSession, email: str):
+    """Look up a user and hand the connection back to the pool.
+
+    Hashing can queue for a while under load; holding a pooled connection
+    across it would starve every other request of connections.
+    """
+    user = await get_user_by_email(db, email)
+    if user is not None:
+        db.expunge(user)
+    await db.rollback()
+    return user
+
+
+async def email_registered(db: AsyncSession, email: str) -> bool:
+    return await _find_user_detached(db, email) is not None
+
+
+async def create_user(db: AsyncSession, username: str, email: str, password: str):
     user = User(
         username=username,
         email=email,
-        hashed_password=hash_password(password)
+        hashed_password=await hash_password_async(password)
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return user
 
 
-def authenticate_user(db, email: str, password: str):
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await _find_user_detached(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
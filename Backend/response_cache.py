@@ -0,0 +1,172 @@
+# response_cache.py
+"""Per-user data versions, strong ETags and a cache of rendered GET responses.
+
+Every write path calls ``response_cache.bump(user_id)`` after committing.
+GET endpoints answer through ``cached_json``, whose ETag is derived from the
+user's version and the request path and query. A matching If-None-Match gets a 304
+before any query runs; an unchanged response is served from a byte-bounded
+LRU without querying or serialising again.
+
+Views that depend on the clock (upcoming, overdue, summary) also include
+the current ``response_cache_window_seconds`` window in their tag, so they
+are recomputed at least that often.
+
+Versions live in this process, like the token cache: with several API
+processes a write served by one is not seen by the others, which would go
+on answering 304 and stale bodies. So the cache is off unless
+RESPONSE_CACHE_ENABLED=true, which is only safe with a single API process.
+"""
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Awaitable, Callable, Optional, Union
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from config import settings
+
+# Tags from before a restart must not match the versions counted since
+_EPOCH = secrets.token_hex(4)
+
+Rendered = Union[bytes, tuple[bytes, dict]]
+
+
+class ResponseCache:
+    """Versions per user plus an LRU of (etag, body, headers) per request"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._versions: dict[int, int] = {}
+        self._entries: "OrderedDict[tuple, tuple[str, bytes, dict]]" = OrderedDict()
+        self._keys_by_user: dict[int, set] = {}
+        self._bytes = 0
+        self._lock = Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int):
+        """Invalidate everything rendered for ``user_id``; call after commit"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def etag(self, user_id: int, variant: str) -> str:
+        digest = hashlib.blake2b(f"{user_id}:{variant}".encode(), digest_size=8).hexdigest()
+        return f'"{_EPOCH}-{self.version(user_id)}-{digest}"'
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def get(self, key: tuple, etag: str) -> Optional[tuple[bytes, dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: tuple, etag: str, body: bytes, headers: dict):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            # A bump while rendering already made this tag stale
+            if not etag.startswith(f'"{_EPOCH}-{self._versions.get(key[0], 0)}-'):
+                return
+            self._remove(key)
+            self._entries[key] = (etag, body, headers)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[1])
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+response_cache = ResponseCache(max_bytes=settings.response_cache_bytes)
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def json_body(adapter: TypeAdapter, value) -> bytes:
+    """Serialise ORM objects through a response schema, as FastAPI would"""
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+async def cached_json(
+    request: Request,
+    user_id: int,
+    render: Callable[[], Awaitable[Rendered]],
+    clock_dependent: bool = False,
+) -> Response:
+    """Answer a GET from the user's version: 304, a cached body or ``render()``.
+
+    ``render`` returns the JSON body, or (body, extra headers).
+    """
+    if not settings.response_cache_enabled:
+        rendered = await render()
+        body, headers = rendered if isinstance(rendered, tuple) else (rendered, {})
+        return Response(body, media_type="application/json", headers=headers)
+
+    variant = request.url.path + "?" + "&".join(sorted(request.url.query.split("&")))
+    tagged = variant
+    if clock_dependent:
+        tagged += f"@{int(time.time() // settings.response_cache_window_seconds)}"
+    etag = response_cache.etag(user_id, tagged)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _matches(request.headers.get("if-none-match"), etag):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=cache_headers)
+
+    key = (user_id, variant)
+    cached = response_cache.get(key, etag)
+    if cached is None:
+        rendered = await render()
+        body, headers = rendered if isinstance(rendered, tuple) else (rendered, {})
+        response_cache.put(key, etag, body, headers)
+    else:
+        body, headers = cached
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
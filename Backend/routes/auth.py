@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from schemas import UserCreate, UserLogin, Token
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_read_db
+from schemas import ReminderOffsets, UserCreate, UserLogin, Token
 import operations.userAuth as userAuth
+from auth.dependencies import get_current_user
 from auth.security import create_access_token
+from auth.token_cache import CurrentUser
+from operations import crud
+from operations.reminders import effective_offsets
 
 router = APIRouter()
 
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing = userAuth.get_user_by_email(db, user.email)
-    if existing:
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    if await userAuth.email_registered(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    new_user = userAuth.create_user(db, user.username, user.email, user.password)
+    new_user = await userAuth.create_user(db, user.username, user.email, user.password)
     token = create_access_token({"sub": str(new_user.id)})
 
     return {
@@ -27,8 +30,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    authenticated = userAuth.authenticate_user(db, user.email, user.password)
+async def login(user: UserLogin, db: AsyncSession = Depends(get_read_db)):
+    authenticated = await userAuth.authenticate_user(db, user.email, user.password)
     if not authenticated:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -41,4 +44,25 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
             "email": authenticated.email,
             "username": authenticated.username
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/me/reminder-offsets", response_model=ReminderOffsets)
+async def get_reminder_offsets(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Default reminder offsets (minutes before due) of the user's tasks"""
+    return {"offsets": list(effective_offsets(None, await crud.get_reminder_offsets(db, current_user.id)))}
+
+
+@router.put("/me/reminder-offsets", response_model=ReminderOffsets)
+async def set_reminder_offsets(
+    payload: ReminderOffsets,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Change the default reminder offsets (null: the server's) and move the
+    reminders of every task without its own"""
+    await crud.set_reminder_offsets(db, current_user.id, payload.offsets)
+    return {"offsets": list(effective_offsets(None, payload.offsets))}
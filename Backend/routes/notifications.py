@@ -1,86 +1,299 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-
-from database import get_db
-from auth.dependencies import get_current_user
-from models import User
-from schemas import Task, Notification as NotificationSchema
+import asyncio
+from collections import deque
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from config import settings
+from database import ReadSessionLocal, get_db, get_read_db
+from fast_json import NOTIFICATIONS, TASKS
+from response_cache import cached_json, json_body, response_cache
+from auth.dependencies import get_current_user, get_stream_user
+from auth.token_cache import CurrentUser
+from schemas import (
+    InsightsResponse,
+    Notification as NotificationSchema,
+    NotificationMarkRead,
+    NotificationMarkReadResult,
+    Task,
+    UnreadCount,
+)
 import operations.features as features
+import operations.notifications as notifications
+from workers.notification_hub import QUEUE_SIZE, notification_hub
+from workers.reminder_worker import notification_event
 
 router = APIRouter()
 
 from models import Notification
 
+TASK_LIST = TypeAdapter(List[Task])
+NOTIFICATION_LIST = TypeAdapter(List[NotificationSchema])
+INSIGHTS = TypeAdapter(InsightsResponse)
+UNREAD_COUNT = TypeAdapter(UnreadCount)
+
+
 @router.get("/", response_model=list[NotificationSchema])
-def get_notifications(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_notifications(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    unread: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Sent notifications, newest first (only unread ones with ``unread``).
+    Pass the X-Next-Cursor header of a page back as ``cursor`` for the next."""
+    columns = NOTIFICATIONS.columns if settings.fast_json else None
+
+    async def render():
+        try:
+            page = await notifications.feed(db, current_user.id, limit, cursor, unread, columns)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        next_cursor = notifications.next_cursor(page, limit)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        body = NOTIFICATIONS.dumps(page) if columns else json_body(NOTIFICATION_LIST, page)
+        return body, headers
+
+    return await cached_json(request, current_user.id, render)
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    async def render():
+        return json_body(UNREAD_COUNT, {"unread": await notifications.unread_count(db, current_user.id)})
+
+    return await cached_json(request, current_user.id, render)
+
+
+@router.post("/read", response_model=NotificationMarkReadResult)
+async def mark_notifications_read(
+    payload: NotificationMarkRead,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return (
-        db.query(Notification)
-        .filter(
-            Notification.user_id == current_user.id,
-            Notification.sent == True
+    """Mark the given notifications, or all of them, read in one UPDATE"""
+    return {"updated": await notifications.mark_read(db, current_user.id, payload.ids)}
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+async def _sent_since(user_id: int, last_event_id: Optional[int], since: Optional[datetime] = None) -> list:
+    """Notifications sent to a user after the one with id ``last_event_id``,
+    or at/after ``since`` when no id is known"""
+    async with ReadSessionLocal() as db:
+        query = select(Notification).where(
+            Notification.user_id == user_id,
+            Notification.sent_at.isnot(None),
         )
-        .order_by(Notification.created_at.desc())
-        .all()
+        last_sent_at = None
+        if last_event_id is not None:
+            last_sent_at = await db.scalar(
+                select(Notification.sent_at).where(
+                    Notification.id == last_event_id,
+                    Notification.user_id == user_id,
+                )
+            )
+        if last_sent_at is not None:
+            query = query.where(
+                (Notification.sent_at > last_sent_at)
+                | ((Notification.sent_at == last_sent_at) & (Notification.id > last_event_id))
+            )
+        elif since is not None:
+            query = query.where(Notification.sent_at >= since)
+        return [
+            notification_event(notification)
+            for notification in await db.scalars(query.order_by(Notification.sent_at, Notification.id))
+        ]
+
+
+class _RecentIds:
+    """The last ``size`` ids added; a hub event can only repeat one of the
+    latest events replayed from the DB, as at most a queue's worth of them
+    can still be waiting in the hub"""
+
+    def __init__(self, size: int = 2 * QUEUE_SIZE):
+        self._order = deque(maxlen=size)
+        self._ids = set()
+
+    def add(self, event_id: int):
+        if event_id in self._ids:
+            return
+        if len(self._order) == self._order.maxlen:
+            self._ids.discard(self._order[0])
+        self._order.append(event_id)
+        self._ids.add(event_id)
+
+    def __contains__(self, event_id: int) -> bool:
+        return event_id in self._ids
+
+
+def _sse(event: dict) -> str:
+    data = NotificationSchema(**event).model_dump_json()
+    return f"id: {event['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    current_user: CurrentUser = Depends(get_stream_user),
+):
+    """Server-sent events for reminders as the worker sends them.
+
+    Reconnecting clients pass the last id they saw (EventSource does this
+    through the Last-Event-ID header) and first receive what they missed.
+    When another process sends the reminders, the stream polls for them
+    every ``notification_poll_seconds`` instead.
+    """
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    connected_at = datetime.now()
+    subscription = notification_hub.subscribe(current_user.id)
+
+    async def events():
+        last_id = resume_from
+        # Ids sent from the DB, which may also still arrive through the hub
+        replayed = _RecentIds()
+        try:
+            yield "retry: 5000\n\n"
+            if resume_from is not None:
+                for event in await _sent_since(current_user.id, resume_from):
+                    replayed.add(event["id"])
+                    last_id = event["id"]
+                    yield _sse(event)
+
+            while not await request.is_disconnected():
+                if subscription.lagged:
+                    # Events were dropped while this client was slow; resync
+                    subscription.lagged = False
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    missed = await _sent_since(current_user.id, last_id, connected_at)
+                    for event in missed:
+                        replayed.add(event["id"])
+                        last_id = event["id"]
+                        yield _sse(event)
+                    continue
+
+                local = notification_hub.local_worker
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        STREAM_KEEPALIVE_SECONDS if local else settings.notification_poll_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    sent = [] if local else await _sent_since(current_user.id, last_id, connected_at)
+                    for event in sent:
+                        if event["id"] not in replayed:
+                            replayed.add(event["id"])
+                            last_id = event["id"]
+                            yield _sse(event)
+                    if not sent:
+                        yield ": keepalive\n\n"
+                    continue
+                if event["id"] in replayed:
+                    continue
+                last_id = event["id"]
+                yield _sse(event)
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+async def _task_list(view, db: AsyncSession, user_id: int, **options) -> bytes:
+    if settings.fast_json:
+        return TASKS.dumps(await view(db, user_id, columns=TASKS.columns, **options))
+    return json_body(TASK_LIST, await view(db, user_id, **options))
+
+
 @router.get("/reminders", response_model=List[Task])
-def get_reminders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_reminders(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return features.reminders(db, current_user.id)
+    async def render():
+        return await _task_list(features.reminders, db, current_user.id)
+
+    return await cached_json(request, current_user.id, render, clock_dependent=True)
 
 
 @router.get("/upcoming", response_model=List[Task])
-def get_upcoming_tasks(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_upcoming_tasks(
+    request: Request,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return features.upcoming_tasks(db, current_user.id)
+    """Pending tasks due from now (up to ``until``); recurring tasks once per
+    occurrence in that window"""
+    async def render():
+        return await _task_list(features.upcoming_tasks, db, current_user.id, until=until)
+
+    return await cached_json(request, current_user.id, render, clock_dependent=True)
 
 
 @router.get("/overdue", response_model=List[Task])
-def get_overdue_tasks(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_overdue_tasks(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return features.overdue_tasks(db, current_user.id)
+    async def render():
+        return await _task_list(features.overdue_tasks, db, current_user.id)
 
+    return await cached_json(request, current_user.id, render, clock_dependent=True)
 
-@router.get("/summary")
-def get_insights(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+
+@router.get("/summary", response_model=InsightsResponse)
+async def get_insights(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return features.insights(db, current_user.id)
+    async def render():
+        return json_body(INSIGHTS, await features.insights(db, current_user.id))
+
+    return await cached_json(request, current_user.id, render, clock_dependent=True)
 
 @router.put("/{notification_id}", response_model=NotificationSchema)
-def mark_notification_read(
+async def mark_notification_read(
     notification_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    # Get the notification
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id
-    ).first()
-    
-    # Check if notification exists
+    # Mark as read and read it back in one statement
+    notification = (await db.execute(
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == current_user.id)
+        .values(is_read=True, read_at=datetime.now())
+        .returning(*NOTIFICATIONS.columns)
+        .execution_options(synchronize_session=False)
+    )).first()
+
     if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
-    
-    # Check if notification belongs to current user
-    if notification.user_id != current_user.id:
+        # Check if notification exists at all, to tell 404 from 403
+        exists = await db.scalar(select(Notification.id).where(Notification.id == notification_id))
+        if not exists:
+            raise HTTPException(status_code=404, detail="Notification not found")
         raise HTTPException(status_code=403, detail="Not authorized to modify this notification")
-    
-    # Mark as read
-    notification.is_read = True
-    db.commit()
-    db.refresh(notification)
-    
+
+    await db.commit()
+    response_cache.bump(current_user.id)
     return notification
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+import operations.sync as sync
+from database import get_read_db
+from schemas import SyncResponse
+from auth.dependencies import get_current_user
+from auth.token_cache import CurrentUser
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+async def sync_changes(
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Tasks and notifications changed since the ``token`` of the previous
+    sync; without ``since`` (or when it is too old) everything, with ``full``.
+
+    Apply ``deleted`` first, then upsert ``tasks`` by id: changes near the
+    token are sent again on the next sync.
+    """
+    try:
+        return await sync.changes(db, current_user.id, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
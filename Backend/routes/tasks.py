@@ -1,85 +1,216 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
 import operations.crud as crud
-from database import get_db
-from schemas import Task, TaskCreate
+import operations.pagination as pagination
+import operations.transfer as transfer
+from config import settings
+from database import get_db, get_read_db
+from fast_json import TASKS
+from response_cache import cached_json, json_body
+from schemas import (
+    BulkItemResult,
+    Task,
+    TaskBulkCreateRequest,
+    TaskBulkDeleteRequest,
+    TaskBulkUpdateRequest,
+    TaskCreate,
+)
 from auth.dependencies import get_current_user
-from models import User
+from auth.token_cache import CurrentUser
 
 router = APIRouter()
 
+TASK = TypeAdapter(Task)
+TASK_LIST = TypeAdapter(List[Task])
+
 
 @router.get("/", response_model=List[Task])
-def read_tasks(
+async def read_tasks(
+    request: Request,
     status: Optional[str] = None,
     priority: Optional[int] = None,
     due_before: Optional[datetime] = None,
     due_after: Optional[datetime] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    sort_by: str = "created_at",
+    cursor: Optional[str] = None,
+    sort_by: Optional[str] = None,
     order: str = Query("desc", pattern="^(asc|desc)$"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    q: Optional[str] = Query(None, max_length=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return crud.get_tasks_for_user(
-        db=db,
-        user_id=current_user.id,
-        status=status,
-        priority=priority,
-        due_before=due_before,
-        due_after=due_after,
-        limit=limit,
-        offset=offset,
-        sort_by=sort_by,
-        order=order,
-    )
+    """List tasks. Pass the X-Next-Cursor header of a page back as ``cursor``
+    to fetch the next one by keyset instead of ``offset``.
+
+    ``q`` searches titles, descriptions and categories; matches are ranked by relevance
+    unless another ``sort_by`` is given.
+    """
+    if sort_by is None or (sort_by == pagination.RELEVANCE and not q):
+        sort_by = pagination.RELEVANCE if q else "created_at"
+    columns = None
+    if settings.fast_json:
+        sort_column = pagination.SORTABLE_COLUMNS.get(sort_by)
+        columns = TASKS.columns_with(sort_column) if sort_column is not None else TASKS.columns
+
+    async def render():
+        nonlocal cursor, offset
+        try:
+            if cursor and sort_by == pagination.RELEVANCE:
+                offset, cursor = pagination.decode_offset_cursor(cursor, q), None
+            tasks = await crud.get_tasks_for_user(
+                db=db,
+                user_id=current_user.id,
+                status=status,
+                priority=priority,
+                due_before=due_before,
+                due_after=due_after,
+                limit=limit,
+                offset=offset,
+                sort_by=sort_by,
+                order=order,
+                cursor=cursor,
+                q=q,
+                columns=columns,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if sort_by == pagination.RELEVANCE:
+            next_cursor = pagination.next_offset_cursor(tasks, limit, offset, q)
+        else:
+            next_cursor = pagination.next_cursor(tasks, limit, sort_by, order)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        body = TASKS.dumps(tasks) if columns else json_body(TASK_LIST, tasks)
+        return body, headers
+
+    return await cached_json(request, current_user.id, render)
 
 
 @router.post("/", response_model=Task)
-def create_task(
+async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return await crud.create_task(db, task, current_user.id)
+
+
+@router.post("/bulk", response_model=List[BulkItemResult])
+async def bulk_create_tasks(
+    payload: TaskBulkCreateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    tasks = await crud.bulk_create_tasks(db, payload.tasks, current_user.id)
+    return [
+        BulkItemResult(index=index, id=task.id, status="created", task=task)
+        for index, task in enumerate(tasks)
+    ]
+
+
+@router.put("/bulk", response_model=List[BulkItemResult])
+async def bulk_update_tasks(
+    payload: TaskBulkUpdateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return crud.create_task(db, task, current_user.id)
+    updated = await crud.bulk_update_tasks(db, payload.tasks, current_user.id)
+    return [
+        BulkItemResult(index=index, id=item.id, status="updated", task=updated[item.id])
+        if item.id in updated
+        else BulkItemResult(index=index, id=item.id, status="not_found")
+        for index, item in enumerate(payload.tasks)
+    ]
+
+
+@router.delete("/bulk", response_model=List[BulkItemResult])
+async def bulk_delete_tasks(
+    payload: TaskBulkDeleteRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    deleted = await crud.bulk_delete_tasks(db, payload.ids, current_user.id)
+    return [
+        BulkItemResult(index=index, id=task_id, status="deleted" if task_id in deleted else "not_found")
+        for index, task_id in enumerate(payload.ids)
+    ]
+
+
+@router.get("/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Stream every task of the user as NDJSON or CSV, in constant memory"""
+    rows = transfer.export_ndjson if format == "ndjson" else transfer.export_csv
+    return StreamingResponse(
+        rows(db, current_user.id),
+        media_type=transfer.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+@router.post("/import")
+async def import_tasks(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Create tasks from an uploaded NDJSON or CSV export, in batches"""
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await transfer.import_tasks(db, current_user.id, stream, format)
+    finally:
+        stream.detach()
 
 
 @router.get("/{task_id}", response_model=Task)
-def read_task(
+async def read_task(
+    request: Request,
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    task = crud.get_task_for_user(db, task_id, current_user.id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    async def render():
+        task = await crud.get_task_for_user(db, task_id, current_user.id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return json_body(TASK, task)
+
+    return await cached_json(request, current_user.id, render)
 
 
 @router.put("/{task_id}", response_model=Task)
-def update_task(
+async def update_task(
     task_id: int,
     task: TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    updated = crud.update_task(db, task_id, task, current_user.id)
+    updated = await crud.update_task(db, task_id, task, current_user.id)
     if not updated:
         raise HTTPException(status_code=404, detail="Task not found")
     return updated
 
 
 @router.delete("/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    success = crud.delete_task(db, task_id, current_user.id)
+    success = await crud.delete_task(db, task_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"detail": "Task deleted"}
@@ -1,8 +1,19 @@
 # schemas.py
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator, model_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from operations import recurrence as recurrence_rules
+from operations.reminders import normalize_offsets
+
+
+def _recurrence(value: Optional[str]) -> Optional[str]:
+    return recurrence_rules.normalize(value) if value else None
+
+
+def _offsets(value: Optional[List[int]]) -> Optional[List[int]]:
+    return normalize_offsets(value) if value is not None else None
+
 
 class TaskBase(BaseModel):
     title: str
@@ -13,10 +24,22 @@ class TaskBase(BaseModel):
     category: Optional[str] = "General"
     reminder_enabled: bool = True
     completed: bool = False
+    # RRULE, e.g. "FREQ=WEEKLY;BYDAY=MO,TH"; due_date is the first occurrence
+    recurrence: Optional[str] = None
+    # Minutes before due_date to remind at, e.g. [1440, 60, 10]; None: the
+    # user's default
+    reminder_offsets: Optional[List[int]] = None
 
 
 class TaskCreate(TaskBase):
-    pass
+    _normalize_recurrence = field_validator("recurrence")(_recurrence)
+    _normalize_offsets = field_validator("reminder_offsets")(_offsets)
+
+    @model_validator(mode="after")
+    def _recurrence_needs_start(self):
+        if self.recurrence and not self.due_date:
+            raise ValueError("A recurring task needs a due_date (its first occurrence)")
+        return self
 
 
 class TaskUpdate(BaseModel):
@@ -28,6 +51,30 @@ class TaskUpdate(BaseModel):
     category: Optional[str] = None
     reminder_enabled: Optional[bool] = None
     completed: Optional[bool] = None
+    recurrence: Optional[str] = None
+    reminder_offsets: Optional[List[int]] = None
+
+    _normalize_recurrence = field_validator("recurrence")(_recurrence)
+    _normalize_offsets = field_validator("reminder_offsets")(_offsets)
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+BULK_MAX_ITEMS = 10000
+
+
+class TaskBulkCreateRequest(BaseModel):
+    tasks: List[TaskCreate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateRequest(BaseModel):
+    tasks: List[TaskBulkUpdate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkDeleteRequest(BaseModel):
+    ids: List[int] = Field(..., max_length=BULK_MAX_ITEMS)
 
 
 class Task(TaskBase):
@@ -39,6 +86,13 @@ class Task(TaskBase):
         from_attributes = True
 
 
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # "created" / "updated" / "deleted" / "not_found"
+    task: Optional[Task] = None
+
+
 class InsightsResponse(BaseModel):
     total_tasks: int
     completed_tasks: int
@@ -48,6 +102,9 @@ class InsightsResponse(BaseModel):
     upcoming_tasks: int
     completion_rate: float
     avg_completion_time: Optional[float] = None
+    by_status: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}
+    by_category: Dict[str, int] = {}
 
 
 class Notification(BaseModel):
@@ -61,6 +118,41 @@ class Notification(BaseModel):
         from_attributes = True
 
 
+class NotificationMarkRead(BaseModel):
+    # The notifications to mark read, or every unread one with all=true
+    ids: Optional[List[int]] = Field(default=None, max_length=BULK_MAX_ITEMS)
+    all: bool = False
+
+    @model_validator(mode="after")
+    def _ids_or_all(self):
+        if (self.ids is None) == (not self.all):
+            raise ValueError("Pass either ids or all=true")
+        return self
+
+
+class NotificationMarkReadResult(BaseModel):
+    updated: int
+
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
+class SyncResponse(BaseModel):
+    token: str  # pass back as ``since`` on the next sync
+    full: bool  # everything, not changes: replace what the client holds
+    tasks: List[Task]
+    deleted: List[int]
+    notifications: List[Notification]
+
+
+class ReminderOffsets(BaseModel):
+    # Minutes before due date; None resets to the server default
+    offsets: Optional[List[int]] = None
+
+    _normalize_offsets = field_validator("offsets")(_offsets)
+
+
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
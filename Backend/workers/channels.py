@@ -0,0 +1,194 @@
+# channels.py
+"""External channels the delivery pipeline sends reminders through.
+
+A channel is opened once on the pipeline's event loop and shared by all of
+its senders, so it can keep connections alive between deliveries: the
+webhook channel has one pooled HTTP client, the SMTP channel a pool of
+logged-in SMTP connections. ``send`` raises DeliveryError; a permanent one
+(the receiver rejected the reminder) is not retried.
+
+More channels are added with ``register_channel``.
+"""
+import abc
+import asyncio
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Callable, Optional
+
+import httpx
+import orjson
+
+from config import settings
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class Channel(abc.ABC):
+    """Sends one delivery at a time per caller; up to ``concurrency``
+    callers at once"""
+
+    name = ""
+    # True when send() enforces delivery_timeout_seconds itself and must not
+    # be cancelled mid-send, e.g. because it runs on a thread
+    times_itself = False
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+
+    async def open(self):
+        pass
+
+    @abc.abstractmethod
+    async def send(self, delivery):
+        ...
+
+    async def aclose(self):
+        pass
+
+
+def payload(delivery) -> dict:
+    return {
+        "id": delivery.notification_id,
+        "user_id": delivery.user_id,
+        "task_id": delivery.task_id,
+        "message": delivery.message,
+        "scheduled_for": delivery.scheduled_for,
+        "lead_minutes": delivery.lead_minutes,
+    }
+
+
+class WebhookChannel(Channel):
+    """POSTs each reminder as JSON to ``settings.webhook_url``.
+
+    Carries an Idempotency-Key, since a delivery whose outcome was lost (the
+    process died mid-request) is sent again.
+    """
+
+    name = "webhook"
+
+    def __init__(self, concurrency: int, url: Optional[str] = None):
+        super().__init__(concurrency)
+        self.url = url or settings.webhook_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def open(self):
+        if not self.url:
+            raise ValueError("WEBHOOK_URL is not set")
+        self._client = httpx.AsyncClient(
+            timeout=settings.delivery_timeout_seconds,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+
+    async def send(self, delivery):
+        try:
+            response = await self._client.post(
+                self.url,
+                content=orjson.dumps(payload(delivery)),
+                headers={
+                    "Content-Type": "application/json",
+                    "Idempotency-Key": f"notification-{delivery.notification_id}",
+                },
+            )
+        except httpx.HTTPError as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}") from e
+        if response.status_code >= 300:
+            # Client errors other than timeouts and throttling will not improve on retry
+            permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+            raise DeliveryError(f"HTTP {response.status_code}", permanent=permanent)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SmtpChannel(Channel):
+    """Mails each reminder to its user's address.
+
+    smtplib blocks, so sends run on the channel's own threads, and a slow
+    mail server only ties up those. Connections are kept between sends, at
+    most one per thread. Cancelling a send would not stop its thread, which
+    could still deliver a message recorded as timed out, so every socket
+    operation has ``delivery_timeout_seconds`` instead.
+    """
+
+    name = "smtp"
+    times_itself = True
+
+    def __init__(self, concurrency: int):
+        super().__init__(concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._idle: list[smtplib.SMTP] = []
+
+    async def open(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="smtp")
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.delivery_timeout_seconds)
+        if settings.smtp_starttls:
+            connection.starttls()
+        if settings.smtp_username:
+            connection.login(settings.smtp_username, settings.smtp_password)
+        return connection
+
+    def _send(self, message: EmailMessage):
+        connection = self._idle.pop() if self._idle else self._connect()
+        try:
+            connection.send_message(message)
+        except smtplib.SMTPRecipientsRefused as e:
+            self._idle.append(connection)
+            raise DeliveryError(f"recipient refused: {e.recipients}", permanent=True) from e
+        except (smtplib.SMTPException, OSError) as e:
+            # The connection may be broken; a retry opens a new one
+            _quit(connection)
+            raise DeliveryError(f"{type(e).__name__}: {e}") from e
+        self._idle.append(connection)
+
+    async def send(self, delivery):
+        if not delivery.email:
+            raise DeliveryError("user has no email address", permanent=True)
+        message = EmailMessage()
+        try:
+            message["From"] = settings.smtp_sender
+            message["To"] = delivery.email
+            # A task title may hold line breaks, which a header cannot
+            message["Subject"] = " ".join(delivery.message.splitlines())
+        except ValueError as e:
+            raise DeliveryError(f"invalid header: {e}", permanent=True) from e
+        message.set_content(f"{delivery.message}\n")
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._send, message)
+        except (smtplib.SMTPException, OSError) as e:
+            # Connecting failed
+            raise DeliveryError(f"{type(e).__name__}: {e}") from e
+
+    async def aclose(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        while self._idle:
+            _quit(self._idle.pop())
+
+
+def _quit(connection: smtplib.SMTP):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+CHANNELS: dict[str, Callable[[int], Channel]] = {
+    WebhookChannel.name: WebhookChannel,
+    SmtpChannel.name: SmtpChannel,
+}
+
+
+def register_channel(name: str, factory: Callable[[int], Channel]):
+    """Make ``name`` usable in ``settings.delivery_channels``; ``factory``
+    takes the concurrency limit"""
+    CHANNELS[name] = factory
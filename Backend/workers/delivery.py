@@ -0,0 +1,353 @@
+# delivery.py
+"""Delivers sent reminders through the channels in ``settings.delivery_channels``.
+
+Sending a reminder marks it sent, which is its in-app delivery (feed and
+streams), and in the same transaction adds a pending row per external
+channel to ``notification_deliveries``. The pipeline runs those rows out on
+its own event loop, in the process that runs the scheduler.
+
+Each channel has its own lane: a feeder claims due rows (a lease, like
+reminder claims) only as far as its bounded queue has room, and
+``delivery_concurrency`` senders take from the queue. The database is the
+backlog, so memory stays bounded however far a channel falls behind, and a
+slow or failing channel only fills its own queue. A failed send is retried
+with exponential backoff; after ``delivery_max_attempts``, or when the
+receiver rejects it outright, the row is left "dead" with its last error.
+
+Delivery is at least once: a send whose outcome was not recorded before the
+process died is made again once its lease runs out.
+"""
+import asyncio
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, insert, literal_column, or_, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Notification, NotificationDelivery, User
+from workers.channels import CHANNELS, Channel, DeliveryError
+
+logger = logging.getLogger(__name__)
+
+# Cumulative outcomes, e.g. for a metrics endpoint
+delivery_stats = {"delivered": 0, "retried": 0, "dead": 0}
+
+# How long outcomes gather before they are written together
+RECORD_DELAY_SECONDS = 0.05
+
+# Inlined rather than bound, so SQLite can use the partial index
+_PENDING = NotificationDelivery.status == literal_column("'pending'")
+
+
+def enqueue_deliveries(db: Session, notification_ids: Sequence[int], channels: Optional[Sequence[str]] = None):
+    """Add a pending delivery per channel for each sent notification, in
+    the caller's transaction"""
+    channels = settings.delivery_channels if channels is None else channels
+    if not channels or not notification_ids:
+        return
+    now = datetime.now()
+    db.execute(insert(NotificationDelivery), [
+        {"notification_id": notification_id, "channel": channel, "next_attempt_at": now, "created_at": now}
+        for notification_id in notification_ids
+        for channel in channels
+    ])
+
+
+def _claimable(channel: str, now: datetime):
+    return (
+        _PENDING,
+        NotificationDelivery.channel == channel,
+        NotificationDelivery.next_attempt_at <= now,
+        or_(NotificationDelivery.claimed_until.is_(None), NotificationDelivery.claimed_until < now),
+    )
+
+
+def lease_seconds() -> float:
+    """How long a claim is held: ``delivery_lease_seconds``, or longer if a
+    full queue could take longer than that to drain at one timed-out send
+    per sender, so a queued delivery is not claimed and sent again meanwhile.
+    Doubled, since a self-timed send may take several socket timeouts."""
+    rounds = math.ceil(settings.delivery_queue_size / max(settings.delivery_concurrency, 1)) + 1
+    return max(settings.delivery_lease_seconds, 2 * rounds * settings.delivery_timeout_seconds)
+
+
+def claim_deliveries(channel: str, limit: int) -> list:
+    """Lease up to ``limit`` due deliveries of ``channel``; returns them
+    with what the channel needs to send them"""
+    now = datetime.now()
+    with SessionLocal() as db:
+        due = (
+            select(NotificationDelivery.id)
+            .where(*_claimable(channel, now))
+            .order_by(NotificationDelivery.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        ids = db.scalars(
+            update(NotificationDelivery)
+            .where(NotificationDelivery.id.in_(due), *_claimable(channel, now))
+            .values(claimed_until=now + timedelta(seconds=lease_seconds()))
+            .returning(NotificationDelivery.id)
+        ).all()
+        db.commit()
+        if not ids:
+            return []
+        rows = db.execute(
+            select(
+                NotificationDelivery.id,
+                NotificationDelivery.notification_id,
+                NotificationDelivery.attempts,
+                Notification.user_id,
+                Notification.task_id,
+                Notification.message,
+                Notification.scheduled_for,
+                Notification.lead_minutes,
+                User.email,
+            )
+            .join(Notification, Notification.id == NotificationDelivery.notification_id)
+            .join(User, User.id == Notification.user_id)
+            .where(NotificationDelivery.id.in_(ids))
+        ).all()
+        # Their notifications were deleted where SQLite left the foreign key
+        # unenforced (elsewhere the delete cascades)
+        orphans = set(ids) - {row.id for row in rows}
+        if orphans:
+            db.execute(delete(NotificationDelivery).where(NotificationDelivery.id.in_(orphans)))
+            db.commit()
+        return rows
+
+
+def backoff(attempts: int) -> timedelta:
+    """Wait before the retry that follows attempt number ``attempts``"""
+    seconds = settings.delivery_backoff_seconds * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.delivery_backoff_max_seconds))
+
+
+def record_outcomes(outcomes: list):
+    """Store (delivery, error, permanent) outcomes in one executemany"""
+    now = datetime.now()
+    rows = []
+    for delivery, error, permanent in outcomes:
+        attempts = delivery.attempts + 1
+        row = {"id": delivery.id, "attempts": attempts, "claimed_until": None, "last_error": error}
+        if error is None:
+            row.update(status="delivered", delivered_at=now, next_attempt_at=now)
+            delivery_stats["delivered"] += 1
+        elif permanent or attempts >= settings.delivery_max_attempts:
+            row.update(status="dead", delivered_at=None, next_attempt_at=now)
+            delivery_stats["dead"] += 1
+            logger.warning("delivery %d dead after %d attempts: %s", delivery.id, attempts, error)
+        else:
+            row.update(status="pending", delivered_at=None, next_attempt_at=now + backoff(attempts))
+            delivery_stats["retried"] += 1
+        rows.append(row)
+    with SessionLocal() as db:
+        db.execute(update(NotificationDelivery), rows)
+        db.commit()
+
+
+def release_claims(ids: Sequence[int]):
+    """Hand claimed but unsent deliveries back straight away"""
+    with SessionLocal() as db:
+        db.execute(
+            update(NotificationDelivery)
+            .where(NotificationDelivery.id.in_(ids), _PENDING)
+            .values(claimed_until=None)
+        )
+        db.commit()
+
+
+class _Lane:
+    def __init__(self, channel: Channel, queue_size: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.wakeup = asyncio.Event()
+        # Claimed and without a recorded outcome yet, by id; claims of these
+        # whose leases ran out are not queued again
+        self.claimed: dict[int, object] = {}
+        # The queue is refilled once it is down to this, so claims come in batches
+        self.low_water = queue_size // 2
+
+
+class DeliveryPipeline:
+    """Runs the channel lanes on an event loop in a background thread"""
+
+    def __init__(self, channels: Optional[Sequence[str]] = None):
+        self.channel_names = channels
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._lanes: list[_Lane] = []
+        self._outcomes: list = []
+        self._recorded: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+
+    def start(self):
+        names = settings.delivery_channels if self.channel_names is None else self.channel_names
+        if self._thread is not None or not names:
+            return
+        unknown = set(names) - set(CHANNELS)
+        if unknown:
+            raise ValueError(f"Unknown delivery channels: {', '.join(sorted(unknown))}")
+        self._ready.clear()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._main(names),), name="delivery", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        """Stop sending; queued deliveries are handed back to be claimed again"""
+        if self._thread is None:
+            return
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._thread = None
+
+    def wake(self):
+        """New deliveries were committed; safe from any thread"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake_all)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _wake_all(self):
+        for lane in self._lanes:
+            lane.wakeup.set()
+
+    async def _db(self, fn, *args):
+        return await self._loop.run_in_executor(self._db_executor, fn, *args)
+
+    async def _main(self, names: Sequence[str]):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._recorded = asyncio.Event()
+        # Database calls get their own threads, so they never wait behind a channel's
+        self._db_executor = ThreadPoolExecutor(max_workers=len(names) + 1, thread_name_prefix="delivery-db")
+        self._lanes = []
+        tasks = []
+        try:
+            for name in names:
+                lane = _Lane(CHANNELS[name](settings.delivery_concurrency), settings.delivery_queue_size)
+                try:
+                    await lane.channel.open()
+                except Exception:
+                    # Only this channel's deliveries wait, until it is fixed and the process restarted
+                    logger.exception("%s channel could not be opened; its deliveries stay pending", name)
+                    await lane.channel.aclose()
+                    continue
+                self._lanes.append(lane)
+                tasks.append(asyncio.create_task(self._feed(lane)))
+                tasks += [asyncio.create_task(self._send(lane)) for _ in range(lane.channel.concurrency)]
+            tasks.append(asyncio.create_task(self._record()))
+            self._ready.set()
+            await self._stopping.wait()
+        except Exception:
+            logger.exception("delivery pipeline failed")
+        finally:
+            self._ready.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._shutdown()
+
+    async def _shutdown(self):
+        try:
+            outcomes, self._outcomes = self._outcomes, []
+            # Sent ones are not handed back even if this fails: resending waits for their leases
+            self._settle(outcomes)
+            if outcomes:
+                await self._db(record_outcomes, [outcome[1:] for outcome in outcomes])
+            unsent = [delivery_id for lane in self._lanes for delivery_id in lane.claimed]
+            if unsent:
+                await self._db(release_claims, unsent)
+        except Exception:
+            logger.exception("could not hand back claimed deliveries; their leases will run out")
+        for lane in self._lanes:
+            await lane.channel.aclose()
+        self._db_executor.shutdown(wait=True)
+        self._lanes = []
+        self._loop = None
+
+    async def _feed(self, lane: _Lane):
+        """Keep the lane's queue topped up from the due deliveries"""
+        name = lane.channel.name
+        while True:
+            lane.wakeup.clear()
+            # Above the low-water mark a sender wakes this once it drains to it
+            if lane.queue.qsize() <= lane.low_water:
+                # Held when the claim starts; their outcomes may be recorded meanwhile
+                held = set(lane.claimed)
+                try:
+                    claimed = await self._db(claim_deliveries, name, lane.queue.maxsize - lane.queue.qsize())
+                except Exception:
+                    logger.exception("could not claim %s deliveries", name)
+                    claimed = []
+                for delivery in claimed:
+                    if delivery.id in held or delivery.id in lane.claimed:
+                        continue  # lease ran out while queued or being sent here
+                    lane.claimed[delivery.id] = delivery
+                    lane.queue.put_nowait(delivery)
+            try:
+                await asyncio.wait_for(lane.wakeup.wait(), settings.delivery_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, lane: _Lane):
+        while True:
+            delivery = await lane.queue.get()
+            if lane.queue.qsize() == lane.low_water:
+                lane.wakeup.set()
+            error, permanent = None, False
+            try:
+                if lane.channel.times_itself:
+                    await lane.channel.send(delivery)
+                else:
+                    await asyncio.wait_for(lane.channel.send(delivery), settings.delivery_timeout_seconds)
+            except DeliveryError as e:
+                error, permanent = str(e), e.permanent
+            except asyncio.TimeoutError:
+                error = f"timed out after {settings.delivery_timeout_seconds}s"
+            except Exception as e:
+                logger.exception("%s delivery %d failed", lane.channel.name, delivery.id)
+                error = f"{type(e).__name__}: {e}"
+            self._outcomes.append((lane, delivery, error, permanent))
+            self._recorded.set()
+
+    @staticmethod
+    def _settle(outcomes: list):
+        for lane, delivery, _, _ in outcomes:
+            lane.claimed.pop(delivery.id, None)
+
+    async def _record(self):
+        """Write outcomes as they come in, batching those that arrive meanwhile"""
+        while True:
+            await self._recorded.wait()
+            await asyncio.sleep(RECORD_DELAY_SECONDS)
+            self._recorded.clear()
+            outcomes, self._outcomes = self._outcomes, []
+            try:
+                await self._db(record_outcomes, [outcome[1:] for outcome in outcomes])
+            except asyncio.CancelledError:
+                # Stopping; _shutdown records them
+                self._outcomes[:0] = outcomes
+                raise
+            except Exception:
+                # Their leases run out and they are sent again
+                logger.exception("could not record %d delivery outcomes", len(outcomes))
+            # Only now may the feeder take them on again, should their leases run out
+            self._settle(outcomes)
+            # Retries and freed queue room
+            self._wake_all()
+
+
+delivery_pipeline = DeliveryPipeline()
@@ -0,0 +1,137 @@
+# leader.py
+"""Elects the one process that runs the scheduler.
+
+Every API process (with ``scheduler_mode`` "leader") and every
+``python -m workers.run`` process is a candidate. Each keeps trying to take
+the ``scheduler_leases`` row; the holder renews it every third of
+``scheduler_lease_seconds``, and when it stops renewing (it exited, hung or
+lost the database) another candidate takes over once the lease runs out.
+Taking and renewing are one conditional UPDATE, so two candidates never both
+succeed. Expiry is judged by each candidate's clock; keep them in sync.
+
+Leadership saves work rather than guarding correctness: reminder claims
+(see reminder_worker.py) already keep two schedulers that overlap for a
+moment, e.g. a leader paused past its lease, from sending a reminder twice.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from config import settings
+from database import SessionLocal
+from models import SchedulerLease
+from workers.reminder_worker import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name: str, holder: str, lease_seconds: int, now: Optional[datetime] = None) -> bool:
+    """Take or renew the lease ``name`` for ``holder``; True if it holds it"""
+    now = now or datetime.now()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    with SessionLocal() as db:
+        taken = db.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == name,
+                or_(
+                    SchedulerLease.holder == holder,
+                    SchedulerLease.expires_at.is_(None),
+                    SchedulerLease.expires_at < now,
+                ),
+            )
+            .values(holder=holder, expires_at=expires_at)
+        ).rowcount
+        if not taken and db.scalar(select(SchedulerLease.name).where(SchedulerLease.name == name)) is None:
+            # First candidate ever; a concurrent first insert makes this one lose
+            try:
+                db.execute(insert(SchedulerLease).values(name=name, holder=holder, expires_at=expires_at))
+                taken = 1
+            except IntegrityError:
+                db.rollback()
+                return False
+        db.commit()
+    return bool(taken)
+
+
+def release(name: str, holder: str):
+    """Give the lease up early, so the next leader need not wait it out"""
+    with SessionLocal() as db:
+        db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name, SchedulerLease.holder == holder)
+            .values(holder=None, expires_at=None)
+        )
+        db.commit()
+
+
+class LeaderElection:
+    """Runs ``on_elected`` when this process takes the lease and
+    ``on_deposed`` when it loses it or stops, from a background thread"""
+
+    def __init__(
+        self,
+        on_elected: Callable[[], None],
+        on_deposed: Callable[[], None],
+        name: str = "scheduler",
+        holder: str = WORKER_ID,
+        lease_seconds: Optional[int] = None,
+    ):
+        self.on_elected = on_elected
+        self.on_deposed = on_deposed
+        self.name = name
+        self.holder = holder
+        self.lease_seconds = lease_seconds or settings.scheduler_lease_seconds
+        self.leading = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop campaigning; a leader stops its work and releases the lease"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        if self.leading:
+            self._depose()
+            try:
+                release(self.name, self.holder)
+            except SQLAlchemyError:
+                logger.exception("could not release the %s lease", self.name)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.step()
+            self._stopped.wait(self.lease_seconds / 3)
+
+    def step(self):
+        """One round: take or renew the lease and act on any change"""
+        try:
+            held = acquire(self.name, self.holder, self.lease_seconds)
+        except SQLAlchemyError:
+            # Unable to renew means unable to tell whether another took over
+            logger.exception("could not renew the %s lease", self.name)
+            held = False
+        if held and not self.leading:
+            logger.info("%s elected to run the %s", self.holder, self.name)
+            self.leading = True
+            self.on_elected()
+        elif not held and self.leading:
+            self._depose()
+
+    def _depose(self):
+        logger.info("%s no longer runs the %s", self.holder, self.name)
+        self.leading = False
+        self.on_deposed()
@@ -0,0 +1,69 @@
+# notification_hub.py
+"""In-process pub/sub that fans sent reminders out to open notification streams.
+
+Subscribers live on the event loop; publishers may be any thread (the
+reminder worker runs on the scheduler's thread), so events are handed over
+with ``call_soon_threadsafe``. Only reminders sent by this process are
+published; ``local_worker`` tells streams whether that is all of them or
+whether they must also poll the database.
+"""
+import asyncio
+from threading import Lock
+
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        # Set when events were dropped; the stream then resyncs from the DB
+        self.lagged = False
+
+    def _offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class NotificationHub:
+    def __init__(self):
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._lock = Lock()
+        # True while this process runs the reminder worker (see workers/scheduler.py)
+        self.local_worker = False
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a subscriber; must be called from the event loop"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, event: dict):
+        """Deliver ``event`` to every stream of ``user_id``; safe from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+notification_hub = NotificationHub()
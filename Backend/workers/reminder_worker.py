@@ -1,27 +1,195 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, or_, select, update
 from sqlalchemy.orm import Session
-from datetime import datetime
+
+from config import settings
 from database import SessionLocal
-from models import Notification
+from models import Notification, Task, User
+from operations.reminders import REMINDER_COLUMNS, effective_offsets, reminders_for
+from response_cache import response_cache
+from workers.delivery import delivery_pipeline, enqueue_deliveries
+from workers.notification_hub import notification_hub
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in notifications.claimed_by
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Cumulative throughput counters, e.g. for a metrics endpoint
+worker_stats = {"batches": 0, "reminders": 0, "seconds": 0.0, "last_batch": None}
+
+
+def _claimable(now: datetime):
+    return (
+        Notification.sent == False,
+        Notification.scheduled_for <= now,
+        or_(Notification.claimed_until.is_(None), Notification.claimed_until < now),
+    )
+
+
+def claim_due_reminders(db: Session, now: datetime, batch_size: int, worker_id: str = WORKER_ID) -> list:
+    """Lease up to ``batch_size`` due reminders to ``worker_id``.
+
+    The claim is a single UPDATE ... RETURNING and is committed straight away,
+    so concurrent workers never get the same rows. A claim that is not
+    completed (the worker died) becomes claimable again once its lease runs out.
+    """
+    due = (
+        select(Notification.id)
+        .where(*_claimable(now))
+        .order_by(Notification.scheduled_for)
+        .limit(batch_size)
+        # PostgreSQL: skip rows another worker is claiming instead of queueing behind it
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    claimed = db.execute(
+        update(Notification)
+        .where(Notification.id.in_(due), *_claimable(now))
+        .values(
+            claimed_by=worker_id,
+            claimed_until=now + timedelta(seconds=settings.reminder_lease_seconds),
+        )
+        .returning(
+            Notification.id,
+            Notification.user_id,
+            Notification.task_id,
+            Notification.scheduled_for,
+            Notification.lead_minutes,
+            Notification.message,
+            Notification.created_at,
+            Notification.is_read,
+        )
+    ).all()
+    db.commit()
+    return claimed
+
+
+def mark_sent(db: Session, ids: list, worker_id: str = WORKER_ID) -> list:
+    """Complete a claim, queueing the external deliveries of what was sent;
+    returns the ids that were still leased to this worker"""
+    sent = db.scalars(
+        update(Notification)
+        .where(
+            Notification.id.in_(ids),
+            Notification.claimed_by == worker_id,
+            Notification.sent == False,
+        )
+        .values(sent=True, sent_at=datetime.now(), claimed_until=None)
+        .returning(Notification.id)
+    ).all()
+    enqueue_deliveries(db, sent)
+    db.commit()
+    return sent
+
 
-def process_due_reminders():
+def process_due_reminders(batch_size: Optional[int] = None, worker_id: str = WORKER_ID) -> int:
+    """Send every due reminder in fixed-size batches; returns how many were sent"""
+    batch_size = batch_size or settings.reminder_batch_size
+    total = 0
     db: Session = SessionLocal()
     try:
         now = datetime.now()
+        while True:
+            started = time.perf_counter()
+            claimed = claim_due_reminders(db, now, batch_size, worker_id)
+            if not claimed:
+                break
+
+            sent = set(mark_sent(db, [reminder.id for reminder in claimed], worker_id))
+            schedule_next_occurrences(db, [reminder for reminder in claimed if reminder.id in sent])
+            for reminder in claimed:
+                if reminder.id in sent:
+                    notification_hub.publish(reminder.user_id, notification_event(reminder))
+            for user_id in {reminder.user_id for reminder in claimed if reminder.id in sent}:
+                response_cache.bump(user_id)
+            if sent:
+                delivery_pipeline.wake()
+
+            elapsed = time.perf_counter() - started
+            _record_batch(len(sent), elapsed)
+            total += len(sent)
+            if len(claimed) < batch_size:
+                break
+    finally:
+        db.close()
+    return total
+
 
-        reminders = (
-            db.query(Notification)
-            .filter(
-                Notification.sent.is_(False),
-                Notification.scheduled_for <= now
+# Offset of reminders from before configurable offsets (lead_minutes NULL)
+LEGACY_LEAD_MINUTES = 30
+
+
+def schedule_next_occurrences(db: Session, fired: list) -> list:
+    """Add the reminder of the next occurrence of each recurring task whose
+    reminder was just sent, at the same offset; returns their times"""
+    if not fired:
+        return []
+    task_ids = {reminder.task_id for reminder in fired}
+    tasks = {
+        task.id: task
+        for task in db.execute(
+            select(*REMINDER_COLUMNS, User.reminder_offsets.label("default_offsets"))
+            .join(User, User.id == Task.user_id)
+            .where(
+                Task.id.in_(task_ids),
+                Task.recurrence.isnot(None),
+                Task.status == "pending",
+                Task.completed == False,
             )
-            .all()
         )
+    }
+    # An offset that already has its next reminder (a task write raced the
+    # send) keeps that one
+    pending = set(db.execute(
+        select(Notification.task_id, Notification.lead_minutes)
+        .where(Notification.task_id.in_(tasks), Notification.sent == False)
+    ).all())
+    now = datetime.now()
+    rows = {}
+    for reminder in fired:
+        task = tasks.get(reminder.task_id)
+        lead = reminder.lead_minutes if reminder.lead_minutes is not None else LEGACY_LEAD_MINUTES
+        if task is None or (task.id, lead) in pending or lead not in effective_offsets(task.reminder_offsets, task.default_offsets):
+            continue
+        for row in reminders_for(task, [lead], now, after=reminder.scheduled_for):
+            rows[task.id, lead] = row
+    rows = list(rows.values())
+    if not rows:
+        return []
+    db.execute(insert(Notification), rows)
+    db.commit()
 
-        for reminder in reminders:
-            reminder.sent = True
+    # Imported here: the scheduler imports this module
+    from workers.scheduler import reminder_timer
 
-        if reminders:
-            db.commit()
+    times = [row["scheduled_for"] for row in rows]
+    reminder_timer.schedule(*times)
+    return times
 
-    finally:
-        db.close()
+
+def _record_batch(count: int, seconds: float):
+    rate = count / seconds if seconds > 0 else 0.0
+    worker_stats["batches"] += 1
+    worker_stats["reminders"] += count
+    worker_stats["seconds"] += seconds
+    worker_stats["last_batch"] = {"reminders": count, "seconds": seconds, "per_second": rate}
+    logger.info("reminder batch: %d sent in %.3fs (%.0f/s)", count, seconds, rate)
+
+
+def notification_event(notification) -> dict:
+    """Payload pushed to notification streams, shaped like schemas.Notification"""
+    return {
+        "id": notification.id,
+        "task_id": notification.task_id,
+        "message": notification.message,
+        "created_at": notification.created_at,
+        "is_read": bool(notification.is_read),
+    }
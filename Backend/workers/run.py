@@ -0,0 +1,35 @@
+# run.py
+"""Standalone scheduler process, for API replicas run with
+SCHEDULER_MODE=off (or alongside them):
+
+    python -m workers.run
+
+Several may run; the lease in workers/leader.py keeps one active and fails
+over to another within SCHEDULER_LEASE_SECONDS.
+"""
+import logging
+import signal
+import threading
+
+from database import run_migrations
+from workers.scheduler import scheduler_election
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    run_migrations()
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    scheduler_election.start()
+    try:
+        while not stopped.wait(1):
+            pass
+    finally:
+        scheduler_election.stop()
+
+
+if __name__ == "__main__":
+    main()
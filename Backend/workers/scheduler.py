@@ -1,17 +1,204 @@
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import select
 from workers.reminder_worker import process_due_reminders
 from tzlocal import get_localzone
 from zoneinfo import ZoneInfo
+from config import settings
+from database import SessionLocal
+from models import Notification
+from operations.notifications import purge_read
+from operations.sync import purge_tombstones
+from workers.delivery import delivery_pipeline
+from workers.leader import LeaderElection
+from workers.notification_hub import notification_hub
 
 local_tz = ZoneInfo("Africa/Cairo")
 
+
+class ReminderTimer:
+    """Wakes up exactly when the next reminder is due.
+
+    Keeps a min-heap of the earliest ``capacity`` unsent ``scheduled_for``
+    times, loaded from the reminder index and kept current by the task CRUD
+    paths. When the heap had to be truncated, ``horizon`` is the latest time
+    it covers; later reminders are picked up by the next load.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._heap: list[datetime] = []
+        self._horizon: Optional[datetime] = None
+        self._cond = threading.Condition()
+        self._process_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="reminder-timer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def load(self):
+        """Reload the heap with the earliest unsent reminders"""
+        with SessionLocal() as db:
+            times = db.scalars(
+                select(Notification.scheduled_for)
+                .where(Notification.sent == False)
+                .order_by(Notification.scheduled_for)
+                .limit(self.capacity)
+            ).all()
+        with self._cond:
+            self._heap = list(times)
+            heapq.heapify(self._heap)
+            self._horizon = times[-1] if len(times) == self.capacity else None
+            self._cond.notify()
+
+    def schedule(self, *times: datetime):
+        """Register newly created or moved reminders.
+
+        Only the process running the timer (the elected one) keeps them;
+        elsewhere this does nothing, and the leader finds the reminders at
+        its next reconcile, up to ``reminder_reconcile_seconds`` late.
+        """
+        with self._cond:
+            if self._thread is None:
+                return
+            if self._horizon is not None:
+                times = [when for when in times if when <= self._horizon]
+            if not times:
+                return
+            earliest = self._heap[0] if self._heap else None
+            for when in times:
+                heapq.heappush(self._heap, when)
+            # Truncate once per call, not once per reminder of a bulk write
+            if len(self._heap) > self.capacity:
+                self._heap = heapq.nsmallest(self.capacity, self._heap)
+                self._horizon = self._heap[-1]
+                heapq.heapify(self._heap)
+            if self._heap[0] != earliest:
+                self._cond.notify()
+
+    def unschedule(self, *times: datetime):
+        """Forget reminders that were deleted before they fired"""
+        if not times:
+            return
+        with self._cond:
+            if self._thread is None:
+                return
+            remaining = Counter(times)
+            heap = []
+            for when in self._heap:
+                if remaining[when]:
+                    remaining[when] -= 1
+                else:
+                    heap.append(when)
+            if len(heap) != len(self._heap):
+                self._heap = heap
+                heapq.heapify(self._heap)
+
+    def reconcile(self):
+        """Safety net: process anything overdue and rebuild the heap from the DB"""
+        self._process()
+        self.load()
+
+    def _process(self):
+        with self._process_lock:
+            process_due_reminders()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        if self._horizon is not None:
+                            break  # truncated and drained: reload below
+                        self._cond.wait()
+                        continue
+                    delay = (self._heap[0] - datetime.now()).total_seconds()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._stopped:
+                    return
+                now = datetime.now()
+                while self._heap and self._heap[0] <= now:
+                    heapq.heappop(self._heap)
+                drained = not self._heap and self._horizon is not None
+
+            self._process()
+            if drained:
+                self.load()
+
+
+reminder_timer = ReminderTimer(capacity=settings.reminder_heap_size)
+
+
+_scheduler: Optional[BackgroundScheduler] = None
+
+
 def start_scheduler():
+    """Start the reminder timer and the periodic jobs in this process; only
+    the elected process should (see scheduler_election)"""
+    global _scheduler
+    if _scheduler is not None:
+        return
+    notification_hub.local_worker = True
+    delivery_pipeline.start()
+    reminder_timer.start()
+
     scheduler = BackgroundScheduler(timezone=local_tz)
     scheduler.add_job(
-        process_due_reminders,
+        reminder_timer.reconcile,
         trigger="interval",
-        minutes=1,
+        seconds=settings.reminder_reconcile_seconds,
         id="reminder_worker",
         replace_existing=True,
     )
+    scheduler.add_job(
+        purge_tombstones,
+        trigger="interval",
+        hours=1,
+        id="tombstone_purge",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        purge_read,
+        trigger="interval",
+        hours=1,
+        id="notification_retention",
+        replace_existing=True,
+    )
     scheduler.start()
+    _scheduler = scheduler
+
+
+def stop_scheduler():
+    """Stop what start_scheduler() started, waiting for running jobs"""
+    global _scheduler
+    if _scheduler is None:
+        return
+    _scheduler.shutdown(wait=True)
+    _scheduler = None
+    reminder_timer.stop()
+    delivery_pipeline.stop()
+    notification_hub.local_worker = False
+
+
+scheduler_election = LeaderElection(start_scheduler, stop_scheduler)
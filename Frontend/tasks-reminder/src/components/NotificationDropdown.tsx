@@ -9,13 +9,17 @@ const NotificationDropdown = () => {
   const [isOpen, setIsOpen] = useState(false);
   const [unreadCount, setUnreadCount] = useState(0);
   const dropdownRef = useRef<HTMLDivElement>(null);
+  // Ids already listed or counted, so a reminder pushed twice counts once
+  const knownIds = useRef<Set<number>>(new Set());
 
   const fetchNotifications = async () => {
-    const data = await taskService.getNotifications();
-    const filteredNotifications = data.filter(notification => notification.is_read===false);
-    setNotifications(filteredNotifications);
-    // console.log(data);
-    setUnreadCount(data.filter(n => !n.is_read).length);
+    const [unread, count] = await Promise.all([
+      taskService.getNotifications(true),
+      taskService.getUnreadCount(),
+    ]);
+    knownIds.current = new Set(unread.map(n => n.id));
+    setNotifications(unread);
+    setUnreadCount(count);
   };
 
  useEffect(() => {
@@ -28,13 +32,17 @@ const NotificationDropdown = () => {
 
   load(); // allowed: async boundary
 
-  const interval = setInterval(() => {
-    load();
-  }, 30000);
+  // New reminders are pushed by the server instead of polled
+  const source = taskService.openNotificationStream((notification) => {
+    if (!isMounted || notification.is_read || knownIds.current.has(notification.id)) return;
+    knownIds.current.add(notification.id);
+    setNotifications(prev => [notification, ...prev]);
+    setUnreadCount(prev => prev + 1);
+  });
 
   return () => {
     isMounted = false;
-    clearInterval(interval);
+    source?.close();
   };
 }, []);
 
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { CheckCircle, Clock, AlertCircle, Trash2, Bell, BellOff } from 'lucide-react';
 import { taskApi } from '../services/api';
 import { useTasks } from '../hooks/useTasks';
@@ -9,6 +9,7 @@ export const TaskList: React.FC = () => {
   const { state, dispatch } = useTasks();
   const [filter, setFilter] = useState<'all' | 'active' | 'completed'>('all');
   const [search, setSearch] = useState('');
+  const [searchResults, setSearchResults] = useState<Task[] | null>(null);
   const [toast, setToast] = useState<{ message: string; type: 'success' | 'error' } | null>(null);
 
   const showToast = (message: string, type: 'success' | 'error' = 'success') => {
@@ -16,15 +17,35 @@ export const TaskList: React.FC = () => {
     setTimeout(() => setToast(null), 3000);
   };
 
-  const filteredTasks = state.tasks.filter(task => {
+  // Search runs on the server once typing pauses, ranked by relevance
+  useEffect(() => {
+    if (!search.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await taskApi.searchTasks(search);
+        if (!cancelled) setSearchResults(results);
+      } catch {
+        if (!cancelled) showToast('Search failed', 'error');
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [search]);
+
+  // Results show the tasks as they are now: edited ones updated, deleted ones gone
+  const matchingTasks = searchResults
+    ? searchResults.flatMap(result => state.tasks.find(task => task.id === result.id) ?? [])
+    : state.tasks;
+
+  const filteredTasks = matchingTasks.filter(task => {
     if (filter === 'active' && task.completed) return false;
     if (filter === 'completed' && !task.completed) return false;
-    if (search) {
-      const searchLower = search.toLowerCase();
-      return task.title.toLowerCase().includes(searchLower) ||
-             task.description.toLowerCase().includes(searchLower) ||
-             task.category.toLowerCase().includes(searchLower);
-    }
     return true;
   });
 
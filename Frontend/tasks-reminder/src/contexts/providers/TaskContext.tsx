@@ -1,4 +1,4 @@
-import {useReducer, useEffect, useCallback } from 'react';
+import {useReducer, useEffect, useCallback, useRef } from 'react';
 import type {ReactNode} from 'react';
 import type {TaskState, TaskAction} from '../../types';
 import { taskApi } from '../../services/api';
@@ -9,6 +9,18 @@ const taskReducer = (state: TaskState, action: TaskAction): TaskState => {
   switch (action.type) {
     case 'SET_TASKS':
       return { ...state, tasks: action.payload, loading: false };
+    case 'SYNC_TASKS': {
+      const deleted = new Set(action.payload.deleted);
+      const changed = new Set(action.payload.tasks.map(t => t.id));
+      const kept = action.payload.full
+        ? []
+        : state.tasks.filter(t => !deleted.has(t.id) && !changed.has(t.id));
+      // Newest first, like GET /tasks
+      const tasks = kept.concat(action.payload.tasks).sort(
+        (a, b) => b.createdAt.localeCompare(a.createdAt) || b.id - a.id
+      );
+      return { ...state, tasks, loading: false };
+    }
     case 'ADD_TASK':
       return { ...state, tasks: [...state.tasks, action.payload] };
     case 'UPDATE_TASK':
@@ -35,16 +47,23 @@ export const TaskProvider = ({ children }: { children: ReactNode }) => {
     error: null,
   });
 
+  // Token of the last sync: later refreshes fetch only what changed
+  const syncToken = useRef<string | null>(null);
+
   const refreshTasks = useCallback(async () => {
     if (!authState.isAuthenticated) {
+      syncToken.current = null;
       dispatch({ type: 'SET_TASKS', payload: [] });
       return;
     }
 
     try {
-      dispatch({ type: 'SET_LOADING', payload: true });
-      const tasks = await taskApi.fetchTasks();
-      dispatch({ type: 'SET_TASKS', payload: tasks });
+      if (!syncToken.current) {
+        dispatch({ type: 'SET_LOADING', payload: true });
+      }
+      const sync = await taskApi.syncTasks(syncToken.current);
+      syncToken.current = sync.token;
+      dispatch({ type: 'SYNC_TASKS', payload: sync });
     // eslint-disable-next-line @typescript-eslint/no-explicit-any
     } catch (err: any) {
       dispatch({ type: 'SET_ERROR', payload: err.message });
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { Task } from '../types';
+import type { Task, TaskSync } from '../types';
 import type { BackendTask } from '../types/mapped';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
@@ -92,6 +92,28 @@ export const taskApi = {
     return data.map(transformToFrontend);
   },
 
+  // Changes since the token of the previous sync; without one, every task
+  // (full). Apply deleted before tasks: recent changes are sent twice.
+  async syncTasks(since?: string | null): Promise<TaskSync> {
+    const { data } = await axiosInstance.get('/sync', {
+      params: since ? { since } : {},
+    });
+    return {
+      token: data.token,
+      full: data.full,
+      tasks: data.tasks.map(transformToFrontend),
+      deleted: data.deleted,
+    };
+  },
+
+  // Ranked full-text search over titles and descriptions, done by the server
+  async searchTasks(q: string, limit = 100): Promise<Task[]> {
+    const { data } = await axiosInstance.get('/tasks', {
+      params: { q, limit },
+    });
+    return data.map(transformToFrontend);
+  },
+
   async createTask(task: Partial<Task>): Promise<Task> {
     const { data } = await axiosInstance.post('/tasks', transformToBackend(task));
     return transformToFrontend(data);
@@ -36,6 +36,7 @@ export interface TaskFilters {
   offset?: number;
   sort_by?: string;
   order?: 'asc' | 'desc';
+  q?: string;
 }
 
 export interface InsightsResponse {
@@ -176,9 +177,10 @@ class TaskService {
     }
   }
 
-  async getNotifications(): Promise<NotificationResponse[]> {
+  // Newest page of the feed; older pages follow the X-Next-Cursor header
+  async getNotifications(unreadOnly = false): Promise<NotificationResponse[]> {
     try{
-      const res = await axiosInstance.get('/notifications');
+      const res = await axiosInstance.get('/notifications', { params: unreadOnly ? { unread: true } : {} });
       return res.data;
     } catch(error) {
       console.warn("failed to get the notifications due: ", error);
@@ -186,6 +188,30 @@ class TaskService {
     }
   }
 
+  async getUnreadCount(): Promise<number> {
+    try {
+      const res = await axiosInstance.get('/notifications/unread-count');
+      return res.data.unread;
+    } catch(error) {
+      console.warn("failed to get the unread count due: ", error);
+      return 0;
+    }
+  }
+
+  // Push channel for sent reminders. EventSource reconnects on its own and
+  // sends Last-Event-ID, so the backend replays anything missed meanwhile.
+  openNotificationStream(onNotification: (notification: NotificationResponse) => void): EventSource | null {
+    const token = localStorage.getItem('token');
+    if (!token) return null;
+
+    const url = `${axiosInstance.defaults.baseURL ?? ''}/notifications/stream?access_token=${encodeURIComponent(token)}`;
+    const source = new EventSource(url);
+    source.addEventListener('notification', (event) => {
+      onNotification(JSON.parse((event as MessageEvent).data));
+    });
+    return source;
+  }
+
   async markNotifications(id: number): Promise<boolean> {
     try{
       const res = await axiosInstance.put(`/notifications/${id}`);
@@ -29,8 +29,16 @@ export interface TaskState {
   error: string | null;
 }
 
+export interface TaskSync {
+  token: string;
+  full: boolean;
+  tasks: Task[];
+  deleted: number[];
+}
+
 export type TaskAction =
   | { type: 'SET_TASKS'; payload: Task[] }
+  | { type: 'SYNC_TASKS'; payload: TaskSync }
   | { type: 'ADD_TASK'; payload: Task }
   | { type: 'UPDATE_TASK'; payload: Task }
   | { type: 'DELETE_TASK'; payload: number }